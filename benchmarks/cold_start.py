@@ -0,0 +1,151 @@
+"""
+Cold-start benchmark for the serverless entry point
+Starts fresh interpreters that import the entry module and serve the first
+requests a new candidate makes (the page, then the persona list), in
+process and without a network server, and reports the median time from
+interpreter launch to each response. With --profile it also prints an
+import-time breakdown of the entry module. Exits non-zero when the median
+cold start exceeds --budget-ms, so it can gate CI
+
+Example:
+    python benchmarks/cold_start.py --budget-ms 400
+    python benchmarks/cold_start.py --entry app --profile
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+
+FIRST_REQUESTS = (("GET", "/"), ("GET", "/api/personas"))
+
+# Runs in the fresh interpreter; prints when each stage finished as JSON.
+# time.monotonic() is a system-wide clock, comparable with the parent's.
+PROBE = """
+import json, sys, time
+timings = {"startup": time.monotonic()}
+module = __import__(sys.argv[1])
+timings["import"] = time.monotonic()
+app = module.app
+requests = json.loads(sys.argv[2])
+
+if hasattr(app, "test_client"):
+    client = app.test_client()
+    for method, path in requests:
+        response = client.open(path, method=method)
+        assert response.status_code == 200, (path, response.status_code)
+        response.close()
+        timings[path] = time.monotonic()
+else:
+    import asyncio
+
+    async def call(method, path):
+        scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await app(scope, receive, send)
+        assert sent[0]["status"] == 200, (path, sent[0]["status"])
+
+    async def main():
+        for method, path in requests:
+            await call(method, path)
+            timings[path] = time.monotonic()
+
+    asyncio.run(main())
+print(json.dumps(timings))
+"""
+
+
+def run_once(entry: str) -> Dict[str, float]:
+    """One cold start: seconds from interpreter launch until each stage finished"""
+    launched = time.monotonic()
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, entry, json.dumps(FIRST_REQUESTS)],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    return {stage: finished - launched for stage, finished in timings.items()}
+
+
+def import_profile(entry: str, top: int) -> List[Tuple[str, float, float]]:
+    """Slowest modules imported by the entry module: (name, self ms, cumulative ms)"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry}"],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    modules: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entry_stats = modules[name.strip()]
+        entry_stats[0] += int(self_us) / 1000
+        entry_stats[1] = max(entry_stats[1], int(cumulative_us) / 1000)
+    ranked = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+    return [(name, stats[0], stats[1]) for name, stats in ranked[:top]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the serverless entry point")
+    parser.add_argument("--entry", default="serverless", help="module in src/ exposing `app` (ASGI or Flask)")
+    parser.add_argument("--runs", type=int, default=7, help="cold starts to measure")
+    parser.add_argument("--budget-ms", type=float, default=400,
+                        help="fail if the median time to the last first-visit response exceeds this")
+    parser.add_argument("--profile", action="store_true", help="print an import-time breakdown")
+    parser.add_argument("--top", type=int, default=25, help="modules shown by --profile")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    runs = [run_once(args.entry) for _ in range(args.runs)]
+    stages = ["startup", "import"] + [path for _, path in FIRST_REQUESTS]
+    medians = {stage: round(statistics.median(run[stage] for run in runs) * 1000, 1) for stage in stages}
+    cold_start_ms = medians[FIRST_REQUESTS[-1][1]]
+    results = {
+        "entry": args.entry,
+        "runs": args.runs,
+        "median_ms": medians,
+        "cold_start_ms": cold_start_ms,
+        "budget_ms": args.budget_ms,
+        "within_budget": cold_start_ms <= args.budget_ms,
+    }
+    if args.profile:
+        results["import_profile"] = [
+            {"module": name, "self_ms": round(self_ms, 1), "cumulative_ms": round(cumulative_ms, 1)}
+            for name, self_ms, cumulative_ms in import_profile(args.entry, args.top)
+        ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.entry}: median of {args.runs} cold starts (ms from interpreter launch)")
+        print(f"  {'interpreter':<16}{medians['startup']:>8}")
+        print(f"  {'imports':<16}{medians['import']:>8}")
+        for _, path in FIRST_REQUESTS:
+            print(f"  {path:<16}{medians[path]:>8}")
+        print(f"  cold start {cold_start_ms} ms, budget {args.budget_ms} ms: "
+              f"{'ok' if results['within_budget'] else 'OVER BUDGET'}")
+        if args.profile:
+            print(f"\n  {'module':<40}{'self ms':>10}{'cumulative ms':>16}")
+            for row in results["import_profile"]:
+                print(f"  {row['module']:<40}{row['self_ms']:>10}{row['cumulative_ms']:>16}")
+
+    if not results["within_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
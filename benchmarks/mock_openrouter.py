@@ -0,0 +1,224 @@
+"""
+Mock OpenRouter chat-completions server for offline benchmarking
+Answers POST /api/v1/chat/completions with canned replies after a sampled
+latency, supports stream=true (server-sent events), reports token usage and
+can inject 429/500 errors at configurable rates, globally or per model
+
+Run standalone:  python benchmarks/mock_openrouter.py --port 8099
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+REPLY_WORDS = (
+    "That's a great point, you know. I like how you framed the trade-offs there. "
+    "Let me jot that down. Could you walk me through how you measured the impact, "
+    "and what you would do differently if you had to do it again tomorrow?"
+).split(" ")
+
+FEEDBACK_REPLY = json.dumps({
+    "scores": {"technical_knowledge": 7, "communication": 8, "problem_solving": 7, "fit": 8},
+    "strengths": ["Clear structure", "Concrete examples", "Good follow-through"],
+    "areas_for_improvement": ["Quantify impact", "Tighter answers", "Ask more questions"],
+    "overall_assessment": "A solid interview with well-structured answers and room to sharpen impact."
+})
+
+SUMMARY_REPLY = "The candidate described a recent project, its architecture and the main scaling challenge."
+
+
+@dataclass
+class MockConfig:
+    """Latency and failure behaviour of the mock server"""
+    latency_median: float = 0.8      # seconds until the first byte
+    latency_sigma: float = 0.4       # lognormal spread of that latency
+    token_interval: float = 0.01     # seconds between streamed tokens
+    error_rate_429: float = 0.0
+    error_rate_500: float = 0.0
+    retry_after: int = 1
+    # Per-model overrides, for exercising fallback and hedging
+    model_latency: Dict[str, float] = field(default_factory=dict)
+    rate_limited_models: Tuple[str, ...] = ()
+
+
+class MockOpenRouterHandler(BaseHTTPRequestHandler):
+    """Request handler; the server instance carries the MockConfig"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+
+        config: MockConfig = self.server.config
+        self.server.count_request()
+
+        model = payload.get("model")
+        roll = random.random()
+        if roll < config.error_rate_429 or model in config.rate_limited_models:
+            self._send_json(429, {"error": {"message": "rate limited"}}, {"Retry-After": str(config.retry_after)})
+            return
+        if roll < config.error_rate_429 + config.error_rate_500:
+            self._send_json(500, {"error": {"message": "upstream error"}})
+            return
+
+        median = config.model_latency.get(model, config.latency_median)
+        time.sleep(random.lognormvariate(0, config.latency_sigma) * median)
+
+        content, prompt_tokens = self._reply_for(payload)
+        completion_tokens = len(content.split())
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+        if payload.get("stream"):
+            self._stream(content, usage, config.token_interval)
+        else:
+            self._send_json(200, {
+                "id": "mock",
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+
+    def _reply_for(self, payload) -> Tuple[str, int]:
+        """Pick a canned reply matching the kind of request"""
+        messages = payload.get("messages") or []
+        prompt_text = " ".join(
+            m["content"] if isinstance(m.get("content"), str) else json.dumps(m.get("content"))
+            for m in messages
+        )
+        prompt_tokens = len(prompt_text) // 4
+
+        if payload.get("response_format") or "JSON" in prompt_text[-400:]:
+            return FEEDBACK_REPLY, prompt_tokens
+        if "keeping notes" in prompt_text:
+            return SUMMARY_REPLY, prompt_tokens
+        return " ".join(REPLY_WORDS), prompt_tokens
+
+    def _stream(self, content: str, usage, token_interval: float) -> None:
+        """Send the reply as OpenRouter-style server-sent events"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        self._write_chunk(b": OPENROUTER PROCESSING\n\n")
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = word if i == len(words) - 1 else word + " "
+            event = {"choices": [{"index": 0, "delta": {"content": delta}}]}
+            if i == len(words) - 1:
+                event["usage"] = usage
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            if token_interval:
+                time.sleep(token_interval)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes) -> None:
+        """Write one HTTP/1.1 chunk"""
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send_json(self, status: int, body, headers=None) -> None:
+        """Send a JSON response"""
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockOpenRouterServer(ThreadingHTTPServer):
+    """Threaded mock server that counts the requests it serves"""
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), config: Optional[MockConfig] = None):
+        super().__init__(address, MockOpenRouterHandler)
+        self.config = config or MockConfig()
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Chat-completions URL to point OPENROUTER_API_URL at"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-stream (e.g. the app shutting down) are expected
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    def count_request(self) -> None:
+        with self._count_lock:
+            self.request_count += 1
+
+    def start(self) -> "MockOpenRouterServer":
+        """Serve on a background thread"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the mock server's latency and error options to a parser"""
+    parser.add_argument("--latency-median", type=float, default=0.8, help="median upstream latency (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="lognormal sigma of the latency")
+    parser.add_argument("--token-interval", type=float, default=0.01, help="delay between streamed tokens (s)")
+    parser.add_argument("--error-rate-429", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--error-rate-500", type=float, default=0.0, help="fraction of requests answered 500")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="median latency for one model (repeatable)")
+    parser.add_argument("--rate-limited-model", action="append", default=[], metavar="MODEL",
+                        help="answer every request for this model with 429 (repeatable)")
+
+
+def config_from_args(args) -> MockConfig:
+    """Build a MockConfig from parsed arguments"""
+    return MockConfig(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        token_interval=args.token_interval,
+        error_rate_429=args.error_rate_429,
+        error_rate_500=args.error_rate_500,
+        retry_after=args.retry_after,
+        model_latency={
+            model: float(seconds)
+            for model, seconds in (item.rsplit("=", 1) for item in args.model_latency)
+        },
+        rate_limited_models=tuple(args.rate_limited_model)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenRouter chat-completions server")
+    parser.add_argument("--port", type=int, default=8099)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockOpenRouterServer(("127.0.0.1", args.port), config_from_args(args))
+    print(f"Mock OpenRouter listening at {server.url}")
+    server.serve_forever()
@@ -0,0 +1,130 @@
+"""
+Lookup benchmark for persona question banks
+Generates a synthetic bank of the given size, with word frequencies
+following Zipf's law over the shipped banks' vocabulary extended with rarer
+made-up terms (as names, numbers and jargon are in real banks), builds its index as `question_bank.py build` would, and reports
+per-turn lookup latency (hashing the query included) and recall against an
+exhaustive search that also scores the very common features lookups skip.
+Exits non-zero when the p99 lookup exceeds --budget-ms
+
+Example:
+    python benchmarks/question_bank.py --items 100000
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from question_bank import QuestionBank, hashed_features, load_items  # noqa: E402
+
+
+class Vocabulary:
+    """Words drawn with Zipfian frequencies: shipped bank words first, then made-up terms"""
+
+    def __init__(self, size: int, rng: np.random.Generator, exponent: float = 1.07):
+        words = set()
+        for bank in glob.glob(os.path.join(ROOT_DIR, "personas", "*.questions.jsonl")):
+            for item in load_items(bank):
+                words.update(item.text.lower().split())
+        self.words = sorted(words) + [f"term{i}" for i in range(max(0, size - len(words)))]
+        weights = 1 / np.arange(1, len(self.words) + 1) ** exponent
+        self.probabilities = weights / weights.sum()
+        self.rng = rng
+
+    def sample(self, count: int) -> List[str]:
+        return list(self.rng.choice(self.words, count, p=self.probabilities))
+
+
+def synthetic_bank(path: str, count: int, vocabulary: Vocabulary) -> None:
+    """Write ``count`` items of 8 to 24 words"""
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(count):
+            text = " ".join(vocabulary.sample(vocabulary.rng.integers(8, 25)))
+            f.write(json.dumps({"text": text, "kind": "question"}) + "\n")
+
+
+def answer_like(text: str, vocabulary: Vocabulary) -> str:
+    """A query resembling an item: about half its words, in order, plus as many unrelated ones"""
+    kept = [word for word in text.split() if vocabulary.rng.random() < 0.5]
+    return " ".join(kept + vocabulary.sample(len(kept)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure question bank lookup latency")
+    parser.add_argument("--items", type=int, default=100000, help="bank size")
+    parser.add_argument("--queries", type=int, default=2000, help="lookups to time")
+    parser.add_argument("--k", type=int, default=3, help="items returned per lookup")
+    parser.add_argument("--vocabulary", type=int, default=30000, help="distinct words in the synthetic bank")
+    parser.add_argument("--budget-ms", type=float, default=1.0, help="fail if the p99 lookup exceeds this")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocabulary = Vocabulary(args.vocabulary, rng)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.questions.jsonl")
+        synthetic_bank(path, args.items, vocabulary)
+        started = time.perf_counter()
+        bank = QuestionBank.load(path)
+        build_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        QuestionBank.load(path)
+        load_seconds = time.perf_counter() - started
+
+    queries = [answer_like(bank.items[i].text, vocabulary) for i in rng.integers(0, len(bank.items), args.queries)]
+    for query in queries[:50]:
+        bank.search(query, args.k)
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        bank.search(query, args.k)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    # Share of the exact top k that lookups find
+    found = total = 0
+    for query in queries[:500]:
+        hashes = hashed_features(query)
+        truth = {item_id for item_id, _ in bank.index.search(hashes, args.k, exhaustive=True)}
+        found += len(truth & {item_id for item_id, _ in bank.index.search(hashes, args.k)})
+        total += len(truth)
+
+    p99_ms = latencies[int(len(latencies) * 0.99)] * 1000
+    results = {
+        "items": len(bank.items),
+        "features": len(bank.index.features),
+        "build_seconds": round(build_seconds, 2),
+        "load_seconds": round(load_seconds, 3),
+        "lookup_p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "lookup_p99_ms": round(p99_ms, 3),
+        "recall_at_k": round(found / total, 3) if total else None,
+        "budget_ms": args.budget_ms,
+        "within_budget": p99_ms <= args.budget_ms,
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['items']} items ({results['features']} features), built in {results['build_seconds']}s, "
+              f"loaded in {results['load_seconds']}s")
+        print(f"  lookup p50 {results['lookup_p50_ms']} ms, p99 {results['lookup_p99_ms']} ms, "
+              f"recall@{args.k} {results['recall_at_k']}")
+        print(f"  budget {args.budget_ms} ms: {'ok' if results['within_budget'] else 'OVER BUDGET'}")
+
+    if not results["within_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Offline load benchmark for the AI Mock Interview app
+Starts the mock OpenRouter server and the real app (Flask or ASGI) in a
+subprocess pointed at it, drives scripted multi-turn interviews for every
+persona through the HTTP endpoints at a given concurrency, and reports
+p50/p95/p99 latency per endpoint, turns/sec and server RSS. Each interview
+uses its own API key; --abusive-clients adds clients hammering the respond
+endpoint with one shared key, to check that rate limiting keeps everyone
+else's latency stable. --incident-at slows the mock provider down part way
+through, and --probe polls the read-only endpoints throughout, to check that
+an incident sheds or degrades turns without stalling everything else
+
+Example:
+    python benchmarks/run_benchmark.py --server asgi --concurrency 50 --interviews 200
+    python benchmarks/run_benchmark.py --server flask --abusive-clients 20
+    python benchmarks/run_benchmark.py --server flask --concurrency 60 --incident-at 5 --incident-latency 8 --probe
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+from mock_openrouter import MockOpenRouterServer, add_mock_arguments, config_from_args
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+
+PERSONA_IDS = ("mit", "finance", "tech", "hr", "case")
+API_KEY = "sk-or-v1-benchmark"
+
+CANDIDATE_ANSWERS = (
+    "I led a project rebuilding our data pipeline; the hardest part was migrating without downtime.",
+    "We split the monolith into three services and put a queue between ingestion and processing.",
+    "I measured success with p95 latency and error budgets, and we cut latency by about forty percent.",
+    "Honestly I'd push for better observability earlier; we lost weeks debugging blind.",
+    "When the team disagreed I set up a short design review and we agreed on clear decision criteria.",
+    "I'd start by segmenting the market, then look at pricing, footfall and competitor openings.",
+)
+
+
+class LatencyRecorder:
+    """Thread-safe latency samples per endpoint"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def free_port() -> int:
+    """Pick an unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(server: str, port: int, upstream_url: str) -> subprocess.Popen:
+    """Start the app in a subprocess and wait until it accepts requests"""
+    env = dict(os.environ, OPENROUTER_API_URL=upstream_url, PYTHONUNBUFFERED="1")
+    if server == "asgi":
+        command = [sys.executable, "-m", "uvicorn", "asgi:app", "--app-dir", SRC_DIR,
+                   "--port", str(port), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-c",
+                   f"from app import app; app.run(port={port}, threaded=True)"]
+    process = subprocess.Popen(command, cwd=SRC_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/personas", timeout=1)
+            return process
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{server} app did not start on port {port}")
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB (Linux /proc), or None if unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def run_interview(
+    base_url: str,
+    persona_id: str,
+    turns: int,
+    stream: bool,
+    recorder: LatencyRecorder,
+    api_key: str = API_KEY
+) -> int:
+    """Drive one scripted interview; returns the number of completed turns"""
+    http = requests.Session()
+    headers = {"X-API-Key": api_key}
+
+    def call(endpoint: str, method: str, path: str, retry: bool = True, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = http.request(method, base_url + path, headers=headers, timeout=120, **kwargs)
+            if retry and response.status_code in (429, 503):
+                # As a user would after the error message: wait as told, send once more
+                recorder.record(f"{endpoint}.shed", time.perf_counter() - start, True)
+                time.sleep(min(float(response.headers.get("Retry-After", 1)), 10))
+                return call(endpoint, method, path, retry=False, **kwargs)
+            if stream and endpoint == "respond":
+                # Time to first token matters more than total time when streaming
+                lines = response.iter_lines()
+                next(lines, None)
+                recorder.record("respond.ttft", time.perf_counter() - start, response.ok)
+                for _ in lines:
+                    pass
+                ok = response.ok
+            else:
+                ok = response.ok
+            recorder.record(endpoint, time.perf_counter() - start, ok)
+            if response.status_code in (429, 503):
+                recorder.record(f"{endpoint}.shed", time.perf_counter() - start, True)
+            return response if ok else None
+        except requests.exceptions.RequestException:
+            recorder.record(endpoint, time.perf_counter() - start, False)
+            return None
+
+    call("personas", "GET", "/api/personas")
+    started = call("start", "POST", "/api/interview/start", json={"persona_id": persona_id})
+    if started is None:
+        return 0
+    session_id = started.json()["session_id"]
+
+    completed = 0
+    respond_path = "/api/interview/respond/stream" if stream else "/api/interview/respond"
+    for turn in range(turns):
+        answer = CANDIDATE_ANSWERS[turn % len(CANDIDATE_ANSWERS)]
+        if call("respond", "POST", respond_path, json={"session_id": session_id, "user_message": answer},
+                stream=stream) is not None:
+            completed += 1
+        call("status", "GET", "/api/interview/status", params={"session_id": session_id})
+
+    # Ending returns a feedback job at once; the result is collected by polling
+    started = time.perf_counter()
+    job = call("end", "POST", "/api/interview/end", json={"session_id": session_id})
+    job = job.json() if job is not None else {"status": "failed"}
+    while job["status"] in ("queued", "running"):
+        polled = call("feedback.poll", "GET", "/api/interview/feedback", params={"job_id": job["job_id"], "wait": 25})
+        job = polled.json() if polled is not None else {"status": "failed"}
+        if job["status"] in ("queued", "running"):
+            time.sleep(0.25)
+    recorder.record("feedback", time.perf_counter() - started, job["status"] == "done")
+    return completed
+
+
+def run_abuser(base_url: str, stop: threading.Event, recorder: LatencyRecorder) -> None:
+    """Send answers back to back with one shared key until stopped, ignoring 429s"""
+    http = requests.Session()
+    headers = {"X-API-Key": f"{API_KEY}-abuser"}
+    started = http.post(base_url + "/api/interview/start", json={"persona_id": "tech"}, headers=headers, timeout=30)
+    session_id = started.json()["session_id"]
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            response = http.post(base_url + "/api/interview/respond", headers=headers, timeout=120,
+                                 json={"session_id": session_id, "user_message": CANDIDATE_ANSWERS[0]})
+            recorder.record("abuse", time.perf_counter() - start, response.ok)
+            if response.status_code == 429:
+                recorder.record("abuse.429", time.perf_counter() - start, True)
+        except requests.exceptions.RequestException:
+            recorder.record("abuse", time.perf_counter() - start, False)
+
+
+def run_probe(base_url: str, stop: threading.Event, recorder: LatencyRecorder, interval: float = 0.1) -> None:
+    """Poll the read-only endpoints until stopped"""
+    http = requests.Session()
+    while not stop.wait(interval):
+        for endpoint, path in (("probe.personas", "/api/personas"), ("probe.status", "/api/interview/status")):
+            start = time.perf_counter()
+            try:
+                response = http.get(base_url + path, timeout=60)
+                # An unknown session is answered 404, which is all a probe needs
+                recorder.record(endpoint, time.perf_counter() - start, response.status_code in (200, 404))
+            except requests.exceptions.RequestException:
+                recorder.record(endpoint, time.perf_counter() - start, False)
+
+
+def start_incident(mock: MockOpenRouterServer, at: float, seconds: float, latency: float) -> None:
+    """Raise the mock provider's median latency for a while, ``at`` seconds from now"""
+    def run():
+        normal = mock.config.latency_median
+        time.sleep(at)
+        mock.config.latency_median = latency
+        time.sleep(seconds)
+        mock.config.latency_median = normal
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark against a mock OpenRouter server")
+    parser.add_argument("--server", choices=("flask", "asgi"), default="flask")
+    parser.add_argument("--concurrency", type=int, default=10, help="interviews in flight at once")
+    parser.add_argument("--interviews", type=int, default=20, help="total interviews to run")
+    parser.add_argument("--turns", type=int, default=5, help="candidate turns per interview")
+    parser.add_argument("--stream", action="store_true", help="use the streaming respond endpoint")
+    parser.add_argument("--abusive-clients", type=int, default=0,
+                        help="extra clients flooding the respond endpoint with one shared API key")
+    parser.add_argument("--incident-at", type=float, help="seconds into the run when the provider slows down")
+    parser.add_argument("--incident-seconds", type=float, default=10.0, help="how long the slowdown lasts")
+    parser.add_argument("--incident-latency", type=float, default=8.0, help="median upstream latency during it (s)")
+    parser.add_argument("--probe", action="store_true", help="poll the read-only endpoints during the run")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    mock = MockOpenRouterServer(config=config_from_args(args)).start()
+    port = free_port()
+    process = start_app(args.server, port, mock.url)
+    base_url = f"http://127.0.0.1:{port}"
+
+    recorder = LatencyRecorder()
+    peak_rss = [read_rss_mb(process.pid) or 0.0]
+    done = threading.Event()
+
+    def sample_rss():
+        while not done.wait(0.5):
+            peak_rss[0] = max(peak_rss[0], read_rss_mb(process.pid) or 0.0)
+
+    threading.Thread(target=sample_rss, daemon=True).start()
+
+    # Extra clients running beside the interviews until they are done
+    clients = [
+        threading.Thread(target=run_abuser, args=(base_url, done, recorder), daemon=True)
+        for _ in range(args.abusive_clients)
+    ]
+    if args.probe:
+        clients.append(threading.Thread(target=run_probe, args=(base_url, done, recorder), daemon=True))
+    for client in clients:
+        client.start()
+
+    if args.incident_at is not None:
+        start_incident(mock, args.incident_at, args.incident_seconds, args.incident_latency)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [
+                pool.submit(run_interview, base_url, PERSONA_IDS[i % len(PERSONA_IDS)],
+                            args.turns, args.stream, recorder, f"{API_KEY}-{i}")
+                for i in range(args.interviews)
+            ]
+            turns_completed = sum(f.result() for f in futures)
+        elapsed = time.perf_counter() - start
+    finally:
+        done.set()
+        for client in clients:
+            client.join(timeout=10)
+        process.terminate()
+        process.wait(timeout=10)
+        mock.shutdown()
+
+    results = {
+        "server": args.server,
+        "concurrency": args.concurrency,
+        "interviews": args.interviews,
+        "elapsed_seconds": round(elapsed, 2),
+        "turns_completed": turns_completed,
+        "turns_per_second": round(turns_completed / elapsed, 2) if elapsed else 0.0,
+        "upstream_requests": mock.request_count,
+        "peak_rss_mb": round(peak_rss[0], 1),
+        "endpoints": {
+            endpoint: {
+                "count": len(samples),
+                "errors": recorder.errors[endpoint],
+                "p50_ms": round(percentile(samples, 50) * 1000, 1),
+                "p95_ms": round(percentile(samples, 95) * 1000, 1),
+                "p99_ms": round(percentile(samples, 99) * 1000, 1),
+            }
+            for endpoint, samples in sorted(recorder.samples.items())
+        }
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.server} server, {args.interviews} interviews at concurrency {args.concurrency}")
+    print(f"  elapsed {results['elapsed_seconds']}s, {turns_completed} turns "
+          f"({results['turns_per_second']} turns/s), {mock.request_count} upstream requests, "
+          f"peak RSS {results['peak_rss_mb']} MB")
+    print(f"  {'endpoint':<14}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, stats in results["endpoints"].items():
+        print(f"  {endpoint:<14}{stats['count']:>7}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
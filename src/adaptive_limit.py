@@ -0,0 +1,125 @@
+"""
+Adaptive upstream concurrency for riding out provider slowdowns
+An AIMD controller watches the latency and failures of every upstream call
+and sets how many upstream-bound requests may run at once: it creeps up
+while calls are as fast as usual and is cut back multiplicatively when they
+slow down or time out, so excess turns queue briefly or are shed with 503
+instead of piling up behind the request timeout. While the limit is well
+below its ceiling the service runs degraded: shorter interviewer turns, a
+cheaper model (OPENROUTER_DEGRADED_MODEL), no hedging and no speculative
+prefetch, until latency recovers
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from metrics import Gauge, REGISTRY
+
+CONCURRENCY_LIMIT = REGISTRY.register(Gauge(
+    "upstream_concurrency_limit", "Upstream-bound requests currently allowed in flight"))
+DEGRADED = REGISTRY.register(Gauge(
+    "upstream_degraded", "1 while interviewer turns are degraded under upstream pressure"))
+
+# Samples of a (kind, model) pair before its latency is judged
+MIN_SAMPLES = 5
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit driven by upstream latency.
+
+    Latency is tracked per call kind and model, as a moving average against
+    a baseline that follows latency down quickly and up slowly, so a lasting
+    change (a new model) eventually becomes the new normal. A call that
+    keeps the average within ``tolerance`` times the baseline raises the
+    limit by ``1 / limit``, about one slot per limit's worth of calls; a
+    slower one, or a timeout, 429 or 5xx, multiplies it by ``backoff``. Like
+    TCP, it backs off at most once per round trip (the slow call's average
+    latency, and at least ``cooldown`` seconds): the calls already in flight
+    when the limit was cut say nothing yet about the new limit.
+    """
+
+    def __init__(
+        self,
+        max_limit: int = 32,
+        min_limit: int = 2,
+        tolerance: float = 2.0,
+        backoff: float = 0.7,
+        cooldown: float = 1.0,
+        degrade_below: float = 0.5,
+        smoothing: float = 0.2,
+        drift: float = 0.01
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.degrade_below = degrade_below
+        self.smoothing = smoothing
+        self.drift = drift
+        self.limit = float(max_limit)
+        # (kind, model) -> [baseline, moving average, samples]
+        self._latency: Dict[Tuple[str, str], list] = {}
+        self._decreased_at = 0.0
+        self._lock = threading.Lock()
+        CONCURRENCY_LIMIT.set(self.current)
+
+    @property
+    def current(self) -> int:
+        """Requests allowed in flight now"""
+        return max(self.min_limit, int(self.limit))
+
+    @property
+    def degraded(self) -> bool:
+        """Whether the limit is far enough below its ceiling to degrade turns"""
+        return self.limit < self.max_limit * self.degrade_below
+
+    def observe(self, kind: str, model: str, latency: Optional[float], overloaded: bool = False) -> None:
+        """Record one finished upstream call; ``overloaded`` for timeouts, 429s and 5xx"""
+        with self._lock:
+            slow = overloaded
+            round_trip = self.cooldown
+            if latency is not None:
+                state = self._latency.get((kind, model))
+                if state is None:
+                    state = self._latency[(kind, model)] = [latency, latency, 0]
+                baseline, average, samples = state
+                baseline += (self.smoothing if latency < baseline else self.drift) * (latency - baseline)
+                average += self.smoothing * (latency - average)
+                state[:] = [baseline, average, samples + 1]
+                slow = slow or (samples + 1 >= MIN_SAMPLES and average > baseline * self.tolerance)
+                round_trip = max(round_trip, average)
+
+            if slow:
+                now = time.monotonic()
+                if now - self._decreased_at < round_trip:
+                    return
+                self._decreased_at = now
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+            elif latency is not None:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            CONCURRENCY_LIMIT.set(self.current)
+            DEGRADED.set(1 if self.degraded else 0)
+
+
+_limit: Optional[AdaptiveLimit] = None
+_limit_lock = threading.Lock()
+
+
+def get_adaptive_limit() -> Optional[AdaptiveLimit]:
+    """Get the process-wide adaptive limit, or None if UPSTREAM_ADAPTIVE_LIMIT=0"""
+    global _limit
+    if os.getenv("UPSTREAM_ADAPTIVE_LIMIT", "1") == "0":
+        return None
+    if _limit is None:
+        with _limit_lock:
+            if _limit is None:
+                _limit = AdaptiveLimit(
+                    max_limit=int(os.getenv("UPSTREAM_MAX_IN_FLIGHT", os.getenv("OPENROUTER_POOL_SIZE", "32"))),
+                    min_limit=int(os.getenv("UPSTREAM_MIN_IN_FLIGHT", "2")),
+                    tolerance=float(os.getenv("UPSTREAM_LATENCY_TOLERANCE", "2.0")),
+                    degrade_below=float(os.getenv("UPSTREAM_DEGRADE_BELOW", "0.5"))
+                )
+    return _limit
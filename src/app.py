@@ -4,19 +4,42 @@ Provides web interface for conducting interviews and managing sessions
 Users provide their own OpenRouter API keys for authentication
 """
 
+import json
 import os
+import time
 from datetime import datetime
-from functools import wraps
-from flask import Flask, render_template, request, jsonify
+from functools import partial, wraps
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
+import metrics
 from interview_engine import InterviewEngine
+from jobs import feedback_job, feedback_payload, get_job_queue
+from persona_registry import get_registry
+from rate_limit import RateLimited, get_limiter
+from session_store import create_session_store, hash_api_key
+from speculation import get_prefetcher, prefetched_reply
+from transcript_log import get_transcript_log
 
 app = Flask(__name__, template_folder="../templates", static_folder="../static")
 CORS(app)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "your-secret-key-change-in-production")
 
-# Store active interview sessions
-interview_sessions = {}
+# The registry re-encodes the catalog and its ETag only when personas change
+PERSONA_CACHE_MAX_AGE = int(os.getenv("PERSONA_CACHE_MAX_AGE", "300"))
+
+# Store active interview sessions (serialized, with TTL eviction)
+session_store = create_session_store()
+
+# Engine state that background tasks refresh after a turn (see export_state)
+BACKGROUND_STATE_KEYS = ("context", "evaluation")
+
+# Feedback is generated by background jobs; clients poll for the result
+job_queue = get_job_queue()
+job_queue.register("feedback", feedback_job(session_store))
+
+# Turns are also appended to a log, so sessions survive restarts and can
+# move between workers (None unless TRANSCRIPT_LOG_PATH is set)
+transcript_log = get_transcript_log()
 
 
 def require_api_key(f):
@@ -37,21 +60,199 @@ def require_api_key(f):
     return decorated_function
 
 
+def limit_upstream(f):
+    """Decorator applying per-key and per-session rate limits to an upstream-bound route.
+
+    Holds a fair-scheduler slot for the API key until the response has been
+    sent (streamed replies included); over a limit the request is answered
+    with 429 (or 503 when the server is out of capacity) and Retry-After
+    straight away.
+    """
+    @wraps(f)
+    def decorated_function(*args, api_key, **kwargs):
+        session_id = (request.get_json(silent=True) or {}).get("session_id")
+        try:
+            ticket = get_limiter().admit(hash_api_key(api_key), session_id)
+        except RateLimited as e:
+            return rate_limited_response(e)
+        
+        try:
+            response = app.make_response(f(*args, api_key=api_key, **kwargs))
+        except BaseException:
+            ticket.release()
+            raise
+        response.call_on_close(ticket.release)
+        return response
+    
+    return decorated_function
+
+
+def limit_rate(f):
+    """Decorator applying per-key and per-session rate limits to a route that only queues work.
+
+    Unlike limit_upstream it takes no fair-scheduler slot, so it is never
+    held up behind slow upstream calls.
+    """
+    @wraps(f)
+    def decorated_function(*args, api_key, **kwargs):
+        session_id = (request.get_json(silent=True) or {}).get("session_id")
+        try:
+            get_limiter().check(hash_api_key(api_key), session_id)
+        except RateLimited as e:
+            return rate_limited_response(e)
+        return f(*args, api_key=api_key, **kwargs)
+    
+    return decorated_function
+
+
+def rate_limited_response(error):
+    """429/503 response telling the client why it was turned away and when to retry"""
+    response = jsonify({"error": str(error), "reason": error.reason, "retry_after": int(error.retry_after_header)})
+    response.status_code = error.status
+    response.headers["Retry-After"] = error.retry_after_header
+    return response
+
+
+def find_session(session_id):
+    """Get a session record, replayed from the transcript log if this worker lost it or is behind"""
+    if not session_id:
+        return None
+    record = session_store.get(session_id)
+    if transcript_log is not None:
+        record = transcript_log.resume(session_id, record)
+    return record
+
+
+def load_session(session_id, api_key):
+    """Load a session record and rebuild its engine.
+
+    Returns (record, engine, error_response); error_response is set when the
+    session is missing or belongs to a different API key.
+    """
+    record = find_session(session_id)
+    if record is None:
+        return None, None, (jsonify({"error": "Invalid session"}), 400)
+    
+    # Verify API key matches
+    if record["api_key_hash"] != hash_api_key(api_key):
+        return None, None, (jsonify({"error": "Invalid API key for this session"}), 401)
+    
+    engine = InterviewEngine.from_state(record["engine"], api_key=api_key)
+    engine.on_state_update = partial(store_engine_state, session_id)
+    engine.session_id = session_id
+    return record, engine, None
+
+
+def save_session(session_id, record, engine):
+    """Persist the engine state back into the session record.
+
+    Returns once new turns are in the transcript log too; concurrent turns
+    share its disk flush.
+    """
+    record["engine"] = engine.export_state()
+    written = transcript_log.log_session(session_id, record) if transcript_log is not None else None
+    with session_store.lock(session_id):
+        _keep_background_state(record, session_store.get(session_id))
+        session_store.set(session_id, record)
+    if written is not None:
+        written.result()
+
+
+def store_engine_state(session_id, key, state):
+    """Persist engine state refreshed in the background after a turn.
+
+    Only applied if it covers more of the history than the stored copy, so
+    a late background result never overwrites newer state.
+    """
+    with session_store.lock(session_id):
+        record = session_store.get(session_id)
+        if record is None:
+            return
+        
+        stored = record["engine"].get(key) or {}
+        if _progress(stored) >= _progress(state):
+            return
+        
+        record["engine"][key] = state
+        session_store.set(session_id, record)
+
+
+def _keep_background_state(record, stored):
+    """Keep summary and evaluation state a background task stored while the request ran.
+
+    The request's engine was loaded before the task finished, so its copy
+    may cover fewer turns; whichever side covers more is kept.
+    """
+    if stored is None:
+        return
+    for key in BACKGROUND_STATE_KEYS:
+        state = stored["engine"].get(key) or {}
+        if _progress(state) > _progress(record["engine"].get(key) or {}):
+            record["engine"][key] = state
+
+
+def _progress(state):
+    """How many history messages a background state covers"""
+    return state.get("summarized_count", state.get("evaluated_count", 0))
+
+
+@app.before_request
+def start_request_timer():
+    """Note when handling started, for request metrics"""
+    g.request_received = time.time()
+    g.request_started = time.perf_counter()
+    metrics.HTTP_IN_FLIGHT.inc()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record handler time once the response has been fully sent.
+
+    Observed on close so streamed replies count their whole duration.
+    """
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    method = request.method
+    request_start = request.headers.get("X-Request-Start")
+    received = g.get("request_received")
+    started = g.get("request_started")
+    if started is None:
+        return response
+    
+    def observe():
+        metrics.HTTP_IN_FLIGHT.dec()
+        metrics.observe_http_request(
+            route, method, response.status_code, time.perf_counter() - started,
+            request_start=request_start, received_at=received
+        )
+    
+    response.call_on_close(observe)
+    return response
+
+
 @app.route("/", methods=["GET"])
 def index():
     """Render the main page"""
     return render_template("index.html")
 
 
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Expose request and upstream metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/api/personas", methods=["GET"])
 def get_personas():
     """Get available interview personas (no API key required)"""
-    try:
-        engine = InterviewEngine(api_key="dummy")  # Don't need real key for this
-        personas = engine.get_available_personas()
-        return jsonify({"personas": personas})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    persona_catalog = get_registry().catalog_json(PERSONA_CACHE_MAX_AGE)
+    if persona_catalog.matches(request.headers.get("If-None-Match")):
+        return Response(status=304, headers=persona_catalog.headers())
+    
+    return Response(
+        persona_catalog.body,
+        mimetype="application/json",
+        headers=persona_catalog.headers()
+    )
 
 
 @app.route("/api/interview/start", methods=["POST"])
@@ -71,13 +272,11 @@ def start_interview(api_key):
         
         # Store session with API key
         session_id = f"session_{datetime.now().timestamp()}"
-        interview_sessions[session_id] = {
-            "engine": engine,
-            "api_key": api_key,
-            "persona_id": persona_id,
-            "start_time": datetime.now().isoformat(),
-            "messages": []
-        }
+        save_session(session_id, {
+            "api_key_hash": hash_api_key(api_key),
+            "persona_id": engine.persona_key,
+            "start_time": datetime.now().isoformat()
+        }, engine)
         
         return jsonify({
             "session_id": session_id,
@@ -95,6 +294,7 @@ def start_interview(api_key):
 
 @app.route("/api/interview/respond", methods=["POST"])
 @require_api_key
+@limit_upstream
 def respond_to_interview(api_key):
     """Send a response during interview and get AI response"""
     try:
@@ -102,32 +302,24 @@ def respond_to_interview(api_key):
         session_id = data.get("session_id")
         user_message = data.get("user_message")
         
-        if not session_id or session_id not in interview_sessions:
-            return jsonify({"error": "Invalid session"}), 400
+        record, engine, error = load_session(session_id, api_key)
+        if error:
+            return error
         
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
         
-        session_data = interview_sessions[session_id]
-        
-        # Verify API key matches
-        if session_data["api_key"] != api_key:
-            return jsonify({"error": "Invalid API key for this session"}), 401
-        
-        engine = session_data["engine"]
-        
-        # Get AI response
-        ai_response = engine.get_ai_response(user_message)
+        # Use the reply prefetched from the candidate's draft if it still fits
+        ai_response = prefetched_reply(
+            get_prefetcher().claim(session_id, user_message, len(engine.conversation_history))
+        )
+        if ai_response is not None:
+            engine.commit_response(user_message, ai_response)
+        else:
+            ai_response = engine.get_ai_response(user_message)
         
         # Store messages in session
-        session_data["messages"].append({
-            "role": "user",
-            "content": user_message
-        })
-        session_data["messages"].append({
-            "role": "assistant",
-            "content": ai_response
-        })
+        save_session(session_id, record, engine)
         
         return jsonify({
             "response": ai_response
@@ -136,41 +328,141 @@ def respond_to_interview(api_key):
         return jsonify({"error": str(e)}), 400
 
 
-@app.route("/api/interview/end", methods=["POST"])
+@app.route("/api/interview/respond/stream", methods=["POST"])
 @require_api_key
-def end_interview(api_key):
-    """End interview session and get feedback"""
+@limit_upstream
+def stream_interview_response(api_key):
+    """Send a response during interview and stream the AI reply as server-sent events"""
     try:
         data = request.get_json()
         session_id = data.get("session_id")
+        user_message = data.get("user_message")
         
-        if not session_id or session_id not in interview_sessions:
-            return jsonify({"error": "Invalid session"}), 400
-        
-        session_data = interview_sessions[session_id]
+        record, engine, error = load_session(session_id, api_key)
+        if error:
+            return error
         
-        # Verify API key matches
-        if session_data["api_key"] != api_key:
-            return jsonify({"error": "Invalid API key for this session"}), 401
+        if not user_message:
+            return jsonify({"error": "No message provided"}), 400
         
-        engine = session_data["engine"]
-        start_time = datetime.fromisoformat(session_data["start_time"])
-        duration = (datetime.now() - start_time).total_seconds()
+        if not engine.interview_started:
+            return jsonify({"error": "Interview not started"}), 400
         
-        # Get feedback from AI
-        feedback = engine.get_interview_feedback()
+        prefetch = get_prefetcher().claim(session_id, user_message, len(engine.conversation_history))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def generate():
+        # Once streaming, failures end the stream with an error event
+        try:
+            ai_response = prefetched_reply(prefetch)
+            if ai_response is not None:
+                engine.commit_response(user_message, ai_response)
+                yield _sse({"token": ai_response})
+            else:
+                chunks = []
+                for token in engine.stream_ai_response(user_message):
+                    chunks.append(token)
+                    yield _sse({"token": token})
+                ai_response = "".join(chunks)
+            
+            # Store messages in session only once the reply is complete
+            save_session(session_id, record, engine)
+        except Exception as e:
+            yield _sse({"error": str(e)}, event="error")
+            return
         
-        # Prepare response
-        response_data = {
-            "duration": f"{int(duration // 60)}m {int(duration % 60)}s",
-            "message_count": len(session_data["messages"]) // 2,
-            "feedback": feedback
+        yield _sse({"response": ai_response}, event="done")
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
         }
+    )
+
+
+@app.route("/api/interview/draft", methods=["POST"])
+@require_api_key
+def submit_draft(api_key):
+    """Receive the candidate's in-progress answer so the reply can be prefetched"""
+    try:
+        prefetcher = get_prefetcher()
+        if not prefetcher.enabled:
+            return jsonify({"enabled": False, "prefetching": False})
+        
+        data = request.get_json()
+        session_id = data.get("session_id")
+        draft = data.get("draft") or ""
         
-        # Clean up session
-        del interview_sessions[session_id]
+        record, engine, error = load_session(session_id, api_key)
+        if error:
+            return error
         
-        return jsonify(response_data)
+        prefetching = prefetcher.draft(
+            session_id,
+            draft,
+            len(engine.conversation_history),
+            engine.prefetch_response,
+            key=record["api_key_hash"]
+        )
+        return jsonify({"enabled": True, "prefetching": prefetching})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def _sse(payload, event=None):
+    """Format a payload as a server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+
+@app.route("/api/interview/end", methods=["POST"])
+@require_api_key
+@limit_rate
+def end_interview(api_key):
+    """End interview session and enqueue its feedback.
+
+    Returns the feedback job at once (202 while it runs); repeated calls
+    for the same session return the same job.
+    """
+    try:
+        data = request.get_json()
+        session_id = data.get("session_id")
+        dedupe_key = f"feedback:{session_id}"
+        
+        job = job_queue.find(dedupe_key, api_key)
+        if job is None or job["status"] == "failed":
+            record, _, error = load_session(session_id, api_key)
+            if error:
+                return error
+            
+            start_time = datetime.fromisoformat(record["start_time"])
+            duration = (datetime.now() - start_time).total_seconds()
+            job = job_queue.submit("feedback", feedback_payload(session_id, record, duration), api_key, dedupe_key)
+            get_prefetcher().discard(session_id)
+            if transcript_log is not None:
+                transcript_log.end(session_id)
+        
+        return jsonify(job), 200 if job["status"] == "done" else 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/api/interview/feedback", methods=["GET"])
+@require_api_key
+def get_feedback(api_key):
+    """Poll a feedback job; the result is included once it is done"""
+    try:
+        job_id = request.args.get("job_id")
+        
+        job = job_queue.get(job_id, api_key) if job_id else None
+        if job is None:
+            return jsonify({"error": "Unknown job"}), 404
+        
+        return jsonify(job)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -181,15 +473,14 @@ def get_interview_status():
     try:
         session_id = request.args.get("session_id")
         
-        if not session_id or session_id not in interview_sessions:
+        record = find_session(session_id)
+        if record is None:
             return jsonify({"error": "Invalid session"}), 404
         
-        session_data = interview_sessions[session_id]
-        
         return jsonify({
             "status": "active",
-            "persona_id": session_data["persona_id"],
-            "message_count": len(session_data["messages"])
+            "persona_id": record["persona_id"],
+            "message_count": len(record["engine"]["history"])
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -0,0 +1,581 @@
+"""
+ASGI Application for AI Mock Interview
+Serves the same /api/interview/* routes as the Flask app with non-blocking
+I/O, so one process can hold many concurrent interviews while they wait on
+the LLM. Run with: uvicorn asgi:app --app-dir src
+"""
+
+import asyncio
+import json
+import mimetypes
+import os
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from functools import partial
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import metrics
+from async_engine import AsyncInterviewEngine
+from http_client import close_async_client
+from interview_engine import InterviewEngine
+from jobs import feedback_job, feedback_payload, get_job_queue
+from persona_registry import get_registry
+from rate_limit import RateLimited, Ticket, get_limiter
+from session_store import create_session_store, hash_api_key
+from speculation import aprefetched_reply, get_prefetcher
+from transcript_log import get_transcript_log
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+# The registry re-encodes the catalog and its ETag only when personas change
+PERSONA_CACHE_MAX_AGE = int(os.getenv("PERSONA_CACHE_MAX_AGE", "300"))
+
+# Store active interview sessions (serialized, with TTL eviction)
+session_store = create_session_store()
+
+# Engine state that background tasks refresh after a turn (see export_state)
+BACKGROUND_STATE_KEYS = ("context", "evaluation")
+
+# Feedback is generated by background jobs; clients poll for the result
+job_queue = get_job_queue()
+job_queue.register("feedback", feedback_job(session_store))
+
+# Turns are also appended to a log, so sessions survive restarts and can
+# move between workers (None unless TRANSCRIPT_LOG_PATH is set)
+transcript_log = get_transcript_log()
+
+# Longest a feedback poll may wait for its job to finish
+FEEDBACK_MAX_WAIT = 30.0
+
+
+class HTTPError(Exception):
+    """Error that maps directly onto a JSON error response"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ---------------------------------------------------------------------------
+# Request/response helpers
+# ---------------------------------------------------------------------------
+
+async def _read_json(receive) -> Dict:
+    """Read and decode a JSON request body"""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError:
+        raise HTTPError(400, "Invalid JSON body")
+    return data if isinstance(data, dict) else {}
+
+
+async def _send_response(send, status: int, body: bytes, content_type: str, extra_headers=()) -> None:
+    """Send a complete HTTP response"""
+    headers = [
+        (b"content-type", content_type.encode()),
+        (b"content-length", str(len(body)).encode()),
+        (b"access-control-allow-origin", b"*"),
+        *extra_headers
+    ]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send, status: int, payload: Dict) -> None:
+    """Send a JSON response"""
+    await _send_response(send, status, json.dumps(payload).encode(), "application/json")
+
+
+def _sse(payload: Dict, event: Optional[str] = None) -> bytes:
+    """Format a payload as a server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n".encode()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    """Get a request header value by lowercase name"""
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _query_param(scope, name: str) -> Optional[str]:
+    """Get a query string parameter"""
+    from urllib.parse import parse_qs
+    values = parse_qs(scope.get("query_string", b"").decode()).get(name)
+    return values[0] if values else None
+
+
+def _require_api_key(scope) -> str:
+    """Require API key from request header"""
+    api_key = _header(scope, b"x-api-key")
+
+    if not api_key:
+        raise HTTPError(401, "API key required")
+
+    if not api_key.startswith("sk-or-v1-"):
+        raise HTTPError(401, "Invalid API key format")
+
+    return api_key
+
+
+async def _admit_upstream(api_key: str, session_id: Optional[str]) -> Ticket:
+    """Apply rate limits and wait for an upstream slot; RateLimited becomes a 429 or 503"""
+    return await get_limiter().aadmit(hash_api_key(api_key), session_id)
+
+
+def _find_session(session_id: Optional[str]) -> Optional[Dict]:
+    """Get a session record, replayed from the transcript log if this worker lost it or is behind"""
+    if not session_id:
+        return None
+    record = session_store.get(session_id)
+    if transcript_log is not None:
+        record = transcript_log.resume(session_id, record)
+    return record
+
+
+async def _run_blocking(fn: Callable, *args):
+    """Run a blocking session store, transcript log or job queue call off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, partial(fn, *args))
+
+
+async def _load_session(session_id: Optional[str], api_key: str) -> Tuple[Dict, AsyncInterviewEngine]:
+    """Load a session record, verify its API key and rebuild its engine"""
+    record = await _run_blocking(_find_session, session_id)
+    if record is None:
+        raise HTTPError(400, "Invalid session")
+
+    # Verify API key matches
+    if record["api_key_hash"] != hash_api_key(api_key):
+        raise HTTPError(401, "Invalid API key for this session")
+
+    engine = AsyncInterviewEngine.from_state(record["engine"], api_key=api_key)
+    engine.on_state_update = partial(_store_engine_state, session_id)
+    engine.session_id = session_id
+    return record, engine
+
+
+def _persist_session(session_id: str, record: Dict, engine: InterviewEngine) -> Optional[Future]:
+    """Store the engine state and queue its new turns for the transcript log"""
+    record["engine"] = engine.export_state()
+    written = transcript_log.log_session(session_id, record) if transcript_log is not None else None
+    with session_store.lock(session_id):
+        _keep_background_state(record, session_store.get(session_id))
+        session_store.set(session_id, record)
+    return written
+
+
+async def _save_session(session_id: str, record: Dict, engine: InterviewEngine) -> None:
+    """Persist the engine state back into the session record.
+
+    Returns once new turns are in the transcript log too; concurrent turns
+    share its disk flush.
+    """
+    written = await _run_blocking(_persist_session, session_id, record, engine)
+    if written is not None:
+        await asyncio.wrap_future(written)
+
+
+def _store_engine_state(session_id: str, key: str, state: Dict) -> None:
+    """Persist engine state refreshed in the background after a turn.
+
+    Only applied if it covers more of the history than the stored copy, so
+    a late background result never overwrites newer state.
+    """
+    with session_store.lock(session_id):
+        record = session_store.get(session_id)
+        if record is None:
+            return
+
+        stored = record["engine"].get(key) or {}
+        if _progress(stored) >= _progress(state):
+            return
+
+        record["engine"][key] = state
+        session_store.set(session_id, record)
+
+
+def _keep_background_state(record: Dict, stored: Optional[Dict]) -> None:
+    """Keep summary and evaluation state a background task stored while the request ran.
+
+    The request's engine was loaded before the task finished, so its copy
+    may cover fewer turns; whichever side covers more is kept.
+    """
+    if stored is None:
+        return
+    for key in BACKGROUND_STATE_KEYS:
+        state = stored["engine"].get(key) or {}
+        if _progress(state) > _progress(record["engine"].get(key) or {}):
+            record["engine"][key] = state
+
+
+def _progress(state: Dict) -> int:
+    """How many history messages a background state covers"""
+    return state.get("summarized_count", state.get("evaluated_count", 0))
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+
+_index_html: Optional[bytes] = None
+
+
+async def index(scope, receive, send) -> None:
+    """Render the main page (once per process; it has no per-request content)"""
+    global _index_html
+    if _index_html is None:
+        from jinja2 import Environment, FileSystemLoader
+
+        env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=True)
+        _index_html = env.get_template("index.html").render(
+            url_for=lambda endpoint, filename: f"/static/{filename}"
+        ).encode()
+    await _send_response(send, 200, _index_html, "text/html; charset=utf-8")
+
+
+async def static_file(scope, receive, send) -> None:
+    """Serve a file from the static directory"""
+    relative = scope["path"][len("/static/"):]
+    path = os.path.realpath(os.path.join(STATIC_DIR, relative))
+    if not path.startswith(os.path.realpath(STATIC_DIR) + os.sep) or not os.path.isfile(path):
+        raise HTTPError(404, "Not found")
+
+    with open(path, "rb") as f:
+        body = f.read()
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    await _send_response(send, 200, body, content_type)
+
+
+async def get_personas(scope, receive, send) -> None:
+    """Get available interview personas (no API key required)"""
+    persona_catalog = get_registry().catalog_json(PERSONA_CACHE_MAX_AGE)
+    cache_headers = tuple(
+        (name.lower().encode(), value.encode())
+        for name, value in persona_catalog.headers().items()
+    )
+    if persona_catalog.matches(_header(scope, b"if-none-match")):
+        await send({"type": "http.response.start", "status": 304, "headers": list(cache_headers)})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    await _send_response(send, 200, persona_catalog.body, "application/json", extra_headers=cache_headers)
+
+
+async def start_interview(scope, receive, send) -> None:
+    """Start a new interview session with user's API key"""
+    api_key = _require_api_key(scope)
+    data = await _read_json(receive)
+    persona_id = data.get("persona_id")
+
+    if not persona_id:
+        raise HTTPError(400, "persona_id not specified")
+
+    # Create new engine with user's API key
+    engine = AsyncInterviewEngine(api_key=api_key)
+    opening_question = engine.start_interview(persona_id)
+
+    # Store session with API key
+    session_id = f"session_{datetime.now().timestamp()}"
+    await _save_session(session_id, {
+        "api_key_hash": hash_api_key(api_key),
+        "persona_id": engine.persona_key,
+        "start_time": datetime.now().isoformat()
+    }, engine)
+
+    await _send_json(send, 200, {
+        "session_id": session_id,
+        "opening_question": opening_question,
+        "persona": {
+            "id": engine.current_persona.id,
+            "name": engine.current_persona.name,
+            "title": engine.current_persona.title,
+            "company": engine.current_persona.company
+        }
+    })
+
+
+async def respond_to_interview(scope, receive, send) -> None:
+    """Send a response during interview and get AI response"""
+    api_key = _require_api_key(scope)
+    data = await _read_json(receive)
+    session_id = data.get("session_id")
+    with await _admit_upstream(api_key, session_id):
+        record, engine = await _load_session(session_id, api_key)
+        user_message = data.get("user_message")
+
+        if not user_message:
+            raise HTTPError(400, "No message provided")
+
+        # Use the reply prefetched from the candidate's draft if it still fits
+        ai_response = await aprefetched_reply(
+            get_prefetcher().claim(session_id, user_message, len(engine.conversation_history))
+        )
+        if ai_response is not None:
+            engine.commit_response(user_message, ai_response)
+        else:
+            ai_response = await engine.get_ai_response(user_message)
+
+        # Store messages in session
+        await _save_session(session_id, record, engine)
+
+        await _send_json(send, 200, {"response": ai_response})
+
+
+async def stream_interview_response(scope, receive, send) -> None:
+    """Send a response during interview and stream the AI reply as server-sent events"""
+    api_key = _require_api_key(scope)
+    data = await _read_json(receive)
+    session_id = data.get("session_id")
+    with await _admit_upstream(api_key, session_id):
+        record, engine = await _load_session(session_id, api_key)
+        user_message = data.get("user_message")
+
+        if not user_message:
+            raise HTTPError(400, "No message provided")
+
+        if not engine.interview_started:
+            raise HTTPError(400, "Interview not started")
+
+        prefetch = get_prefetcher().claim(session_id, user_message, len(engine.conversation_history))
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+                (b"access-control-allow-origin", b"*")
+            ]
+        })
+
+        # The headers are out, so from here on failures end the stream with an error event
+        try:
+            ai_response = await aprefetched_reply(prefetch)
+            if ai_response is not None:
+                engine.commit_response(user_message, ai_response)
+                await send({"type": "http.response.body", "body": _sse({"token": ai_response}), "more_body": True})
+            else:
+                chunks = []
+                async for token in engine.stream_ai_response(user_message):
+                    chunks.append(token)
+                    await send({"type": "http.response.body", "body": _sse({"token": token}), "more_body": True})
+                ai_response = "".join(chunks)
+
+            # Store messages in session only once the reply is complete
+            await _save_session(session_id, record, engine)
+        except Exception as e:
+            await send({"type": "http.response.body", "body": _sse({"error": str(e)}, event="error")})
+            return
+
+        await send({"type": "http.response.body", "body": _sse({"response": ai_response}, event="done")})
+
+
+async def submit_draft(scope, receive, send) -> None:
+    """Receive the candidate's in-progress answer so the reply can be prefetched"""
+    api_key = _require_api_key(scope)
+    prefetcher = get_prefetcher()
+    if not prefetcher.enabled:
+        await _send_json(send, 200, {"enabled": False, "prefetching": False})
+        return
+
+    data = await _read_json(receive)
+    session_id = data.get("session_id")
+    record, engine = await _load_session(session_id, api_key)
+
+    # The prefetch runs on its own thread, so it uses the blocking engine
+    prefetching = prefetcher.draft(
+        session_id,
+        data.get("draft") or "",
+        len(engine.conversation_history),
+        InterviewEngine.from_state(record["engine"], api_key=api_key).prefetch_response,
+        key=record["api_key_hash"]
+    )
+    await _send_json(send, 200, {"enabled": True, "prefetching": prefetching})
+
+
+async def end_interview(scope, receive, send) -> None:
+    """End interview session and enqueue its feedback.
+
+    Returns the feedback job at once (202 while it runs); repeated calls
+    for the same session return the same job.
+    """
+    api_key = _require_api_key(scope)
+    data = await _read_json(receive)
+    session_id = data.get("session_id")
+    dedupe_key = f"feedback:{session_id}"
+    # Only enqueues a job, so it is rate limited but takes no upstream slot
+    get_limiter().check(hash_api_key(api_key), session_id)
+    job = await _run_blocking(job_queue.find, dedupe_key, api_key)
+    if job is None or job["status"] == "failed":
+        record, _ = await _load_session(session_id, api_key)
+
+        start_time = datetime.fromisoformat(record["start_time"])
+        duration = (datetime.now() - start_time).total_seconds()
+        job = await _run_blocking(
+            job_queue.submit, "feedback", feedback_payload(session_id, record, duration), api_key, dedupe_key
+        )
+        get_prefetcher().discard(session_id)
+        if transcript_log is not None:
+            transcript_log.end(session_id)
+
+    await _send_json(send, 200 if job["status"] == "done" else 202, job)
+
+
+async def get_feedback(scope, receive, send) -> None:
+    """Poll a feedback job; the result is included once it is done.
+
+    With ``wait`` (seconds) the poll is held until the job finishes or the
+    wait runs out, so clients learn of the result without polling again.
+    """
+    api_key = _require_api_key(scope)
+    job_id = _query_param(scope, "job_id")
+    try:
+        wait = min(float(_query_param(scope, "wait") or 0), FEEDBACK_MAX_WAIT)
+    except ValueError:
+        raise HTTPError(400, "Invalid wait")
+
+    if not job_id:
+        job = None
+    elif wait > 0:
+        job = await job_queue.wait(job_id, api_key, wait)
+    else:
+        job = await _run_blocking(job_queue.get, job_id, api_key)
+    if job is None:
+        raise HTTPError(404, "Unknown job")
+
+    await _send_json(send, 200, job)
+
+
+async def get_interview_status(scope, receive, send) -> None:
+    """Get status of current interview (for health check)"""
+    session_id = _query_param(scope, "session_id")
+
+    record = await _run_blocking(_find_session, session_id)
+    if record is None:
+        raise HTTPError(404, "Invalid session")
+
+    await _send_json(send, 200, {
+        "status": "active",
+        "persona_id": record["persona_id"],
+        "message_count": len(record["engine"]["history"])
+    })
+
+
+async def get_metrics(scope, receive, send) -> None:
+    """Expose request and upstream metrics in the Prometheus text format"""
+    await _send_response(send, 200, metrics.render().encode(), "text/plain; version=0.0.4")
+
+
+_voice_channel = None
+
+
+def get_voice_channel():
+    """Socket.IO server for spoken interviews, sharing the session store with the HTTP routes.
+
+    Created on the first /socket.io/ request so text-only deployments never
+    import the audio stack.
+    """
+    global _voice_channel
+    if _voice_channel is None:
+        from voice_socket import VoiceChannel
+        _voice_channel = VoiceChannel(_load_session, _save_session)
+    return _voice_channel
+
+Handler = Callable[..., Awaitable[None]]
+
+ROUTES: Dict[Tuple[str, str], Handler] = {
+    ("GET", "/"): index,
+    ("GET", "/metrics"): get_metrics,
+    ("GET", "/api/personas"): get_personas,
+    ("POST", "/api/interview/start"): start_interview,
+    ("POST", "/api/interview/respond"): respond_to_interview,
+    ("POST", "/api/interview/respond/stream"): stream_interview_response,
+    ("POST", "/api/interview/draft"): submit_draft,
+    ("POST", "/api/interview/end"): end_interview,
+    ("GET", "/api/interview/feedback"): get_feedback,
+    ("GET", "/api/interview/status"): get_interview_status,
+}
+
+
+async def _lifespan(receive, send) -> None:
+    """Handle ASGI lifespan events, closing pooled connections on shutdown"""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send) -> None:
+    """ASGI entry point"""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["path"].startswith("/socket.io/"):
+        await get_voice_channel().asgi(scope, receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"]
+
+    if method == "OPTIONS":
+        await _send_response(send, 204, b"", "text/plain", extra_headers=(
+            (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+            (b"access-control-allow-headers", b"Content-Type, X-API-Key"),
+        ))
+        return
+
+    if method == "GET" and path.startswith("/static/"):
+        handler, route = static_file, "/static/<path:filename>"
+    else:
+        handler = ROUTES.get((method, path))
+        route = path if handler else "unmatched"
+
+    status = [500]
+
+    async def send_tracked(message) -> None:
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+        await send(message)
+
+    received, started = time.time(), time.perf_counter()
+    metrics.HTTP_IN_FLIGHT.inc()
+    try:
+        if handler is None:
+            raise HTTPError(404, "Not found")
+        await handler(scope, receive, send_tracked)
+    except HTTPError as e:
+        await _send_json(send_tracked, e.status, {"error": e.message})
+    except RateLimited as e:
+        body = json.dumps({"error": str(e), "reason": e.reason, "retry_after": int(e.retry_after_header)}).encode()
+        await _send_response(send_tracked, e.status, body, "application/json", extra_headers=(
+            (b"retry-after", e.retry_after_header.encode()),
+        ))
+    except Exception as e:
+        await _send_json(send_tracked, 400, {"error": str(e)})
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec()
+        metrics.observe_http_request(
+            route, method, status[0], time.perf_counter() - started,
+            request_start=_header(scope, b"x-request-start"), received_at=received
+        )
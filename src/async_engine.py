@@ -0,0 +1,238 @@
+"""
+Async Interview Engine - asyncio counterpart of InterviewEngine
+Shares persona handling and prompt building with the sync engine but
+performs all OpenRouter calls with non-blocking I/O
+"""
+
+import sys
+from contextlib import AsyncExitStack
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from http_client import async_post, retry_count
+from interview_engine import FEEDBACK_MAX_REPAIRS, InterviewEngine
+from metrics import UpstreamCall
+from model_router import ModelUnavailable, StructuredOutputRejected, get_router
+from prompt_cache import encode_chat_payload
+from response_cache import get_completion_cache
+
+
+class AsyncInterviewEngine(InterviewEngine):
+    """Interview engine whose network operations are coroutines.
+
+    ``start_interview`` does no I/O and is inherited unchanged;
+    ``get_ai_response``, ``stream_ai_response``, ``get_interview_feedback``
+    and ``end_interview`` are awaitable. Rolling summary refreshes and
+    running evaluation updates run on the shared background thread pool,
+    off the event loop.
+    """
+
+    async def get_ai_response(self, user_input: str) -> str:
+        """Get AI response to user input during interview"""
+        if not self.interview_started or not self.current_persona:
+            raise ValueError("Interview not started. Call start_interview first.")
+
+        user_message = {"role": "user", "content": user_input}
+        payload = self._build_chat_payload(self._build_messages(pending=user_message))
+
+        ai_response = self._extract_content(await self._post_json("turn", payload, hedge=True))
+
+        self.conversation_history.append(user_message)
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": ai_response
+        })
+        self._after_turn()
+
+        return ai_response
+
+    async def stream_ai_response(self, user_input: str) -> AsyncIterator[str]:
+        """Stream the AI response token by token, committing history once complete"""
+        if not self.interview_started or not self.current_persona:
+            raise ValueError("Interview not started. Call start_interview first.")
+
+        import httpx
+
+        user_message = {"role": "user", "content": user_input}
+        payload = self._build_chat_payload(
+            self._build_messages(pending=user_message),
+            stream=True
+        )
+
+        # Hedging races models on time to first token
+        stack, deltas = await get_router().acall(
+            self.model,
+            "turn_stream",
+            partial(self._open_stream, payload),
+            hedge=True,
+            discard=lambda opened: opened[0].aclose()
+        )
+        chunks: List[str] = []
+        async with stack:
+            try:
+                async for delta in deltas:
+                    chunks.append(delta)
+                    yield delta
+            except httpx.HTTPError as e:
+                raise self._request_error(e)
+
+        self.conversation_history.append(user_message)
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": "".join(chunks)
+        })
+        self._after_turn()
+
+    async def _open_stream(self, payload: Dict, model: str) -> Tuple[AsyncExitStack, AsyncIterator[str]]:
+        """Open a streaming completion on one model and wait for its first token"""
+        import httpx
+
+        body = encode_chat_payload(dict(payload, model=model))
+        stack = AsyncExitStack()
+        try:
+            call = stack.enter_context(UpstreamCall("turn_stream", model, len(body)))
+            response = await stack.enter_async_context(async_post(
+                self.api_url,
+                headers=self.headers,
+                content=body,
+                timeout=self.timeout
+            ))
+            call.started(response.status_code, retry_count(response))
+            self._raise_for_status(response)
+            deltas = self._aiter_stream_deltas(response, call)
+            first = await deltas.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except httpx.HTTPError as e:
+            error = self._request_error(e)
+            await stack.__aexit__(type(error), error, None)
+            raise error
+        except BaseException:
+            await stack.__aexit__(*sys.exc_info())
+            raise
+        if first is None:
+            return stack, deltas
+        call.first_token()
+        return stack, self._prepend(first, deltas)
+
+    @staticmethod
+    async def _prepend(first: str, deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Yield an already-received delta ahead of the rest of the stream"""
+        yield first
+        async for delta in deltas:
+            yield delta
+
+    @classmethod
+    async def _aiter_stream_deltas(cls, response, call: Optional[UpstreamCall] = None) -> AsyncIterator[str]:
+        """Parse an OpenRouter server-sent event stream into content deltas"""
+        usage = None
+        async for line in response.aiter_lines():
+            done, delta, event_usage = cls._parse_stream_line(line)
+            usage = event_usage or usage
+            if done:
+                break
+            if delta:
+                yield delta
+        if call is not None:
+            call.finish(usage, response.num_bytes_downloaded)
+
+    @staticmethod
+    def _request_error(error: Exception) -> ValueError:
+        """Translate a transport error; timeouts and dropped connections may fall back"""
+        import httpx
+
+        if isinstance(error, httpx.TransportError):
+            return ModelUnavailable(f"API request failed: {str(error)}")
+        return ValueError(f"API request failed: {str(error)}")
+
+    async def get_interview_feedback(self) -> Dict[str, any]:
+        """Generate feedback from the running evaluation, finalizing unevaluated turns"""
+        if not self.conversation_history or not self.current_persona:
+            raise ValueError("No interview data available")
+
+        if not self.evaluation.is_current(self.conversation_history):
+            content = await self._acomplete(**self._finalization_request())
+            report, error = self._parse_feedback(content)
+            for _ in range(FEEDBACK_MAX_REPAIRS):
+                if error is None:
+                    break
+                content = await self._acomplete(**self._repair_request(error))
+                report, error = self._parse_feedback(content)
+            return self._finalize_feedback(report, content)
+
+        return self.evaluation.to_feedback()
+
+    async def end_interview(self) -> Dict[str, any]:
+        """End interview and get comprehensive feedback"""
+        if not self.interview_started:
+            raise ValueError("No active interview")
+
+        self.interview_started = False
+
+        return self._build_summary(await self.get_interview_feedback())
+
+    async def _acomplete(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict] = None,
+        cacheable: bool = False,
+        kind: str = "completion"
+    ) -> str:
+        """Run a single-prompt completion and return its text, optionally via the completion cache"""
+        payload = self._build_prompt_payload(prompt, max_tokens, temperature, response_format)
+        cache = get_completion_cache() if cacheable else None
+        if cache is not None:
+            cached = cache.get(payload)
+            if cached is not None:
+                return cached
+
+        content = self._extract_content(await self._post_json(kind, payload)).strip()
+
+        if cache is not None:
+            cache.set(payload, content)
+        return content
+
+    async def _post_json(self, kind: str, payload: Dict, hedge: bool = False) -> Dict:
+        """POST a non-streaming completion request and decode the JSON body.
+
+        Routed like the sync engine: fallback on timeouts, 429s and 5xx, and
+        optional hedging; a losing hedged request is cancelled mid-flight.
+        """
+        import httpx
+
+        router = get_router()
+
+        async def send(request: Dict) -> Dict:
+            body = encode_chat_payload(request)
+            with UpstreamCall(kind, request["model"], len(body)) as call:
+                try:
+                    async with async_post(
+                        self.api_url,
+                        headers=self.headers,
+                        content=body,
+                        timeout=self.timeout
+                    ) as response:
+                        call.started(response.status_code, retry_count(response))
+                        self._raise_for_structured_output(response, request)
+                        self._raise_for_status(response)
+                        await response.aread()
+                        data = response.json()
+                except httpx.HTTPError as e:
+                    raise self._request_error(e)
+                call.finish(data.get("usage"), len(response.content))
+                return data
+
+        async def attempt(model: str) -> Dict:
+            request = router.payload_for(payload, model)
+            try:
+                return await send(request)
+            except StructuredOutputRejected:
+                # Retried as plain JSON output, as in the sync engine
+                del request["response_format"]
+                data = await send(request)
+                router.reject_structured_output(model)
+                return data
+
+        return await router.acall(self.model, kind, attempt, hedge=hedge)
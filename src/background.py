@@ -0,0 +1,86 @@
+"""
+Shared background worker pool
+Runs best-effort work that should not hold up a request, such as rolling
+summary refreshes and running interview evaluation. Each task has a key
+(e.g. a session and the kind of work) and at most one task per key is
+queued or running, however many requests ask for it. The pool's backlog
+is bounded, and tasks that call upstream take a slot from the fair
+scheduler like any other request; work that cannot run is dropped, and
+the next turn asks again
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, Optional, Set
+
+from metrics import Counter, REGISTRY
+from rate_limit import get_limiter
+
+BACKGROUND_DROPPED = REGISTRY.register(Counter(
+    "background_tasks_dropped_total", "Background tasks skipped rather than run", ("reason",)))
+
+# Tasks queued or running at once; beyond this new tasks are dropped
+BACKGROUND_MAX_PENDING = int(os.getenv("BACKGROUND_MAX_PENDING", "64"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Keys of tasks queued or running
+_in_flight: Set[Hashable] = set()
+_in_flight_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the process-wide background executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("BACKGROUND_WORKERS", "4")),
+                    thread_name_prefix="interview-background"
+                )
+    return _executor
+
+
+def submit(key: Hashable, fn: Callable[[], None], admit: Optional[str] = None) -> bool:
+    """Run ``fn()`` on the background pool unless a task for ``key`` is pending.
+
+    With ``admit`` (a caller's rate-limit key) the task runs only if the
+    scheduler has a free upstream slot for it when it starts. Returns False
+    when the task was not queued; once queued it may still be dropped.
+    """
+    with _in_flight_lock:
+        if key in _in_flight:
+            return False
+        if len(_in_flight) >= BACKGROUND_MAX_PENDING:
+            BACKGROUND_DROPPED.inc(reason="queue_full")
+            return False
+        _in_flight.add(key)
+
+    def run() -> None:
+        ticket = None
+        try:
+            if admit is not None:
+                # A slot only: the turn that asked for the task already spent the
+                # key's rate-limit token, and the task never queues ahead of turns
+                ticket = get_limiter().scheduler.try_acquire(admit)
+                if ticket is None:
+                    BACKGROUND_DROPPED.inc(reason="throttled")
+                    return
+            fn()
+        finally:
+            if ticket is not None:
+                ticket.release()
+            with _in_flight_lock:
+                _in_flight.discard(key)
+
+    try:
+        get_executor().submit(run)
+    except RuntimeError:
+        # Interpreter shutting down
+        with _in_flight_lock:
+            _in_flight.discard(key)
+        return False
+    return True
@@ -0,0 +1,254 @@
+"""
+Batch evaluation of recorded interview transcripts
+Streams transcripts from a JSONL archive, scores them concurrently against
+the completions endpoint with the same feedback pipeline as live interviews,
+and appends one result per line as soon as it is ready. The output file is
+the checkpoint: rerunning with the same output skips transcripts already
+scored, so an interrupted run resumes where it stopped. Failed transcripts
+are retried on resume; a later line for an id supersedes earlier ones
+
+Input lines look like:
+    {"id": "cohort7-042", "persona_id": "tech", "history": [{"role": "user", "content": "..."}, ...]}
+
+Example:
+    python src/batch_evaluate.py transcripts.jsonl -o results.jsonl --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from async_engine import AsyncInterviewEngine
+from context_window import count_message_tokens, message_tokens
+from transcript import Transcript
+
+# Speaker labels seen in exported transcripts, mapped onto chat roles
+ROLE_ALIASES = {
+    "user": "user",
+    "candidate": "user",
+    "assistant": "assistant",
+    "interviewer": "assistant",
+}
+
+
+def read_transcripts(path: str, skip_ids: Optional[Set[str]] = None) -> Iterator[Dict]:
+    """Lazily read transcripts from a JSONL file, skipping already-scored ids.
+
+    Transcripts without an ``id`` are identified by their line number.
+    """
+    skip_ids = skip_ids or set()
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                transcript = json.loads(line)
+            except json.JSONDecodeError as e:
+                transcript = {"invalid": f"line {line_number}: {e}"}
+            transcript_id = str(transcript.get("id", f"line-{line_number}"))
+            if transcript_id in skip_ids:
+                continue
+            transcript["id"] = transcript_id
+            yield transcript
+
+
+def completed_ids(path: str, include_errors: bool = False) -> Set[str]:
+    """Ids already present in an output file; failed ones are retried unless included"""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A partial last line from an interrupted run
+                continue
+            if result.get("status") == "ok" or include_errors:
+                done.add(str(result["id"]))
+    return done
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def normalize_history(messages: Iterable[Dict]) -> list:
+    """Map a transcript's messages onto the engine's chat roles"""
+    history = []
+    for message in messages:
+        role = ROLE_ALIASES.get(str(message.get("role", "")).lower())
+        content = message.get("content")
+        if role is None or not isinstance(content, str):
+            raise ValueError(f"Unsupported message: {message!r}")
+        history.append({"role": role, "content": content})
+    return history
+
+
+def evaluation_slices(history: List[Dict[str, str]], budget: int) -> List[int]:
+    """Where to cut a transcript so each slice is evaluated within ``budget`` prompt tokens.
+
+    Returns the end of each slice. Cuts fall before a candidate answer
+    where possible, as live evaluation updates run after whole turns; a
+    single message over the budget gets a slice of its own.
+    """
+    ends: List[int] = []
+    start = used = 0
+    for index, message in enumerate(history):
+        cost = message_tokens(message)
+        if index > start and used + cost > budget:
+            cut = index - 1 if message["role"] == "assistant" and index - 1 > start else index
+            ends.append(cut)
+            used = count_message_tokens(history[cut:index])
+            start = cut
+        used += cost
+    ends.append(len(history))
+    return ends
+
+
+async def evaluate_transcript(transcript: Dict, api_key: str, model: Optional[str] = None) -> Dict:
+    """Score one transcript, returning a result record (never raises)"""
+    started = time.perf_counter()
+    result = {"id": transcript["id"], "persona_id": transcript.get("persona_id")}
+    try:
+        if "invalid" in transcript:
+            raise ValueError(f"Invalid JSON at {transcript['invalid']}")
+        if not transcript.get("persona_id"):
+            raise ValueError("persona_id not specified")
+
+        engine = AsyncInterviewEngine(api_key=api_key, model=model)
+        engine.start_interview(transcript["persona_id"])
+        history = normalize_history(transcript.get("history") or transcript.get("messages") or [])
+        # Like a live interview, fold the transcript into the evaluation a
+        # slice at a time, so long transcripts stay within the prompt budget
+        for end in evaluation_slices(history, engine.context.max_prompt_tokens):
+            engine.conversation_history = Transcript(history[:end])
+            result["feedback"] = await engine.get_interview_feedback()
+            if "raw_feedback" in result["feedback"]:
+                # Later slices would build on an evaluation that is not there;
+                # an error result is retried when the run is repeated
+                raise ValueError(f"Unparseable feedback for messages up to {end} of {len(history)}")
+        result["message_count"] = len(engine.conversation_history)
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+async def evaluate_stream(
+    transcripts: Iterable[Dict],
+    api_key: str,
+    concurrency: int = 16,
+    model: Optional[str] = None
+) -> AsyncIterator[Dict]:
+    """Score transcripts with at most ``concurrency`` in flight, yielding results as they finish.
+
+    Transcripts are pulled from the iterable only as workers free up, so
+    arbitrarily large archives are never held in memory.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    results: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def produce() -> None:
+        for transcript in transcripts:
+            await queue.put(transcript)
+        for _ in range(concurrency):
+            await queue.put(done)
+
+    async def work() -> None:
+        while True:
+            transcript = await queue.get()
+            if transcript is done:
+                await results.put(done)
+                return
+            await results.put(await evaluate_transcript(transcript, api_key, model))
+
+    tasks = [asyncio.ensure_future(produce())]
+    tasks += [asyncio.ensure_future(work()) for _ in range(concurrency)]
+    try:
+        finished = 0
+        while finished < concurrency:
+            result = await results.get()
+            if result is done:
+                finished += 1
+            else:
+                yield result
+        await tasks[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    api_key: str,
+    concurrency: int = 16,
+    model: Optional[str] = None,
+    retry_failed: bool = True,
+    on_result: Optional[Callable[[Dict], None]] = None
+) -> Dict[str, int]:
+    """Score an archive into an append-only JSONL output, resuming from earlier runs"""
+    skip = completed_ids(output_path, include_errors=not retry_failed)
+    counts = {"skipped": len(skip), "ok": 0, "error": 0}
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        if out.tell() and not _ends_with_newline(output_path):
+            # Close off a line cut short by an interrupted run
+            out.write("\n")
+        async for result in evaluate_stream(read_transcripts(input_path, skip), api_key, concurrency, model):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            # Flushed per line: the output doubles as the resume checkpoint
+            out.flush()
+            counts[result["status"]] += 1
+            if on_result:
+                on_result(result)
+        os.fsync(out.fileno())
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score recorded interview transcripts in bulk")
+    parser.add_argument("input", help="JSONL file of transcripts")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results file (appended to; also the checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=16, help="transcripts scored at once")
+    parser.add_argument("--model", help="model to score with (default: OPENROUTER_MODEL)")
+    parser.add_argument("--no-retry-failed", action="store_true", help="on resume, skip transcripts that failed before")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        sys.exit("OPENROUTER_API_KEY must be set")
+
+    started = time.perf_counter()
+
+    def progress(result: Dict) -> None:
+        marker = "ok " if result["status"] == "ok" else "ERR"
+        print(f"{marker} {result['id']} ({result['elapsed_ms']} ms)", file=sys.stderr)
+
+    counts = asyncio.run(run_batch(
+        args.input,
+        args.output,
+        api_key,
+        concurrency=args.concurrency,
+        model=args.model,
+        retry_failed=not args.no_retry_failed,
+        on_result=progress
+    ))
+    elapsed = time.perf_counter() - started
+    print(f"Scored {counts['ok']} transcripts ({counts['error']} failed, {counts['skipped']} already done) "
+          f"in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
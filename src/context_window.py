@@ -0,0 +1,163 @@
+"""
+Token-budgeted conversation window for interviewer turns
+Keeps the most recent turns verbatim and folds older turns into a rolling
+summary that is refreshed in the background, so prompt size stays bounded
+no matter how long the interview runs
+"""
+
+import os
+import threading
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+import background
+
+# Rough per-message framing overhead of chat formats (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to the estimator
+    _encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Count tokens with tiktoken when installed, otherwise estimate.
+
+    The estimate (~4 characters per token, never fewer than one token per
+    word) tracks cl100k-style tokenizers closely for English prose.
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(len(text) // 4, len(text.split()))
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """Estimate the prompt tokens of one chat message, using a precomputed count if present"""
+    tokens = getattr(message, "tokens", None)
+    if tokens is None:
+        tokens = estimate_tokens(message["content"])
+    return tokens + MESSAGE_OVERHEAD_TOKENS
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimate the prompt tokens of a list of chat messages"""
+    return sum(message_tokens(m) for m in messages)
+
+
+class ContextWindow:
+    """Selects which part of the history is sent upstream on each turn.
+
+    ``summary`` covers ``history[:summarized_count]``; everything after it
+    is sent verbatim, oldest turns dropped first if the token budget is
+    still exceeded (e.g. while a summary refresh is in flight).
+    """
+
+    def __init__(
+        self,
+        max_prompt_tokens: Optional[int] = None,
+        keep_turns: Optional[int] = None,
+        summary: str = "",
+        summarized_count: int = 0
+    ):
+        self.max_prompt_tokens = max_prompt_tokens or int(os.getenv("CONTEXT_MAX_PROMPT_TOKENS", "3000"))
+        # One turn is a user message plus the interviewer's reply
+        self.keep_turns = keep_turns or int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+        self.summary = summary
+        self.summarized_count = summarized_count
+        self._lock = threading.Lock()
+
+    def export_state(self) -> Dict[str, any]:
+        """Export the summary state for session storage"""
+        return {"summary": self.summary, "summarized_count": self.summarized_count}
+
+    def load_state(self, state: Optional[Dict[str, any]]) -> None:
+        """Restore summary state produced by export_state"""
+        if state:
+            self.summary = state.get("summary", "")
+            self.summarized_count = state.get("summarized_count", 0)
+
+    def build(
+        self,
+        system_messages: List[Dict[str, str]],
+        history: List[Dict[str, str]],
+        trailing: Sequence[Dict[str, str]] = ()
+    ) -> List[Dict[str, str]]:
+        """Build the messages for a turn within the token budget.
+
+        ``trailing`` messages (per-turn guidance) go after the history, so
+        the stable prefix stays cacheable; they count against the budget.
+        """
+        with self._lock:
+            summary, summarized_count = self.summary, self.summarized_count
+
+        prefix = list(system_messages)
+        if summary:
+            prefix.append({
+                "role": "system",
+                "content": f"Summary of the interview so far (earlier turns):\n{summary}"
+            })
+
+        recent = history[summarized_count:]
+        budget = self.max_prompt_tokens - count_message_tokens(prefix) - count_message_tokens(trailing)
+
+        # Walk backwards so the newest turns are always kept
+        kept: List[Dict[str, str]] = []
+        used = 0
+        for message in reversed(recent):
+            cost = message_tokens(message)
+            if kept and used + cost > budget:
+                break
+            kept.append(message)
+            used += cost
+        kept.reverse()
+
+        # Never open the verbatim window on an interviewer reply
+        while len(kept) > 1 and kept[0]["role"] == "assistant":
+            kept.pop(0)
+
+        return prefix + kept + list(trailing)
+
+    def needs_summary(self, history: List[Dict[str, str]]) -> bool:
+        """Whether enough turns have aged out of the verbatim window to fold"""
+        # Batch folds a few turns at a time so refreshes stay infrequent
+        fold_batch = 2 * max(1, self.keep_turns // 2)
+        return len(history) - self.summarized_count >= 2 * self.keep_turns + fold_batch
+
+    def schedule_summary(
+        self,
+        history: List[Dict[str, str]],
+        summarize: Callable[[str, List[Dict[str, str]]], str],
+        on_update: Optional[Callable[["ContextWindow"], None]] = None,
+        key: Optional[Hashable] = None,
+        admit: Optional[str] = None
+    ) -> bool:
+        """Fold aged-out turns into the summary on a background thread.
+
+        ``summarize(previous_summary, turns)`` produces the new summary.
+        ``key`` names the refresh across requests (by default this window)
+        and ``admit`` is the rate-limit key it runs under; see
+        background.submit. Returns False when no refresh is due or one for the key is pending.
+        """
+        with self._lock:
+            if not self.needs_summary(history):
+                return False
+            start = self.summarized_count
+            end = len(history) - 2 * self.keep_turns
+            previous_summary = self.summary
+            turns = list(history[start:end])
+
+        def refresh():
+            new_summary = summarize(previous_summary, turns)
+            with self._lock:
+                # Discard if another refresh already moved past this point
+                if self.summarized_count != start:
+                    return
+                self.summary = new_summary
+                self.summarized_count = end
+            if on_update:
+                on_update(self)
+
+        return background.submit(key if key is not None else (id(self), "summary"), refresh, admit)
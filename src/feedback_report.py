@@ -0,0 +1,272 @@
+"""
+Structured interview feedback
+Defines the FeedbackReport schema sent to the provider as a structured-output
+constraint, plus a tolerant single-pass extractor that recovers the JSON
+object from model output (markdown fences, surrounding prose, streamed
+chunks) and cheap local repairs before any model-side repair is attempted
+"""
+
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+# Score dimensions in the feedback report: key -> label used in prompts
+SCORE_DIMENSIONS = {
+    "technical_knowledge": "Technical/Domain Knowledge",
+    "communication": "Communication Skills",
+    "problem_solving": "Problem Solving",
+    "fit": "Fit with the company",
+}
+
+MAX_LIST_ITEMS = 5
+
+# An object key cut off before its value is complete: '"ke', '"key":' or '"key": tr'
+_DANGLING_KEY = re.compile(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*(?::\s*(?:t|tr|tru|f|fa|fal|fals|n|nu|nul)?)?$')
+
+FEEDBACK_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scores": {
+            "type": "object",
+            "properties": {
+                key: {"type": ["number", "null"], "minimum": 1, "maximum": 10}
+                for key in SCORE_DIMENSIONS
+            },
+            "required": list(SCORE_DIMENSIONS),
+            "additionalProperties": False
+        },
+        "strengths": {"type": "array", "items": {"type": "string"}, "maxItems": MAX_LIST_ITEMS},
+        "areas_for_improvement": {"type": "array", "items": {"type": "string"}, "maxItems": MAX_LIST_ITEMS},
+        "overall_assessment": {"type": "string"}
+    },
+    "required": ["scores", "strengths", "areas_for_improvement", "overall_assessment"],
+    "additionalProperties": False
+}
+
+# OpenRouter structured-output request parameter
+FEEDBACK_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "feedback_report",
+        "strict": True,
+        "schema": FEEDBACK_JSON_SCHEMA
+    }
+}
+
+
+class FeedbackParseError(ValueError):
+    """Model output could not be turned into a valid FeedbackReport"""
+
+    def __init__(self, errors: List[str], content: str):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+        self.content = content
+
+
+@dataclass
+class FeedbackReport:
+    """Typed end-of-interview feedback"""
+    scores: Dict[str, Optional[float]] = field(
+        default_factory=lambda: {key: None for key in SCORE_DIMENSIONS}
+    )
+    strengths: List[str] = field(default_factory=list)
+    areas_for_improvement: List[str] = field(default_factory=list)
+    overall_assessment: str = ""
+    # Measured speech-delivery numbers (voice interviews only), see speech_analytics
+    delivery: Optional[Dict[str, any]] = None
+
+    def to_dict(self) -> Dict[str, any]:
+        """Convert to the JSON shape returned by the API"""
+        data = asdict(self)
+        if data["delivery"] is None:
+            del data["delivery"]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, any]) -> "FeedbackReport":
+        """Validate and coerce a decoded object; raises ValueError listing every problem"""
+        errors = []
+
+        scores = {key: None for key in SCORE_DIMENSIONS}
+        raw_scores = data.get("scores")
+        if not isinstance(raw_scores, dict):
+            errors.append("'scores' must be an object")
+        else:
+            for key in SCORE_DIMENSIONS:
+                value = raw_scores.get(key)
+                if isinstance(value, str):
+                    try:
+                        value = float(value)
+                    except ValueError:
+                        pass
+                if value is None:
+                    continue
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    errors.append(f"'scores.{key}' must be a number from 1 to 10 or null")
+                    continue
+                scores[key] = max(1, min(10, value))
+
+        lists = {}
+        for key in ("strengths", "areas_for_improvement"):
+            value = data.get(key, [])
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list):
+                errors.append(f"'{key}' must be a list of strings")
+                value = []
+            lists[key] = [str(item) for item in value if item][:MAX_LIST_ITEMS]
+
+        overall = data.get("overall_assessment", "")
+        if not isinstance(overall, str):
+            errors.append("'overall_assessment' must be a string")
+            overall = ""
+
+        delivery = data.get("delivery")
+        if delivery is not None and not isinstance(delivery, dict):
+            errors.append("'delivery' must be an object")
+
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        return cls(
+            scores=scores,
+            strengths=lists["strengths"],
+            areas_for_improvement=lists["areas_for_improvement"],
+            overall_assessment=overall,
+            delivery=delivery
+        )
+
+
+class JSONObjectExtractor:
+    """Incrementally finds top-level JSON objects in streamed text.
+
+    Characters outside objects (prose, markdown fences) are skipped; braces
+    inside string literals are ignored. Each complete object is decoded
+    exactly once, as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume a chunk of text and return any objects it completed"""
+        objects = []
+        for char in chunk:
+            if self._depth == 0:
+                if char == "{":
+                    self._buffer = [char]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    obj = _loads_object("".join(self._buffer))
+                    if obj is not None:
+                        objects.append(obj)
+                    self._buffer = []
+        return objects
+
+    def partial(self) -> str:
+        """Text of the object still being read, if any"""
+        return "".join(self._buffer) if self._depth else ""
+
+
+def _loads_object(text: str) -> Optional[Dict]:
+    """Decode text as a JSON object, returning None if it is not one"""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def repair_json(text: str) -> str:
+    """Cheap local repairs for truncated or sloppy JSON objects.
+
+    Removes trailing commas, drops an object key left without its value,
+    and closes an unterminated string and any unbalanced brackets, which
+    covers completions cut off by max_tokens.
+    """
+    text = re.sub(r",\s*([}\]])", r"\1", text.strip())
+
+    closers = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+
+    if in_string:
+        text += '"'
+    text = re.sub(r",\s*$", "", text)
+    if closers and closers[-1] == "}":
+        text = _DANGLING_KEY.sub(lambda m: "{" if m.group(1) == "{" else "", text)
+    return text + "".join(reversed(closers))
+
+
+def extract_json_object(content: str) -> Optional[Dict]:
+    """Recover the first JSON object from model output, repairing it locally if needed"""
+    extractor = JSONObjectExtractor()
+    objects = extractor.feed(content)
+    if objects:
+        return objects[0]
+
+    # Truncated output: repair whatever object was still open
+    start = content.find("{")
+    if start == -1:
+        return None
+    candidate = content[start:].split("```")[0]
+    return _loads_object(repair_json(candidate))
+
+
+def parse_feedback_report(content: str) -> FeedbackReport:
+    """Parse model output into a FeedbackReport; raises FeedbackParseError"""
+    data = extract_json_object(content)
+    if data is None:
+        raise FeedbackParseError(["no JSON object found"], content)
+    try:
+        return FeedbackReport.from_dict(data)
+    except ValueError as e:
+        raise FeedbackParseError(str(e).split("; "), content)
+
+
+def build_repair_prompt(error: FeedbackParseError) -> str:
+    """Prompt asking the model to fix invalid feedback output against the schema"""
+    return f"""The following feedback was supposed to be a JSON object matching this schema but is invalid.
+
+Problems: {"; ".join(error.errors)}
+
+Schema:
+{json.dumps(FEEDBACK_JSON_SCHEMA)}
+
+Invalid output:
+{error.content[:4000]}
+
+Return only the corrected JSON object, keeping the original content."""
@@ -0,0 +1,214 @@
+"""
+Shared HTTP transport for OpenRouter API calls
+Provides a process-wide, connection-pooled session with keep-alive and
+retries (jittered exponential backoff on 429/5xx) that every engine borrows,
+plus an asyncio counterpart built on httpx for the async engine
+"""
+
+import asyncio
+import os
+import random
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Longest wait honoured from a Retry-After header; a retry holds a server
+# thread and an upstream slot while it sleeps
+MAX_RETRY_AFTER = float(os.getenv("OPENROUTER_MAX_RETRY_AFTER", "5"))
+
+# requests and httpx are imported on first use, keeping them off cold starts
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+
+def retry_status_codes() -> tuple:
+    """Statuses the transport retries itself.
+
+    With fallback models configured a 429 is answered by switching models
+    (see model_router) rather than by waiting out Retry-After.
+    """
+    if os.getenv("OPENROUTER_FALLBACK_MODELS"):
+        return tuple(code for code in RETRY_STATUS_CODES if code != 429)
+    return RETRY_STATUS_CODES
+
+
+def _build_retry() -> "Retry":
+    """Build the retry policy from environment configuration"""
+    from urllib3.util.retry import Retry
+
+    class CappedRetry(Retry):
+        """Retry that sleeps at most MAX_RETRY_AFTER whatever Retry-After asks for"""
+
+        def get_retry_after(self, response) -> Optional[float]:
+            retry_after = super().get_retry_after(response)
+            return None if retry_after is None else min(retry_after, MAX_RETRY_AFTER)
+
+    status_codes = retry_status_codes()
+    retry_kwargs = {
+        "total": int(os.getenv("OPENROUTER_MAX_RETRIES", "2")),
+        "connect": int(os.getenv("OPENROUTER_MAX_RETRIES", "2")),
+        "backoff_factor": float(os.getenv("OPENROUTER_BACKOFF_FACTOR", "0.5")),
+        "status_forcelist": status_codes,
+        # Chat completions are POSTs; a failed attempt is safe to replay
+        "allowed_methods": frozenset(["GET", "POST"]),
+        # urllib3 retries any 429 carrying Retry-After while this is set
+        # (waiting at most MAX_RETRY_AFTER)
+        "respect_retry_after_header": 429 in status_codes,
+        # Hand the final response back so callers surface the real status
+        "raise_on_status": False,
+    }
+    try:
+        return CappedRetry(
+            backoff_jitter=float(os.getenv("OPENROUTER_BACKOFF_JITTER", "0.25")),
+            **retry_kwargs
+        )
+    except TypeError:
+        # urllib3 < 2 has no backoff_jitter
+        return CappedRetry(**retry_kwargs)
+
+
+def create_session(pool_size: Optional[int] = None) -> "requests.Session":
+    """Create a pooled keep-alive session with retries mounted for HTTPS"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    pool_size = pool_size or int(os.getenv("OPENROUTER_POOL_SIZE", "32"))
+
+    # Past pool_maxsize connections (hedges, prefetches and background calls
+    # are not bounded by the scheduler) extra ones are opened and closed after
+    # use: requests has no pool timeout, so blocking could wait forever
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_size,
+        max_retries=_build_retry()
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def get_session() -> "requests.Session":
+    """Get the process-wide shared session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def retry_count(response) -> int:
+    """Number of retries the transport made before returning a response"""
+    extensions = getattr(response, "extensions", None)
+    if isinstance(extensions, dict):
+        return extensions.get("retries", 0)
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    return len(retries.history) if retries is not None else 0
+
+
+def close_session() -> None:
+    """Close the shared session and release pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+# ---------------------------------------------------------------------------
+# Async transport (httpx), used by AsyncInterviewEngine
+# ---------------------------------------------------------------------------
+
+_async_clients: Dict[int, "httpx.AsyncClient"] = {}
+
+
+def get_async_client():
+    """Get the pooled httpx client for the running event loop, creating it on first use"""
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError("The async engine requires httpx: pip install httpx") from e
+
+    loop_id = id(asyncio.get_running_loop())
+    client = _async_clients.get(loop_id)
+    if client is None or client.is_closed:
+        pool_size = int(os.getenv("OPENROUTER_POOL_SIZE", "32"))
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size
+                )
+            )
+        )
+        _async_clients[loop_id] = client
+    return client
+
+
+async def close_async_client() -> None:
+    """Close the httpx client bound to the running event loop"""
+    client = _async_clients.pop(id(asyncio.get_running_loop()), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Compute the backoff before the given retry attempt (1-based)"""
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_RETRY_AFTER)
+        except ValueError:
+            pass
+    backoff = float(os.getenv("OPENROUTER_BACKOFF_FACTOR", "0.5")) * (2 ** (attempt - 1))
+    jitter = float(os.getenv("OPENROUTER_BACKOFF_JITTER", "0.25"))
+    return backoff + random.uniform(0, jitter)
+
+
+@asynccontextmanager
+async def async_post(url: str, **kwargs) -> AsyncIterator["httpx.Response"]:
+    """POST with the async client, retrying 429/5xx with jittered backoff.
+
+    Yields a streaming response; callers read it with ``aread()`` or
+    ``aiter_lines()``. Retries only happen before any body is consumed.
+    """
+    import httpx
+
+    client = get_async_client()
+    max_retries = int(os.getenv("OPENROUTER_MAX_RETRIES", "2"))
+    status_codes = retry_status_codes()
+    attempt = 0
+    while True:
+        request = client.build_request("POST", url, **kwargs)
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.TransportError:
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            await asyncio.sleep(_retry_delay(attempt))
+            continue
+
+        if response.status_code in status_codes and attempt < max_retries:
+            attempt += 1
+            retry_after = response.headers.get("Retry-After")
+            await response.aclose()
+            await asyncio.sleep(_retry_delay(attempt, retry_after))
+            continue
+
+        response.extensions["retries"] = attempt
+        try:
+            yield response
+        finally:
+            await response.aclose()
+        return
@@ -6,179 +6,155 @@ Uses OpenRouter API for flexible model selection
 
 import json
 import os
-from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+import sys
+from contextlib import ExitStack
+from functools import partial
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
-from dotenv import load_dotenv
-import requests
 
-load_dotenv()
+from context_window import ContextWindow
+from feedback_report import (
+    FEEDBACK_RESPONSE_FORMAT,
+    FeedbackParseError,
+    FeedbackReport,
+    build_repair_prompt,
+    parse_feedback_report
+)
+from http_client import get_session, retry_count
+from metrics import UpstreamCall
+from model_router import ModelUnavailable, StructuredOutputRejected, get_router
+from persona_registry import InterviewPersona, get_registry
+from prompt_cache import (
+    CompiledMessage,
+    compile_system_message,
+    encode_chat_payload,
+    supports_cache_control
+)
+from response_cache import get_completion_cache
+from running_evaluation import RunningEvaluation
+from session_store import hash_api_key
+from transcript import Transcript
 
+# Serverless entry points get their environment from the platform and skip .env parsing
+if os.getenv("LOAD_DOTENV", "1") != "0":
+    from dotenv import load_dotenv
+    load_dotenv()
 
-@dataclass
-class InterviewPersona:
-    """Defines a specific interview persona with custom instructions"""
-    id: str
-    name: str
-    title: str
-    company: str
-    emoji: str
-    description: str
-    interview_type: str
-    system_prompt: str
-    difficulty_level: str  # beginner, intermediate, advanced
-    focus_areas: List[str]  # e.g., ["technical", "behavioral", "market_knowledge"]
-    opening_statement: str
+# Model-side repair attempts for feedback output that fails to parse
+FEEDBACK_MAX_REPAIRS = int(os.getenv("FEEDBACK_MAX_REPAIRS", "1"))
 
+# Upstream statuses that mean "try another model" rather than "bad request"
+FALLBACK_STATUS_CODES = (408, 429, 500, 502, 503, 504)
 
-class InterviewPersonaLibrary:
-    """Pre-configured interview personas"""
-    
-    MIT_ADMISSION = InterviewPersona(
-        id="mit",
-        name="Dr. Sarah Chen",
-        title="Admissions Officer",
-        company="MIT",
-        emoji="🎓",
-        description="College admission interview with MIT Admissions Officer",
-        interview_type="college_admission",
-        system_prompt="""You are Dr. Sarah Chen, an MIT Admissions Officer. Your role is to conduct a 
-        comprehensive interview assessing the candidate's intellectual curiosity, problem-solving ability, 
-        and fit with MIT's culture. Ask probing questions about their projects, achievements, and passion 
-        for learning. Evaluate their ability to think critically and innovate. Be encouraging but thorough.
-        Ask follow-up questions to understand their depth of thinking. The interview should last about 20-30 minutes.
-        """,
-        difficulty_level="advanced",
-        focus_areas=["technical_background", "problem_solving", "intellectual_curiosity", "fit_with_mit"],
-        opening_statement="Hi! I'm Dr. Sarah Chen from MIT Admissions. Thanks for taking the time to interview with me today. Why don't you start by telling me about a project or achievement you're particularly proud of?"
-    )
-    
-    FINANCE_BROKER = InterviewPersona(
-        id="finance",
-        name="James Mitchell",
-        title="Managing Director",
-        company="Goldman Sachs",
-        emoji="💼",
-        description="Investment banking interview with Goldman Sachs Managing Director",
-        interview_type="finance",
-        system_prompt="""You are James Mitchell, a Managing Director at a major investment bank. Conduct a 
-        professional interview assessing the candidate's understanding of financial markets, analytical skills, 
-        and ability to work in a high-pressure environment. Ask about market trends, recent deals, and their 
-        approach to problem-solving in finance. Test their knowledge of current events and financial instruments.
-        Be direct and professional. The interview should last about 30-45 minutes.
-        """,
-        difficulty_level="advanced",
-        focus_areas=["market_knowledge", "analytical_skills", "technical_finance", "client_management", "pressure_handling"],
-        opening_statement="Hello, I'm James Mitchell. Let's dive right in - can you walk me through your understanding of the current market conditions and how you'd advise a client in this environment?"
-    )
-    
-    TECH_STARTUP = InterviewPersona(
-        id="tech",
-        name="Alex Rivera",
-        title="CTO",
-        company="TechStartup Inc",
-        emoji="💻",
-        description="Tech startup CTO interview for engineering roles",
-        interview_type="tech",
-        system_prompt="""You are Alex Rivera, CTO of a growing tech startup. Interview candidates for engineering 
-        roles with focus on technical depth, system design, coding ability, and cultural fit. Ask about their 
-        experience with modern tech stacks, their approach to scaling systems, and past project experiences.
-        Be collaborative but assess technical competency thoroughly. Reference real-world scenarios and problems.
-        The interview should feel conversational but technically rigorous. Duration: 45-60 minutes.
-        """,
-        difficulty_level="advanced",
-        focus_areas=["system_design", "coding_ability", "tech_stack_knowledge", "scalability", "problem_solving"],
-        opening_statement="Hey! I'm Alex, the CTO here. We're looking for someone who can grow with us. Let's start with your most recent project - tell me about the architecture and your biggest challenge."
-    )
-    
-    HR_BEHAVIORAL = InterviewPersona(
-        id="hr",
-        name="Lisa Patel",
-        title="HR Manager",
-        company="General Company",
-        emoji="👥",
-        description="Behavioral interview with HR Manager",
-        interview_type="behavioral",
-        system_prompt="""You are Lisa Patel, an HR Manager conducting a behavioral interview. Focus on 
-        understanding the candidate's soft skills, teamwork, conflict resolution, and cultural fit. Use 
-        the STAR method to dig into their stories. Ask questions about past experiences, how they handle 
-        challenges, their communication style, and work preferences. Be warm but thorough. 
-        Duration: 25-40 minutes.
-        """,
-        difficulty_level="intermediate",
-        focus_areas=["soft_skills", "teamwork", "communication", "conflict_resolution", "cultural_fit"],
-        opening_statement="Hi there! I'm Lisa from HR. I'd love to learn about you - could you tell me about a time you had to work with a difficult team member? How did you handle it?"
-    )
-    
-    CASE_INTERVIEW = InterviewPersona(
-        id="case",
-        name="Michael Torres",
-        title="Senior Consultant",
-        company="McKinsey",
-        emoji="📊",
-        description="Case interview with McKinsey Senior Consultant",
-        interview_type="case_study",
-        system_prompt="""You are Michael Torres, a Senior Consultant at a top management consulting firm. 
-        Conduct case interview by presenting business problems and evaluating how the candidate thinks through them.
-        Test their analytical skills, business acumen, and communication. Present a business scenario and ask 
-        them to solve it step-by-step. Ask probing questions. Be exacting but fair.
-        Duration: 45-60 minutes.
-        """,
-        difficulty_level="advanced",
-        focus_areas=["analytical_thinking", "business_acumen", "problem_decomposition", "communication", "numeracy"],
-        opening_statement="Hello, I'm Michael from McKinsey. We have a case interview for you today. Let's say a major coffee chain is experiencing declining sales in urban markets. How would you approach understanding and solving this problem?"
-    )
+# Interviewer reply length, and the shorter one while upstream pressure degrades turns
+TURN_MAX_TOKENS = 500
+DEGRADED_MAX_TOKENS = int(os.getenv("OPENROUTER_DEGRADED_MAX_TOKENS", "250"))
+
+# Question bank items offered to the model per turn (0 turns the bank off)
+QUESTION_BANK_TOP_K = int(os.getenv("QUESTION_BANK_TOP_K", "3"))
+# Offered items are not offered again within this many suggestions
+QUESTION_BANK_MEMORY = 60
 
 
 class InterviewEngine:
     """Main engine for conducting AI-powered interviews"""
     
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        http_session: Optional["requests.Session"] = None
+    ):
         """Initialize the interview engine with OpenRouter client"""
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY not found in environment variables")
         
         # OpenRouter API configuration
-        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.api_url = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
         self.model = model or os.getenv("OPENROUTER_MODEL", "openai/gpt-3.5-turbo")
+        self.timeout = float(os.getenv("OPENROUTER_TIMEOUT", "30"))
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "HTTP-Referer": "http://localhost:5000",
             "X-Title": "AI Mock Interview",
             "Content-Type": "application/json"
         }
+        # Borrow the process-wide pooled transport unless one is injected
+        self._http = http_session
         
         self.current_persona: Optional[InterviewPersona] = None
-        self.conversation_history: List[Dict[str, str]] = []
+        self.persona_key: Optional[str] = None
+        self.conversation_history = Transcript()
+        self.context = ContextWindow()
+        self.evaluation = RunningEvaluation()
+        # Question bank items already offered, and those offered for the turn in flight
+        self.bank_used: List[int] = []
+        self._bank_offered: List[int] = []
+        # Called from a background thread as on_state_update(key, state) when
+        # the rolling summary ("context") or running evaluation changes
+        self.on_state_update: Optional[Callable[[str, Dict[str, any]], None]] = None
+        # Set when the engine serves a stored session; engines rebuilt for each
+        # request of that session then share one background task of each kind
+        self.session_id: Optional[str] = None
         self.interview_started = False
         self.start_time: Optional[datetime] = None
         
+    @property
+    def http(self) -> "requests.Session":
+        """Blocking HTTP transport, created on first use (requests is imported lazily)"""
+        if self._http is None:
+            self._http = get_session()
+        return self._http
+        
     def set_persona(self, persona: InterviewPersona) -> None:
         """Set the interview persona"""
         self.current_persona = persona
-        self.conversation_history = []
+        self.conversation_history = Transcript()
+        self.context = ContextWindow()
+        self.evaluation = RunningEvaluation()
+        self.bank_used = []
         
     def start_interview(self, persona_name: str) -> str:
         """Start a new interview session"""
-        persona_map = {
-            "mit": InterviewPersonaLibrary.MIT_ADMISSION,
-            "broker": InterviewPersonaLibrary.FINANCE_BROKER,
-            "tech": InterviewPersonaLibrary.TECH_STARTUP,
-            "hr": InterviewPersonaLibrary.HR_BEHAVIORAL,
-            "case": InterviewPersonaLibrary.CASE_INTERVIEW,
-        }
-        
-        if persona_name.lower() not in persona_map:
-            raise ValueError(f"Unknown persona: {persona_name}")
-        
-        persona = persona_map[persona_name.lower()]
+        persona = get_registry().get(persona_name)
         self.set_persona(persona)
+        self.persona_key = persona.id
+        # Compile the persona prompt now so the first turn hits the cache
+        self._system_message()
         self.interview_started = True
         self.start_time = datetime.now()
         
         return persona.opening_statement
     
+    def export_state(self) -> Dict[str, any]:
+        """Export a compact, JSON-serializable snapshot of the interview"""
+        return {
+            "persona_id": self.persona_key,
+            "history": self.conversation_history.to_list(),
+            "start_time": self.start_time.isoformat() if self.start_time else None,
+            "interview_started": self.interview_started,
+            "context": self.context.export_state(),
+            "evaluation": self.evaluation.export_state(),
+            "bank_used": self.bank_used
+        }
+    
+    @classmethod
+    def from_state(cls, state: Dict[str, any], api_key: Optional[str] = None, **kwargs) -> "InterviewEngine":
+        """Rebuild an engine from a snapshot produced by export_state"""
+        engine = cls(api_key=api_key, **kwargs)
+        if state.get("persona_id"):
+            engine.start_interview(state["persona_id"])
+        engine.conversation_history = Transcript(state.get("history", []))
+        engine.interview_started = state.get("interview_started", False)
+        engine.context.load_state(state.get("context"))
+        engine.evaluation.load_state(state.get("evaluation"))
+        engine.bank_used = list(state.get("bank_used", []))
+        if state.get("start_time"):
+            engine.start_time = datetime.fromisoformat(state["start_time"])
+        return engine
+    
     def get_ai_response(self, user_input: str) -> str:
         """Get AI response to user input during interview"""
         if not self.interview_started or not self.current_persona:
@@ -190,130 +166,471 @@ class InterviewEngine:
             "content": user_input
         })
         
-        # Create system message with persona
-        system_message = f"""You are {self.current_persona.name}, {self.current_persona.title} at {self.current_persona.company}.
-
-{self.current_persona.system_prompt}
-
-CRITICAL guidelines for natural, human-like conversation:
-- You are a REAL PERSON interviewing a candidate, not an AI
-- Stay completely in character - never mention you're an AI
-- Use natural speech patterns, contractions (you're, don't, can't), casual filler words (like, um, well)
-- Show genuine interest and emotion - React to their answers naturally
-- Ask spontaneous follow-up questions based on what they say
-- Reference their specific examples and build on them
-- Use body language cues (lean back, nod, smile) - write these as natural actions
-- Take occasional notes naturally ("Let me jot that down", "Good point")
-- Sometimes ask clarifying questions if something needs explanation
-- Use humor when appropriate - make it feel like a real conversation
-- Acknowledge good answers with genuine enthusiasm
-- Share relevant experiences or observations when natural
-- Keep responses to 2-3 sentences typically, longer when diving deep
-- Don't sound like you're reading from a script
-- Use occasional phrases like "You know", "Interesting", "That's great", "I see"
-- Show curiosity - ask about motivations, challenges, what they learned
-- Be conversational, warm, and professional - but genuinely human
-"""
-        
         # Prepare request payload for OpenRouter
-        payload = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_message},
-                *self.conversation_history
-            ],
-            "temperature": 0.7,
-            "max_tokens": 500,
-        }
+        payload = self._build_chat_payload(self._build_messages())
         
-        # Call OpenRouter API
-        try:
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if "error" in data:
-                raise ValueError(f"OpenRouter API error: {data['error']}")
-            
-            ai_response = data["choices"][0]["message"]["content"]
-            
-        except requests.exceptions.RequestException as e:
-            raise ValueError(f"API request failed: {str(e)}")
+        # Call OpenRouter API (hedged across models when enabled)
+        ai_response = self._extract_content(self._post_completion("turn", payload, hedge=True))
         
         # Add AI response to history
         self.conversation_history.append({
             "role": "assistant",
             "content": ai_response
         })
+        self._after_turn()
         
         return ai_response
     
-    def get_interview_feedback(self) -> Dict[str, any]:
-        """Generate feedback on interview performance"""
-        if not self.conversation_history or not self.current_persona:
-            raise ValueError("No interview data available")
+    def prefetch_response(self, draft: str) -> str:
+        """Compute the reply to a draft answer without touching the history"""
+        if not self.interview_started or not self.current_persona:
+            raise ValueError("Interview not started. Call start_interview first.")
         
-        # Create a summary of the conversation
-        conversation_summary = "\n".join([
-            f"{msg['role'].upper()}: {msg['content'][:200]}..."
-            for msg in self.conversation_history[-10:]  # Last 10 messages
-        ])
+        payload = self._build_chat_payload(
+            self._build_messages(pending={"role": "user", "content": draft})
+        )
+        return self._extract_content(self._post_completion("prefetch", payload))
+    
+    def commit_response(self, user_input: str, ai_response: str) -> None:
+        """Record an exchange whose reply was computed ahead of time"""
+        self.conversation_history.append({"role": "user", "content": user_input})
+        self.conversation_history.append({"role": "assistant", "content": ai_response})
+        self._after_turn()
+    
+    def stream_ai_response(self, user_input: str) -> Iterator[str]:
+        """Stream the AI response to user input token by token.
+
+        Yields content deltas as OpenRouter produces them. The exchange is
+        committed to ``conversation_history`` only once the completion has
+        finished, so an aborted stream leaves the history untouched.
+        """
+        import requests
+
+        if not self.interview_started or not self.current_persona:
+            raise ValueError("Interview not started. Call start_interview first.")
+        
+        user_message = {"role": "user", "content": user_input}
+        payload = self._build_chat_payload(
+            self._build_messages(pending=user_message),
+            stream=True
+        )
+        
+        # Hedging races models on time to first token
+        stack, deltas = get_router().call(
+            self.model,
+            "turn_stream",
+            partial(self._open_stream, payload),
+            hedge=True,
+            discard=lambda opened: opened[0].close()
+        )
+        chunks: List[str] = []
+        with stack:
+            try:
+                for delta in deltas:
+                    chunks.append(delta)
+                    yield delta
+            except requests.exceptions.RequestException as e:
+                raise self._request_error(e)
         
-        feedback_prompt = f"""Based on this {self.current_persona.interview_type} interview conversation:
+        self.conversation_history.append(user_message)
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": "".join(chunks)
+        })
+        self._after_turn()
+    
+    def _open_stream(self, payload: Dict, model: str) -> Tuple[ExitStack, Iterator[str]]:
+        """Open a streaming completion on one model and wait for its first token.
 
-{conversation_summary}
+        Returns the stack that closes the stream and an iterator over all
+        deltas, the first one included.
+        """
+        import requests
 
-Provide structured feedback on:
-1. Technical/Domain Knowledge (score 1-10)
-2. Communication Skills (score 1-10)
-3. Problem Solving (score 1-10)
-4. Fit with {self.current_persona.company} (score 1-10)
-5. Key Strengths (3-5 points)
-6. Areas for Improvement (3-5 points)
-7. Overall Assessment
+        body = encode_chat_payload(dict(payload, model=model))
+        stack = ExitStack()
+        try:
+            call = stack.enter_context(UpstreamCall("turn_stream", model, len(body)))
+            response = stack.enter_context(self.http.post(
+                self.api_url,
+                headers=self.headers,
+                data=body,
+                timeout=self.timeout,
+                stream=True
+            ))
+            call.started(response.status_code, retry_count(response))
+            self._raise_for_status(response)
+            deltas = self._iter_stream_deltas(response, call)
+            first = next(deltas, None)
+        except requests.exceptions.RequestException as e:
+            error = self._request_error(e)
+            stack.__exit__(type(error), error, None)
+            raise error
+        except BaseException:
+            stack.__exit__(*sys.exc_info())
+            raise
+        if first is None:
+            return stack, deltas
+        call.first_token()
+        return stack, chain([first], deltas)
+    
+    @staticmethod
+    def _raise_for_status(response) -> None:
+        """Raise for an error status, marking ones another model could serve"""
+        if response.status_code in FALLBACK_STATUS_CODES:
+            retry_after = response.headers.get("Retry-After")
+            raise ModelUnavailable(
+                f"API request failed: {response.status_code} from {response.url}",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+                rate_limited=response.status_code == 429
+            )
+        response.raise_for_status()
+    
+    @staticmethod
+    def _raise_for_structured_output(response, request: Dict) -> None:
+        """Raise StructuredOutputRejected for a 400 to a request carrying response_format"""
+        if response.status_code == 400 and "response_format" in request:
+            raise StructuredOutputRejected(f"{request['model']} rejected response_format")
+    
+    @staticmethod
+    def _request_error(error: Exception) -> ValueError:
+        """Translate a transport error; timeouts and dropped connections may fall back"""
+        import requests
 
-Format as JSON."""
+        if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return ModelUnavailable(f"API request failed: {str(error)}")
+        return ValueError(f"API request failed: {str(error)}")
+    
+    @classmethod
+    def _iter_stream_deltas(cls, response: "requests.Response", call: Optional[UpstreamCall] = None) -> Iterator[str]:
+        """Parse an OpenRouter server-sent event stream into content deltas"""
+        usage, received = None, 0
+        for line in response.iter_lines(decode_unicode=True):
+            received += len(line) + 1 if line else 1
+            done, delta, event_usage = cls._parse_stream_line(line)
+            usage = event_usage or usage
+            if done:
+                break
+            if delta:
+                yield delta
+        if call is not None:
+            call.finish(usage, received)
+    
+    @staticmethod
+    def _parse_stream_line(line: str) -> Tuple[bool, Optional[str], Optional[Dict]]:
+        """Parse one server-sent event line into (done, content delta, usage)"""
+        # Blank lines separate events; lines starting with ':' are
+        # keep-alive comments (e.g. ": OPENROUTER PROCESSING")
+        if not line or not line.startswith("data:"):
+            return False, None, None
+        
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return True, None, None
+        
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            return False, None, None
         
+        if "error" in event:
+            raise ValueError(f"OpenRouter API error: {event['error']}")
+        
+        # The final chunk carries token usage for the whole completion
+        usage = event.get("usage")
+        choices = event.get("choices") or []
+        if not choices:
+            return False, None, usage
+        
+        return False, choices[0].get("delta", {}).get("content"), usage
+    
+    @staticmethod
+    def _extract_content(data: Dict) -> str:
+        """Extract the completion text from a chat completions response body"""
+        if "error" in data:
+            raise ValueError(f"OpenRouter API error: {data['error']}")
+        
+        return data["choices"][0]["message"]["content"]
+    
+    def _build_chat_payload(self, messages: List[Dict[str, str]], stream: bool = False) -> Dict:
+        """Build the request payload for an interviewer turn"""
         payload = {
             "model": self.model,
-            "messages": [
-                {"role": "user", "content": feedback_prompt}
-            ],
-            "temperature": 0.5,
-            "max_tokens": 1000,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": DEGRADED_MAX_TOKENS if get_router().degraded else TURN_MAX_TOKENS,
         }
+        if stream:
+            payload["stream"] = True
+        return payload
+    
+    def _system_message(self) -> CompiledMessage:
+        """Get the precompiled system message for the current persona"""
+        return compile_system_message(
+            self.current_persona,
+            cache_control=supports_cache_control(self.model)
+        )
+    
+    def _build_messages(self, pending: Optional[Dict[str, str]] = None) -> List[Dict[str, str]]:
+        """Build the chat messages sent upstream, optionally with a not-yet-committed turn.
+
+        Older turns are replaced by the rolling summary and the rest is
+        trimmed to the context window's token budget.
+        """
+        history = self.conversation_history + [pending] if pending else self.conversation_history
+        guidance = self._question_bank_message(history)
+        return self.context.build(
+            [self._system_message()],
+            history,
+            [guidance] if guidance else ()
+        )
+    
+    def _question_bank_message(self, history: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        """Offer the model the persona's bank items closest to the latest exchange"""
+        self._bank_offered = []
+        if QUESTION_BANK_TOP_K <= 0 or not self.current_persona.question_bank:
+            return None
+        # NumPy is loaded only for personas that have a bank
+        from question_bank import get_question_bank
         
-        try:
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if "error" in data:
-                raise ValueError(f"OpenRouter API error: {data['error']}")
-            
-            feedback_content = data["choices"][0]["message"]["content"]
-            
+        bank = get_question_bank(self.current_persona)
+        if bank is None:
+            return None
+        query = " ".join(message["content"] for message in history[-2:])
+        hits = bank.search(query, QUESTION_BANK_TOP_K, exclude=self.bank_used)
+        if not hits:
+            return None
+        self._bank_offered = [item_id for item_id, _ in hits]
+        items = "\n".join(f"- ({item.kind.replace('_', ' ')}) {item.text}" for _, item in hits)
+        return {
+            "role": "system",
+            "content": "Items from your question bank that fit where the interview is. Use at most one, "
+                       "in your own words, and only if it follows naturally from the candidate's answer:\n"
+                       + items
+        }
+    
+    def _after_turn(self) -> None:
+        """Start background upkeep once a turn has been committed to history.
+
+        Refreshes the rolling summary if turns have aged out of the context
+        window and folds the new turn into the running evaluation. Turns
+        both have already covered are the first to go if the transcript
+        outgrows its memory cap.
+        """
+        self.conversation_history.trim(
+            min(self.context.summarized_count, self.evaluation.evaluated_count)
+        )
+        if self._bank_offered:
+            self.bank_used = (self.bank_used + self._bank_offered)[-QUESTION_BANK_MEMORY:]
+            self._bank_offered = []
+        self.context.schedule_summary(
+            self.conversation_history,
+            self._summarize,
+            self._notify_state("context", self.context),
+            key=self._background_key("summary"),
+            admit=hash_api_key(self.api_key)
+        )
+        self.evaluation.schedule_update(
+            self.current_persona,
+            self.conversation_history,
+            partial(
+                self._complete,
+                max_tokens=500,
+                temperature=0.3,
+                response_format=FEEDBACK_RESPONSE_FORMAT,
+                kind="evaluation"
+            ),
+            self._notify_state("evaluation", self.evaluation),
+            key=self._background_key("evaluation"),
+            admit=hash_api_key(self.api_key)
+        )
+    
+    def _background_key(self, kind: str) -> Optional[Tuple[str, str]]:
+        """Key of this session's background task of a kind; None without a session"""
+        return (self.session_id, kind) if self.session_id else None
+    
+    def _notify_state(self, key: str, component) -> Optional[Callable]:
+        """Wrap on_state_update as a callback for a background component"""
+        callback = self.on_state_update
+        if callback is None:
+            return None
+        return lambda _: callback(key, component.export_state())
+    
+    def _post_completion(self, kind: str, payload: Dict, hedge: bool = False) -> Dict:
+        """POST a non-streaming completion request and decode the JSON body.
+
+        The model router falls back to alternate models on timeouts, 429s and
+        5xx, and with ``hedge`` may race a second model. ``kind`` labels the
+        call in metrics (turn, summary, evaluation, ...).
+        """
+        import requests
+
+        router = get_router()
+
+        def send(request: Dict) -> Dict:
+            body = encode_chat_payload(request)
+            with UpstreamCall(kind, request["model"], len(body)) as call:
+                try:
+                    response = self.http.post(
+                        self.api_url,
+                        headers=self.headers,
+                        data=body,
+                        timeout=self.timeout
+                    )
+                    call.started(response.status_code, retry_count(response))
+                    self._raise_for_structured_output(response, request)
+                    self._raise_for_status(response)
+                    data = response.json()
+                except requests.exceptions.RequestException as e:
+                    raise self._request_error(e)
+                call.finish(data.get("usage"), len(response.content))
+                return data
+        
+        def attempt(model: str) -> Dict:
+            request = router.payload_for(payload, model)
             try:
-                feedback = json.loads(feedback_content)
-            except json.JSONDecodeError:
-                feedback = {"raw_feedback": feedback_content}
-            
-            return feedback
-            
-        except requests.exceptions.RequestException as e:
-            raise ValueError(f"API request failed: {str(e)}")
+                return send(request)
+            except StructuredOutputRejected:
+                # Not every model takes a strict schema; the feedback extractor
+                # and repair path cope with plain JSON output
+                del request["response_format"]
+                data = send(request)
+                router.reject_structured_output(model)
+                return data
+        
+        return router.call(self.model, kind, attempt, hedge=hedge)
+    
+    def _complete(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict] = None,
+        cacheable: bool = False,
+        kind: str = "completion"
+    ) -> str:
+        """Run a single-prompt completion and return its text.
+
+        With ``cacheable`` the result is served from / stored in the
+        content-addressed completion cache.
+        """
+        payload = self._build_prompt_payload(prompt, max_tokens, temperature, response_format)
+        cache = get_completion_cache() if cacheable else None
+        if cache is not None:
+            cached = cache.get(payload)
+            if cached is not None:
+                return cached
+        
+        content = self._extract_content(self._post_completion(kind, payload)).strip()
+        
+        if cache is not None:
+            cache.set(payload, content)
+        return content
+    
+    def _build_prompt_payload(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict] = None
+    ) -> Dict:
+        """Build the request payload for a single-prompt completion"""
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if response_format:
+            payload["response_format"] = response_format
+        return payload
+    
+    def _summarize(self, previous_summary: str, turns: List[Dict[str, str]]) -> str:
+        """Fold a batch of turns into the running interview summary"""
+        transcript = "\n".join(
+            f"{'CANDIDATE' if msg['role'] == 'user' else 'INTERVIEWER'}: {msg['content']}"
+            for msg in turns
+        )
+        prompt = f"""You are keeping notes on an ongoing {self.current_persona.interview_type} interview.
+
+Current notes:
+{previous_summary or "(none yet)"}
+
+New part of the conversation:
+{transcript}
+
+Rewrite the notes to include the new part. Keep the candidate's concrete examples, claims, numbers and
+weak spots, the questions already asked, and any case or scenario details still in play.
+Be concise: at most 200 words, plain prose."""
+        
+        return self._complete(prompt, max_tokens=350, temperature=0.3, kind="summary")
+    
+    def get_interview_feedback(self) -> Dict[str, any]:
+        """Generate feedback on interview performance.
+
+        Scores are kept up to date in the background after every turn, so
+        this usually just assembles the running evaluation. Turns that have
+        not been evaluated yet are folded in with one small completion.
+        """
+        if not self.conversation_history or not self.current_persona:
+            raise ValueError("No interview data available")
+        
+        if not self.evaluation.is_current(self.conversation_history):
+            content = self._complete(**self._finalization_request())
+            report, error = self._parse_feedback(content)
+            for _ in range(FEEDBACK_MAX_REPAIRS):
+                if error is None:
+                    break
+                # Ask for a fix of the broken output rather than a full regeneration
+                content = self._complete(**self._repair_request(error))
+                report, error = self._parse_feedback(content)
+            return self._finalize_feedback(report, content)
+        
+        return self.evaluation.to_feedback()
+
+    def set_delivery(self, delivery: Optional[Dict[str, any]]) -> None:
+        """Include speech-delivery analytics (voice interviews) in the feedback report"""
+        self.evaluation.set_delivery(delivery)
+
+    def _finalization_request(self) -> Dict[str, any]:
+        """Completion arguments that fold unevaluated turns into the evaluation"""
+        return {
+            "prompt": self.evaluation.build_prompt(self.current_persona, self.conversation_history),
+            "max_tokens": 500,
+            "temperature": 0.3,
+            "response_format": FEEDBACK_RESPONSE_FORMAT,
+            "kind": "feedback",
+            # Same history -> same request, so refreshes replay the cached result
+            "cacheable": True
+        }
+    
+    @staticmethod
+    def _repair_request(error: FeedbackParseError) -> Dict[str, any]:
+        """Completion arguments for a bounded repair of invalid feedback output"""
+        return {
+            "prompt": build_repair_prompt(error),
+            "max_tokens": 600,
+            "temperature": 0,
+            "response_format": FEEDBACK_RESPONSE_FORMAT,
+            "kind": "feedback_repair",
+            "cacheable": True
+        }
+    
+    @staticmethod
+    def _parse_feedback(content: str) -> Tuple[Optional[FeedbackReport], Optional[FeedbackParseError]]:
+        """Parse feedback output into a report, returning the parse error instead of raising"""
+        try:
+            return parse_feedback_report(content), None
+        except FeedbackParseError as e:
+            return None, e
+    
+    def _finalize_feedback(self, report: Optional[FeedbackReport], content: str) -> Dict[str, any]:
+        """Fold the final report into the running evaluation and assemble feedback"""
+        if report is not None:
+            self.evaluation.apply(report, len(self.conversation_history))
+        elif not self.evaluation.evaluated_count:
+            return {"raw_feedback": content}
+        return self.evaluation.to_feedback()
     
     def end_interview(self) -> Dict[str, any]:
         """End interview and get comprehensive feedback"""
@@ -322,55 +639,18 @@ Format as JSON."""
         
         self.interview_started = False
         
+        return self._build_summary(self.get_interview_feedback())
+    
+    def _build_summary(self, feedback: Dict[str, any]) -> Dict[str, any]:
+        """Build the end-of-interview summary around generated feedback"""
         return {
             "duration_seconds": (datetime.now() - self.start_time).total_seconds(),
-            "persona": asdict(self.current_persona) if self.current_persona else None,
+            "persona": self.current_persona.to_dict() if self.current_persona else None,
             "message_count": len(self.conversation_history),
-            "feedback": self.get_interview_feedback()
+            "feedback": feedback
         }
     
-    def get_available_personas(self) -> List[Dict[str, str]]:
+    @staticmethod
+    def get_available_personas() -> List[Dict[str, str]]:
         """Get list of available interview personas"""
-        personas = [
-            {
-                "id": "mit",
-                "name": "Dr. Sarah Chen",
-                "emoji": "🎓",
-                "title": "MIT Admissions Officer",
-                "company": "MIT",
-                "description": "Assess your intellectual curiosity and fit with MIT"
-            },
-            {
-                "id": "broker",
-                "name": "James Mitchell",
-                "emoji": "💼",
-                "title": "Senior Investment Manager",
-                "company": "Goldman Sachs",
-                "description": "Test your financial acumen and market knowledge"
-            },
-            {
-                "id": "tech",
-                "name": "Alex Rivera",
-                "emoji": "💻",
-                "title": "CTO & Co-Founder",
-                "company": "TechStart Inc",
-                "description": "Challenge your technical and system design skills"
-            },
-            {
-                "id": "hr",
-                "name": "Lisa Patel",
-                "emoji": "👥",
-                "title": "HR Director",
-                "company": "Fortune 500 Corp",
-                "description": "Evaluate your soft skills and cultural fit"
-            },
-            {
-                "id": "case",
-                "name": "Michael Torres",
-                "emoji": "📊",
-                "title": "Senior Management Consultant",
-                "company": "McKinsey & Co",
-                "description": "Solve complex business problems and case studies"
-            },
-        ]
-        return personas
+        return get_registry().catalog()
@@ -0,0 +1,364 @@
+"""
+Persistent background jobs for slow, session-scoped work
+Ending an interview enqueues a feedback job instead of generating the
+feedback inside the request: the request returns a job id at once and the
+client polls until the job is done. Jobs live in a local SQLite file, so
+queued and finished jobs survive restarts and are visible to every worker
+process on the host. Each job has a dedupe key, so a repeated request (a
+double-click on "End Interview") gets the existing job back
+
+API keys never reach the queue file: a job stores only the key's hash, and
+the key itself is held in memory by the process that accepted the job. A
+job orphaned by a restart is picked up by whichever process the client
+next polls with its key
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from interview_engine import InterviewEngine
+from metrics import Counter, Histogram, REGISTRY
+from session_store import hash_api_key
+
+logger = logging.getLogger("interview.jobs")
+
+JOBS_FINISHED = REGISTRY.register(Counter(
+    "jobs_finished_total", "Background jobs finished, by kind and outcome", ("kind", "status")))
+JOB_LATENCY = REGISTRY.register(Histogram(
+    "job_latency_seconds", "Time from enqueueing a job until it finished", ("kind",)))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Re-checked this often while idle, for jobs enqueued by other processes
+POLL_SECONDS = 1.0
+
+JobHandler = Callable[[Dict, str], Dict]
+
+
+class JobQueue:
+    """SQLite-backed job queue with an in-process worker pool.
+
+    Handlers are registered per job kind and called on a worker thread with
+    the job's payload and the API key it was submitted with; their return
+    value becomes the job's result. Finished jobs are kept for
+    ``ttl_seconds`` so clients can still collect the result; a job left
+    running longer than ``stale_seconds`` (its process died) may be run again.
+    With ``inline`` there are no worker threads: a job runs in the thread
+    that submits (or adopts) it, for platforms that freeze a process once
+    it has answered.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        workers: int = 2,
+        ttl_seconds: int = 3600,
+        stale_seconds: int = 300,
+        inline: bool = False
+    ):
+        self.path = path
+        self.workers = workers
+        self.inline = inline
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._handlers: Dict[str, JobHandler] = {}
+        # API keys of the jobs this process may run, by job id
+        self._keys: Dict[str, str] = {}
+        self._watchers: Dict[str, List[Callable[[], None]]] = {}
+        self._pending = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, dedupe_key TEXT UNIQUE, owner TEXT NOT NULL, "
+                "status TEXT NOT NULL, payload TEXT NOT NULL, result TEXT, error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Set the handler that runs jobs of a kind"""
+        self._handlers[kind] = handler
+
+    def _view(self, row: sqlite3.Row) -> Dict:
+        """What clients see of a job"""
+        job = {"job_id": row["id"], "status": row["status"]}
+        if row["status"] == DONE:
+            job["result"] = json.loads(row["result"])
+        elif row["status"] == FAILED:
+            job["error"] = row["error"]
+        return job
+
+    def _row(self, column: str, value: str) -> Optional[sqlite3.Row]:
+        return self._connect().execute(f"SELECT * FROM jobs WHERE {column} = ?", (value,)).fetchone()
+
+    def _runnable(self, row: sqlite3.Row) -> bool:
+        """Whether a job is waiting for a worker (or was abandoned by one)"""
+        return row["status"] == QUEUED or (
+            row["status"] == RUNNING and row["updated_at"] <= time.time() - self.stale_seconds)
+
+    def _hand_over(self, job_id: str, api_key: str) -> None:
+        """Let this process's workers run a job (or run it now, if inline)"""
+        with self._lock:
+            self._keys[job_id] = api_key
+        if self.inline:
+            while job_id in self._keys:
+                claimed = self._claim()
+                if claimed is None:
+                    break
+                self._run(*claimed)
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"interview-jobs-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self._pending.set()
+
+    def submit(self, kind: str, payload: Dict, api_key: str, dedupe_key: str) -> Dict:
+        """Enqueue a job, or return the job already holding ``dedupe_key``.
+
+        A failed job is queued again, so resubmitting is how clients retry.
+        Raises ValueError if the existing job belongs to another API key.
+        """
+        owner = hash_api_key(api_key)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at <= ?",
+                         (DONE, FAILED, now - self.ttl_seconds))
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, kind, dedupe_key, owner, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (uuid.uuid4().hex, kind, dedupe_key, owner, QUEUED,
+                 json.dumps(payload, separators=(",", ":")), now, now)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, payload = ?, error = NULL, created_at = ?, updated_at = ? "
+                "WHERE dedupe_key = ? AND status = ?",
+                (QUEUED, json.dumps(payload, separators=(",", ":")), now, now, dedupe_key, FAILED)
+            )
+        row = self._row("dedupe_key", dedupe_key)
+        if row["owner"] != owner:
+            raise ValueError("Invalid API key for this job")
+        if self._runnable(row):
+            self._hand_over(row["id"], api_key)
+            if self.inline:
+                row = self._row("id", row["id"])
+        return self._view(row)
+
+    def find(self, dedupe_key: str, api_key: str) -> Optional[Dict]:
+        """The job holding ``dedupe_key``, if it exists and belongs to the API key"""
+        row = self._row("dedupe_key", dedupe_key)
+        if row is None or row["owner"] != hash_api_key(api_key):
+            return None
+        return self._view(row)
+
+    def get(self, job_id: str, api_key: str) -> Optional[Dict]:
+        """A job's status (and result once done), if it belongs to the API key.
+
+        A waiting job that no process can run (its process restarted) is
+        adopted by this one, using the caller's key.
+        """
+        row = self._row("id", job_id)
+        if row is None or row["owner"] != hash_api_key(api_key):
+            return None
+        if self._runnable(row) and job_id not in self._keys:
+            self._hand_over(job_id, api_key)
+            if self.inline:
+                row = self._row("id", job_id)
+        return self._view(row)
+
+    async def wait(self, job_id: str, api_key: str, timeout: float) -> Optional[Dict]:
+        """Like ``get``, but waits up to ``timeout`` seconds for the job to finish"""
+        deadline = time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await loop.run_in_executor(None, self.get, job_id, api_key)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in (DONE, FAILED) or remaining <= 0:
+                return job
+
+            finished = loop.create_future()
+
+            def notify() -> None:
+                # Called from the worker thread that finished the job
+                loop.call_soon_threadsafe(lambda: finished.done() or finished.set_result(None))
+
+            with self._lock:
+                self._watchers.setdefault(job_id, []).append(notify)
+            try:
+                # Also re-read periodically: the job may run in another process
+                await asyncio.wait_for(finished, min(remaining, POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    watchers = self._watchers.get(job_id, [])
+                    if notify in watchers:
+                        watchers.remove(notify)
+                    if not watchers:
+                        self._watchers.pop(job_id, None)
+
+    def _claim(self) -> Optional[Tuple[sqlite3.Row, str]]:
+        """Mark the oldest job this process can run as running; returns it with its API key"""
+        with self._lock:
+            job_ids = list(self._keys)
+        if not job_ids:
+            return None
+        conn = self._connect()
+        now = time.time()
+        placeholders = ",".join("?" * len(job_ids))
+        rows = conn.execute(
+            f"SELECT * FROM jobs WHERE id IN ({placeholders}) "
+            "AND (status = ? OR (status = ? AND updated_at <= ?)) ORDER BY created_at",
+            (*job_ids, QUEUED, RUNNING, now - self.stale_seconds)
+        ).fetchall()
+        waiting = {row["id"] for row in rows}
+        with self._lock:
+            # The rest are done or being run elsewhere
+            for job_id in job_ids:
+                if job_id not in waiting:
+                    self._keys.pop(job_id, None)
+
+        for row in rows:
+            # Compare-and-set, so two workers (or processes) never take the same job
+            with conn:
+                claimed = conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE id = ? AND status = ? AND updated_at = ?",
+                    (RUNNING, now, row["id"], row["status"], row["updated_at"])
+                ).rowcount
+            with self._lock:
+                api_key = self._keys.pop(row["id"], None)
+            if claimed and api_key is not None:
+                return row, api_key
+        return None
+
+    def _work(self) -> None:
+        while True:
+            # Cleared before claiming, so a job submitted meanwhile is never missed
+            self._pending.clear()
+            claimed = self._claim()
+            if claimed is None:
+                self._pending.wait(POLL_SECONDS)
+            else:
+                self._run(*claimed)
+
+    def _run(self, row: sqlite3.Row, api_key: str) -> None:
+        job_id, kind = row["id"], row["kind"]
+        result = error = None
+        try:
+            handler = self._handlers.get(kind)
+            if handler is None:
+                raise ValueError(f"No handler for job kind: {kind}")
+            result = handler(json.loads(row["payload"]), api_key)
+            status = DONE
+        except Exception as e:
+            logger.warning("Job %s (%s) failed: %s", job_id, kind, e)
+            error = str(e)
+            status = FAILED
+
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, payload = ?, updated_at = ? WHERE id = ?",
+                # The payload is only needed to run the job again
+                (status, None if result is None else json.dumps(result), error,
+                 "{}" if status == DONE else row["payload"], time.time(), job_id)
+            )
+        JOBS_FINISHED.inc(kind=kind, status=status)
+        JOB_LATENCY.observe(time.time() - row["created_at"], kind=kind)
+        with self._lock:
+            watchers = self._watchers.pop(job_id, [])
+        for notify in watchers:
+            notify()
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue, configured from the environment"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(
+                    os.getenv("JOB_QUEUE_PATH", os.path.join(tempfile.gettempdir(), "interview-jobs.db")),
+                    workers=int(os.getenv("JOB_WORKERS", "2")),
+                    ttl_seconds=int(os.getenv("JOB_TTL_SECONDS", "3600")),
+                    stale_seconds=int(os.getenv("JOB_STALE_SECONDS", "300")),
+                    inline=os.getenv("JOB_INLINE", "0") == "1"
+                )
+    return _queue
+
+
+# ---------------------------------------------------------------------------
+# Interview feedback
+# ---------------------------------------------------------------------------
+
+def feedback_payload(session_id: str, record: Dict, duration_seconds: float) -> Dict:
+    """Payload of the job generating feedback for an ended interview"""
+    return {"session_id": session_id, "record": record, "duration_seconds": duration_seconds}
+
+
+def feedback_job(session_store) -> JobHandler:
+    """Handler for feedback jobs; drops the session from ``session_store`` once done.
+
+    The session is kept while the job can still fail, so ending the
+    interview again retries it.
+    """
+    def run(payload: Dict, api_key: str) -> Dict:
+        session_id, record = payload["session_id"], payload["record"]
+        engine = InterviewEngine.from_state(record["engine"], api_key=api_key)
+
+        voice = record.get("voice")
+        if voice and voice["answers"]:
+            # NumPy/librosa are loaded only for voice interviews
+            from speech_analytics import analyze_recording, recording_path
+
+            # A failure here only costs the report its delivery section
+            try:
+                engine.set_delivery(analyze_recording(recording_path(session_id), voice["answers"]))
+            except (OSError, ValueError) as e:
+                logger.warning("Delivery analytics failed for session %s: %s", session_id, e)
+
+        feedback = engine.get_interview_feedback()
+        duration = payload["duration_seconds"]
+        response_data = {
+            "duration": f"{int(duration // 60)}m {int(duration % 60)}s",
+            "message_count": len(engine.conversation_history) // 2,
+            "feedback": feedback
+        }
+
+        session_store.delete(session_id)
+        if voice:
+            from speech_analytics import delete_recording
+            delete_recording(session_id)
+        return response_data
+
+    return run
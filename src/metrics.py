@@ -0,0 +1,264 @@
+"""
+Lightweight metrics for the interview service
+In-process counters and histograms rendered in the Prometheus text format
+for a /metrics endpoint, upstream call instrumentation (time to first byte,
+total time, token usage, retries, payload sizes) and optional structured
+per-call logs enabled with UPSTREAM_LOG=1
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+turn_logger = logging.getLogger("interview.upstream")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return "\n".join(lines)
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, value: float = 1, **labels) -> None:
+        self.inc(-value, **labels)
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self) -> str:
+        return super().render().replace(f"# TYPE {self.name} counter", f"# TYPE {self.name} gauge")
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state):
+                    labels = _format_labels(self.labelnames, key, 'le="%g"' % bound)
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                count = state[len(self.buckets)]
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-1]:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return "\n".join(lines)
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    "upstream_requests_total", "Completion requests sent upstream", ("kind", "model", "status")))
+UPSTREAM_TTFB = REGISTRY.register(Histogram(
+    "upstream_ttfb_seconds", "Time to first byte (first token when streaming) of upstream calls", ("kind",)))
+UPSTREAM_DURATION = REGISTRY.register(Histogram(
+    "upstream_duration_seconds", "Total duration of upstream calls", ("kind",)))
+UPSTREAM_TOKENS = REGISTRY.register(Counter(
+    "upstream_tokens_total", "Tokens reported by upstream usage", ("kind", "type")))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    "upstream_retries_total", "Retries performed for upstream calls", ("kind",)))
+UPSTREAM_BYTES = REGISTRY.register(Counter(
+    "upstream_bytes_total", "Upstream payload bytes", ("kind", "direction")))
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests handled", ("route", "method", "status")))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Handler time of HTTP requests", ("route",)))
+HTTP_QUEUE = REGISTRY.register(Histogram(
+    "http_request_queue_seconds", "Time between the proxy's X-Request-Start and handling"))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"))
+
+
+def render() -> str:
+    """Render all metrics in the Prometheus text exposition format"""
+    return REGISTRY.render()
+
+
+def _log_enabled() -> bool:
+    return os.getenv("UPSTREAM_LOG", "").lower() in ("1", "true", "yes")
+
+
+class UpstreamCall:
+    """Measures one upstream completion call.
+
+    Use as a context manager around the request; call ``started`` once the
+    response headers arrive, ``first_token`` when streaming output begins
+    and ``finish`` with the usage block once the body has been read.
+    """
+
+    def __init__(self, kind: str, model: str, request_bytes: int = 0):
+        self.kind = kind
+        self.model = model
+        self.request_bytes = request_bytes
+        self.status: Optional[int] = None
+        self.retries = 0
+        self.ttfb: Optional[float] = None
+        self.usage: Dict[str, int] = {}
+        self.response_bytes = 0
+        self._start = time.perf_counter()
+
+    def __enter__(self) -> "UpstreamCall":
+        return self
+
+    def started(self, status: int, retries: int = 0) -> None:
+        """Response headers received"""
+        self.status = status
+        self.retries = retries
+        self.ttfb = time.perf_counter() - self._start
+
+    def first_token(self) -> None:
+        """First streamed token received; this is the latency users feel"""
+        self.ttfb = time.perf_counter() - self._start
+
+    def finish(self, usage: Optional[Dict] = None, response_bytes: int = 0) -> None:
+        """Response body fully read"""
+        self.usage = usage or {}
+        self.response_bytes = response_bytes
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self._start
+        status = self.status if self.status is not None else "error"
+        if exc_type is not None and issubclass(exc_type, (GeneratorExit, asyncio.CancelledError)):
+            # Abandoned by the caller, e.g. the losing side of a hedged request
+            status = "cancelled"
+        elif exc_type is not None and self.status is not None and self.status < 400:
+            status = "error"
+
+        UPSTREAM_REQUESTS.inc(kind=self.kind, model=self.model, status=status)
+        UPSTREAM_DURATION.observe(duration, kind=self.kind)
+        if self.ttfb is not None:
+            UPSTREAM_TTFB.observe(self.ttfb, kind=self.kind)
+        if self.retries:
+            UPSTREAM_RETRIES.inc(self.retries, kind=self.kind)
+        UPSTREAM_BYTES.inc(self.request_bytes, kind=self.kind, direction="sent")
+        UPSTREAM_BYTES.inc(self.response_bytes, kind=self.kind, direction="received")
+        for token_type in ("prompt", "completion"):
+            tokens = self.usage.get(f"{token_type}_tokens")
+            if tokens:
+                UPSTREAM_TOKENS.inc(tokens, kind=self.kind, type=token_type)
+
+        if _log_enabled():
+            turn_logger.info(json.dumps({
+                "event": "upstream_call",
+                "kind": self.kind,
+                "model": self.model,
+                "status": status,
+                "ttfb_ms": round(self.ttfb * 1000, 1) if self.ttfb is not None else None,
+                "duration_ms": round(duration * 1000, 1),
+                "prompt_tokens": self.usage.get("prompt_tokens"),
+                "completion_tokens": self.usage.get("completion_tokens"),
+                "retries": self.retries,
+                "request_bytes": self.request_bytes,
+                "response_bytes": self.response_bytes
+            }))
+        return False
+
+
+def parse_request_start(header: Optional[str]) -> Optional[float]:
+    """Parse an X-Request-Start header (``t=<epoch>`` in s, ms or us) into epoch seconds"""
+    if not header:
+        return None
+    value = header.strip()
+    if value.startswith("t="):
+        value = value[2:]
+    try:
+        stamp = float(value)
+    except ValueError:
+        return None
+    # Proxies send seconds (nginx), milliseconds (Heroku) or microseconds
+    while stamp > 1e11:
+        stamp /= 1000
+    return stamp
+
+
+def observe_http_request(route: str, method: str, status: int, duration: float,
+                         request_start: Optional[str] = None, received_at: Optional[float] = None) -> None:
+    """Record one handled HTTP request, plus queue time if the proxy stamped it"""
+    HTTP_REQUESTS.inc(route=route, method=method, status=status)
+    HTTP_DURATION.observe(duration, route=route)
+    queued_since = parse_request_start(request_start)
+    if queued_since is not None:
+        HTTP_QUEUE.observe(max(0.0, (received_at or time.time()) - queued_since))
@@ -0,0 +1,376 @@
+"""
+Multi-model routing for OpenRouter calls
+Tracks rolling latency and error rates per model, falls back to alternate
+models (OPENROUTER_FALLBACK_MODELS) when one times out or is rate limited,
+and can hedge interviewer turns: if the first model has not answered by its
+recent p95 latency, the next one is raced against it and the loser cancelled.
+Every call also feeds the adaptive concurrency limit; while it reports
+upstream pressure, turns go to OPENROUTER_DEGRADED_MODEL first and are not
+hedged
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, TypeVar
+
+from adaptive_limit import AdaptiveLimit, get_adaptive_limit
+from metrics import Counter, REGISTRY
+
+T = TypeVar("T")
+
+# Call kinds moved to the degraded model under upstream pressure
+DEGRADABLE_KINDS = ("turn", "turn_stream")
+
+MODEL_FALLBACKS = REGISTRY.register(Counter(
+    "upstream_fallbacks_total", "Calls moved to another model after a failure", ("model", "reason")))
+MODEL_HEDGES = REGISTRY.register(Counter(
+    "upstream_hedges_total", "Hedged requests issued, by which model won", ("outcome",)))
+
+
+class ModelUnavailable(ValueError):
+    """A model failed in a way worth retrying on another model (timeout, 429, 5xx)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, rate_limited: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.rate_limited = rate_limited
+
+
+class StructuredOutputRejected(ValueError):
+    """A model answered 400 to a request carrying response_format"""
+
+
+class ModelStats:
+    """Rolling latency and outcome window for one model"""
+
+    def __init__(self, window: int = 100):
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.cooldown_until = 0.0
+        self.window = window
+
+    def record(self, kind: str, latency: Optional[float], ok: bool) -> None:
+        self.outcomes.append(ok)
+        if ok and latency is not None:
+            self.latencies.setdefault(kind, deque(maxlen=self.window)).append(latency)
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def percentile(self, kind: str, pct: float) -> Optional[float]:
+        samples = self.latencies.get(kind)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class ModelRouter:
+    """Chooses which model serves a call and runs fallback/hedging around it.
+
+    Stats are process-wide and keyed by model; latency windows are kept per
+    call kind so streamed first-token times and full completions don't mix.
+    """
+
+    def __init__(
+        self,
+        fallback_models: Optional[List[str]] = None,
+        hedge: bool = False,
+        hedge_delay: float = 3.0,
+        hedge_min_delay: float = 0.25,
+        error_threshold: float = 0.5,
+        cooldown: float = 30.0,
+        min_samples: int = 5,
+        degraded_model: Optional[str] = None,
+        limit: Optional[AdaptiveLimit] = None
+    ):
+        self.fallback_models = list(fallback_models or [])
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.degraded_model = degraded_model
+        self.limit = limit
+        self._stats: Dict[str, ModelStats] = {}
+        # Models that rejected response_format; they are sent plain requests
+        self._plain_models: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _model_stats(self, model: str) -> ModelStats:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats.setdefault(model, ModelStats())
+        return stats
+
+    def is_healthy(self, model: str) -> bool:
+        """Whether a model is neither cooling down after a 429 nor mostly failing"""
+        with self._lock:
+            stats = self._model_stats(model)
+            if stats.cooldown_until > time.monotonic():
+                return False
+            return len(stats.outcomes) < self.min_samples or stats.error_rate() < self.error_threshold
+
+    def payload_for(self, payload: Dict, model: str) -> Dict:
+        """``payload`` addressed to ``model``, without a response_format the model rejected before"""
+        request = dict(payload, model=model)
+        if model in self._plain_models:
+            request.pop("response_format", None)
+        return request
+
+    def reject_structured_output(self, model: str) -> None:
+        """Send ``model`` later requests without response_format (it answered them with 400)"""
+        with self._lock:
+            self._plain_models.add(model)
+
+    @property
+    def degraded(self) -> bool:
+        """Whether upstream pressure calls for cheaper, shorter interviewer turns"""
+        return self.limit is not None and self.limit.degraded
+
+    def candidates(self, primary: str, kind: str = "turn") -> List[str]:
+        """Models to try for a call, best first; the primary leads while healthy"""
+        degrade = self.degraded_model and kind in DEGRADABLE_KINDS and self.degraded
+        lead = [self.degraded_model] if degrade else []
+        models = list(dict.fromkeys(lead + [primary] + self.fallback_models))
+
+        def rank(item: Tuple[int, str]):
+            index, model = item
+            with self._lock:
+                p50 = self._model_stats(model).percentile(kind, 50)
+            # Among fallbacks prefer the one that has been fastest lately
+            return (not self.is_healthy(model), index > 0, p50 if p50 is not None else float("inf"), index)
+
+        return [model for _, model in sorted(enumerate(models), key=rank)]
+
+    def record(self, model: str, kind: str, latency: Optional[float], error: Optional[ModelUnavailable] = None) -> None:
+        """Record the outcome of one call; ``error`` is the ModelUnavailable it failed with"""
+        with self._lock:
+            stats = self._model_stats(model)
+            stats.record(kind, latency, error is None)
+            if error is not None and error.rate_limited:
+                stats.cooldown_until = time.monotonic() + (error.retry_after or self.cooldown)
+        if self.limit is not None:
+            self.limit.observe(kind, model, latency, overloaded=error is not None)
+
+    def hedge_after(self, model: str, kind: str) -> float:
+        """How long to wait on a model before hedging: its recent p95 latency"""
+        with self._lock:
+            stats = self._model_stats(model)
+            samples = len(stats.latencies.get(kind, ()))
+            p95 = stats.percentile(kind, 95)
+        if p95 is None or samples < self.min_samples:
+            return self.hedge_delay
+        return max(self.hedge_min_delay, p95)
+
+    # -- synchronous calls ---------------------------------------------------
+
+    def call(
+        self,
+        primary: str,
+        kind: str,
+        attempt: Callable[[str], T],
+        hedge: bool = False,
+        discard: Optional[Callable[[T], None]] = None
+    ) -> T:
+        """Run ``attempt(model)`` with fallback, and hedging if enabled.
+
+        ``attempt`` raises ModelUnavailable for failures another model might
+        not have; any other exception is raised immediately. ``discard``
+        releases the result of a hedged attempt that lost the race.
+        """
+        models = self.candidates(primary, kind)
+        # Under pressure a hedge would only add load
+        if hedge and self.hedge and len(models) > 1 and not self.degraded:
+            return self._call_hedged(models, kind, attempt, discard)
+
+        last_error: Optional[ModelUnavailable] = None
+        for model in models:
+            try:
+                return self._timed(model, kind, attempt)
+            except ModelUnavailable as e:
+                last_error = e
+                MODEL_FALLBACKS.inc(model=model, reason="rate_limited" if e.rate_limited else "unavailable")
+        raise last_error
+
+    def _timed(self, model: str, kind: str, attempt: Callable[[str], T]) -> T:
+        """Run one attempt and record its latency and outcome; only ModelUnavailable counts as a failure"""
+        started = time.perf_counter()
+        try:
+            result = attempt(model)
+        except ModelUnavailable as e:
+            # Other errors (a caller's bad API key, a malformed request) say
+            # nothing about the model and must not mark it unhealthy for everyone
+            self.record(model, kind, None, e)
+            raise
+        self.record(model, kind, time.perf_counter() - started)
+        return result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=int(os.getenv("OPENROUTER_HEDGE_WORKERS", "16")),
+                        thread_name_prefix="interview-hedge"
+                    )
+        return self._executor
+
+    def _call_hedged(
+        self,
+        models: List[str],
+        kind: str,
+        attempt: Callable[[str], T],
+        discard: Optional[Callable[[T], None]]
+    ) -> T:
+        """Race models on worker threads, adding the next one after a hedge delay or a failure"""
+        executor = self._get_executor()
+        pending: Dict[Future, str] = {}
+        remaining = list(models)
+        last_error: Optional[Exception] = None
+
+        def launch() -> None:
+            model = remaining.pop(0)
+            if pending:
+                MODEL_HEDGES.inc(outcome="issued")
+            pending[executor.submit(self._timed, model, kind, attempt)] = model
+
+        hedged = False
+        launch()
+        while pending:
+            leader = next(iter(pending.values()))
+            timeout = self.hedge_after(leader, kind) if remaining else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                launch()
+                continue
+
+            for future in done:
+                model = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    if hedged:
+                        MODEL_HEDGES.inc(outcome="won_primary" if model == models[0] else "won_hedge")
+                    self._abandon(pending, discard)
+                    return future.result()
+                if not isinstance(error, ModelUnavailable):
+                    self._abandon(pending, discard)
+                    raise error
+                last_error = error
+                MODEL_FALLBACKS.inc(model=model, reason="rate_limited" if error.rate_limited else "unavailable")
+            if not pending and remaining:
+                launch()
+        raise last_error
+
+    @staticmethod
+    def _abandon(pending: Dict[Future, str], discard: Optional[Callable]) -> None:
+        """Cancel losing attempts, releasing their results once they finish"""
+        for future in pending:
+            if future.cancel() or discard is None:
+                continue
+            future.add_done_callback(
+                lambda f: discard(f.result()) if f.exception() is None else None
+            )
+
+    # -- asyncio calls -------------------------------------------------------
+
+    async def acall(
+        self,
+        primary: str,
+        kind: str,
+        attempt: Callable[[str], Awaitable[T]],
+        hedge: bool = False,
+        discard: Optional[Callable[[T], Awaitable[None]]] = None
+    ) -> T:
+        """Async counterpart of ``call``; losing hedged attempts are cancelled outright"""
+        models = self.candidates(primary, kind)
+        hedging = hedge and self.hedge and len(models) > 1 and not self.degraded
+        pending: Dict[asyncio.Task, str] = {}
+        remaining = list(models)
+        last_error: Optional[Exception] = None
+        hedged = False
+
+        def launch() -> None:
+            model = remaining.pop(0)
+            if pending:
+                MODEL_HEDGES.inc(outcome="issued")
+            pending[asyncio.ensure_future(self._atimed(model, kind, attempt))] = model
+
+        launch()
+        try:
+            while pending:
+                leader = next(iter(pending.values()))
+                timeout = self.hedge_after(leader, kind) if hedging and remaining else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+
+                for task in done:
+                    model = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if hedged:
+                            MODEL_HEDGES.inc(outcome="won_primary" if model == models[0] else "won_hedge")
+                        return task.result()
+                    if not isinstance(error, ModelUnavailable):
+                        raise error
+                    last_error = error
+                    MODEL_FALLBACKS.inc(model=model, reason="rate_limited" if error.rate_limited else "unavailable")
+                if not pending and remaining:
+                    launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                try:
+                    result = await task
+                except (asyncio.CancelledError, Exception):
+                    continue
+                if discard is not None:
+                    await discard(result)
+
+    async def _atimed(self, model: str, kind: str, attempt: Callable[[str], Awaitable[T]]) -> T:
+        """Run one async attempt and record its latency and outcome"""
+        started = time.perf_counter()
+        try:
+            result = await attempt(model)
+        except ModelUnavailable as e:
+            self.record(model, kind, None, e)
+            raise
+        self.record(model, kind, time.perf_counter() - started)
+        return result
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Get the process-wide model router, configured from the environment"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                fallbacks = os.getenv("OPENROUTER_FALLBACK_MODELS", "")
+                _router = ModelRouter(
+                    fallback_models=[m.strip() for m in fallbacks.split(",") if m.strip()],
+                    hedge=os.getenv("OPENROUTER_HEDGE", "").lower() in ("1", "true", "yes"),
+                    hedge_delay=float(os.getenv("OPENROUTER_HEDGE_DELAY", "3.0")),
+                    hedge_min_delay=float(os.getenv("OPENROUTER_HEDGE_MIN_DELAY", "0.25")),
+                    cooldown=float(os.getenv("OPENROUTER_RATE_LIMIT_COOLDOWN", "30")),
+                    degraded_model=os.getenv("OPENROUTER_DEGRADED_MODEL") or None,
+                    limit=get_adaptive_limit()
+                )
+    return _router
@@ -0,0 +1,284 @@
+"""
+Interview persona registry
+Personas are defined by files in PERSONA_DIR (default: personas/ at the repo
+root): ``<id>.json`` (or ``.yaml``/``.yml`` when PyYAML is installed) holds
+the metadata and ``<id>.md`` the system prompt body, which is read only when
+a prompt is first compiled. An optional ``<id>.questions.jsonl`` is the
+persona's question bank (see question_bank.py). The directory is re-scanned
+at most every PERSONA_RELOAD_SECONDS, so edited or added personas are picked
+up by running workers without a restart
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from prompt_cache import clear_compiled_prompts
+from response_cache import CachedJSON
+
+logger = logging.getLogger("interview.personas")
+
+DEFAULT_PERSONA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "personas")
+METADATA_EXTENSIONS = (".json", ".yaml", ".yml")
+QUESTION_BANK_SUFFIX = ".questions.jsonl"
+REQUIRED_FIELDS = ("id", "name", "title", "company", "interview_type", "opening_statement")
+
+# Fields shown on the persona picker
+CATALOG_FIELDS = ("id", "name", "emoji", "title", "company")
+
+
+class InterviewPersona:
+    """Defines a specific interview persona with custom instructions"""
+
+    __slots__ = (
+        "id", "name", "title", "company", "emoji", "description", "tagline",
+        "interview_type", "difficulty_level", "focus_areas", "opening_statement",
+        "aliases", "order", "question_bank", "version", "_system_prompt", "_prompt_path"
+    )
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        title: str,
+        company: str,
+        interview_type: str,
+        opening_statement: str,
+        emoji: str = "",
+        description: str = "",
+        tagline: Optional[str] = None,
+        difficulty_level: str = "intermediate",  # beginner, intermediate, advanced
+        focus_areas: Optional[List[str]] = None,  # e.g., ["technical", "behavioral"]
+        aliases: Optional[List[str]] = None,
+        order: int = 1000,
+        system_prompt: Optional[str] = None,
+        prompt_path: Optional[str] = None,
+        question_bank: Optional[str] = None,  # path of a question bank file
+        version: int = 0
+    ):
+        self.id = id
+        self.name = name
+        self.title = title
+        self.company = company
+        self.emoji = emoji
+        self.description = description
+        self.tagline = tagline or description
+        self.interview_type = interview_type
+        self.difficulty_level = difficulty_level
+        self.focus_areas = tuple(focus_areas or ())
+        self.opening_statement = opening_statement
+        self.aliases = tuple(aliases or ())
+        self.order = order
+        self.question_bank = question_bank
+        self.version = version
+        self._system_prompt = system_prompt
+        self._prompt_path = prompt_path
+
+    @property
+    def system_prompt(self) -> str:
+        """Persona-specific prompt body, read from disk on first use"""
+        if self._system_prompt is None:
+            if self._prompt_path is None:
+                return ""
+            with open(self._prompt_path, encoding="utf-8") as f:
+                self._system_prompt = f.read().strip()
+        return self._system_prompt
+
+    def to_dict(self) -> Dict[str, any]:
+        """Full persona definition, as included in interview summaries"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "title": self.title,
+            "company": self.company,
+            "emoji": self.emoji,
+            "description": self.description,
+            "interview_type": self.interview_type,
+            "system_prompt": self.system_prompt,
+            "difficulty_level": self.difficulty_level,
+            "focus_areas": list(self.focus_areas),
+            "opening_statement": self.opening_statement
+        }
+
+    def catalog_entry(self) -> Dict[str, str]:
+        """Card shown on the persona picker"""
+        entry = {field: getattr(self, field) for field in CATALOG_FIELDS}
+        entry["description"] = self.tagline
+        return entry
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    """Change signature of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_persona_file(path: str, version: int = 0) -> InterviewPersona:
+    """Parse one persona metadata file; its prompt body stays on disk until needed"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            data = json.load(f)
+        else:
+            try:
+                import yaml
+            except ImportError:  # YAML persona files are optional
+                raise ValueError("PyYAML is not installed")
+            data = yaml.safe_load(f)
+    if not isinstance(data, dict):
+        raise ValueError("persona file must contain a mapping")
+
+    missing = [field for field in REQUIRED_FIELDS if not data.get(field)]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+
+    data = dict(data)
+    stem = os.path.splitext(path)[0]
+    if "system_prompt" not in data:
+        data["prompt_path"] = stem + ".md"
+    if os.path.exists(stem + QUESTION_BANK_SUFFIX):
+        data["question_bank"] = stem + QUESTION_BANK_SUFFIX
+    try:
+        return InterviewPersona(version=version, **data)
+    except TypeError as e:
+        raise ValueError(str(e))
+
+
+class PersonaRegistry:
+    """Personas loaded from a directory, indexed by id and alias.
+
+    Lookups are lock-free reads of immutable indexes; a reload builds new
+    indexes, reparsing only files whose mtime or size changed, and swaps
+    them in. ``version`` increases whenever the set of personas changes.
+    """
+
+    def __init__(self, directory: str, reload_interval: float = 5.0):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.version = 0
+        # Metadata path -> (signature, persona or None if it failed to load)
+        self._files: Dict[str, Tuple[Tuple, Optional[InterviewPersona]]] = {}
+        self._personas: Dict[str, InterviewPersona] = {}
+        self._aliases: Dict[str, str] = {}
+        self._ordered: List[InterviewPersona] = []
+        self._catalog: Optional[Tuple[int, int, CachedJSON]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _scan(self) -> Dict[str, Tuple]:
+        """Metadata files in the directory with the signatures of them, their prompts and banks"""
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError as e:
+            logger.warning("Cannot read persona directory %s: %s", self.directory, e)
+            return {}
+        found = {}
+        for name in names:
+            stem, extension = os.path.splitext(name)
+            if extension not in METADATA_EXTENSIONS:
+                continue
+            path = os.path.join(self.directory, name)
+            prompt = os.path.join(self.directory, stem + ".md")
+            bank = os.path.join(self.directory, stem + QUESTION_BANK_SUFFIX)
+            found[path] = (_signature(path), _signature(prompt), _signature(bank))
+        return found
+
+    def reload(self) -> bool:
+        """Re-scan the directory now; returns whether anything changed"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            found = self._scan()
+            if found.keys() == self._files.keys() and all(
+                    self._files[path][0] == signature for path, signature in found.items()):
+                return False
+
+            version = self.version + 1
+            files: Dict[str, Tuple[Tuple, Optional[InterviewPersona]]] = {}
+            for path, signature in found.items():
+                previous = self._files.get(path)
+                if previous is not None and previous[0] == signature:
+                    files[path] = previous
+                    continue
+                try:
+                    files[path] = (signature, load_persona_file(path, version))
+                except (OSError, ValueError) as e:
+                    # Remembered so it is not reparsed until it changes again
+                    files[path] = (signature, None)
+                    logger.warning("Skipping persona file %s: %s", path, e)
+
+            personas: Dict[str, InterviewPersona] = {}
+            aliases: Dict[str, str] = {}
+            for path, (_, persona) in files.items():
+                if persona is None:
+                    continue
+                key = persona.id.lower()
+                if key in personas or key in aliases:
+                    logger.warning("Skipping persona file %s: duplicate id %r", path, persona.id)
+                    continue
+                personas[key] = persona
+                for alias in persona.aliases:
+                    aliases.setdefault(alias.lower(), key)
+
+            self._files = files
+            self._personas = personas
+            self._aliases = {alias: key for alias, key in aliases.items() if alias not in personas}
+            self._ordered = sorted(personas.values(), key=lambda p: (p.order, p.id))
+            self.version = version
+        # Compiled prompts embed persona text, so they go stale with it
+        clear_compiled_prompts()
+        return True
+
+    def refresh(self) -> None:
+        """Reload if the reload interval has passed since the last scan"""
+        if self.reload_interval >= 0 and time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+
+    def get(self, persona_id: str) -> InterviewPersona:
+        """Look up a persona by id or alias"""
+        self.refresh()
+        key = persona_id.lower()
+        persona = self._personas.get(key) or self._personas.get(self._aliases.get(key, ""))
+        if persona is None:
+            raise ValueError(f"Unknown persona: {persona_id}")
+        return persona
+
+    def all(self) -> List[InterviewPersona]:
+        """All personas in display order"""
+        self.refresh()
+        return list(self._ordered)
+
+    def catalog(self) -> List[Dict[str, str]]:
+        """Persona picker entries in display order"""
+        return [persona.catalog_entry() for persona in self.all()]
+
+    def catalog_json(self, max_age: int = 300) -> CachedJSON:
+        """The catalog encoded with its ETag, rebuilt only when personas change"""
+        self.refresh()
+        cached = self._catalog
+        if cached is None or cached[0] != self.version or cached[1] != max_age:
+            cached = (self.version, max_age, CachedJSON({"personas": self.catalog()}, max_age=max_age))
+            self._catalog = cached
+        return cached[2]
+
+
+_registry: Optional[PersonaRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> PersonaRegistry:
+    """Get the process-wide persona registry, configured from the environment"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PersonaRegistry(
+                    os.getenv("PERSONA_DIR", DEFAULT_PERSONA_DIR),
+                    reload_interval=float(os.getenv("PERSONA_RELOAD_SECONDS", "5"))
+                )
+    return _registry
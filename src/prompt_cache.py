@@ -0,0 +1,112 @@
+"""
+Precompiled persona system prompts
+Each persona's system message is built, JSON-encoded and token-counted once
+per process and reused across turns and sessions, optionally carrying
+provider prompt-caching markers so the static prefix is billed as cached
+"""
+
+import json
+import threading
+from typing import Dict, List, Tuple
+
+from context_window import estimate_tokens
+
+CONVERSATION_GUIDELINES = """CRITICAL guidelines for natural, human-like conversation:
+- You are a REAL PERSON interviewing a candidate, not an AI
+- Stay completely in character - never mention you're an AI
+- Use natural speech patterns, contractions (you're, don't, can't), casual filler words (like, um, well)
+- Show genuine interest and emotion - React to their answers naturally
+- Ask spontaneous follow-up questions based on what they say
+- Reference their specific examples and build on them
+- Use body language cues (lean back, nod, smile) - write these as natural actions
+- Take occasional notes naturally ("Let me jot that down", "Good point")
+- Sometimes ask clarifying questions if something needs explanation
+- Use humor when appropriate - make it feel like a real conversation
+- Acknowledge good answers with genuine enthusiasm
+- Share relevant experiences or observations when natural
+- Keep responses to 2-3 sentences typically, longer when diving deep
+- Don't sound like you're reading from a script
+- Use occasional phrases like "You know", "Interesting", "That's great", "I see"
+- Show curiosity - ask about motivations, challenges, what they learned
+- Be conversational, warm, and professional - but genuinely human
+"""
+
+# Providers that honour explicit cache_control breakpoints on OpenRouter;
+# OpenAI-style models cache identical prefixes automatically
+CACHE_CONTROL_PREFIXES = ("anthropic/", "google/gemini")
+
+_compiled: Dict[Tuple[str, int, bool], "CompiledMessage"] = {}
+_compile_lock = threading.Lock()
+
+
+class CompiledMessage(dict):
+    """Immutable chat message carrying its pre-encoded JSON and token count"""
+
+    __slots__ = ("encoded", "tokens")
+
+    def __init__(self, role: str, content, text: str):
+        super().__init__(role=role, content=content)
+        self.encoded = json.dumps(self, separators=(",", ":")).encode()
+        self.tokens = estimate_tokens(text)
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Compiled prompt messages are immutable")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+
+def supports_cache_control(model: str) -> bool:
+    """Whether the model needs explicit cache_control markers to cache a prefix"""
+    return model.startswith(CACHE_CONTROL_PREFIXES)
+
+
+def render_system_prompt(persona) -> str:
+    """Render the full system prompt text for a persona"""
+    return f"""You are {persona.name}, {persona.title} at {persona.company}.
+
+{persona.system_prompt}
+
+{CONVERSATION_GUIDELINES}"""
+
+
+def compile_system_message(persona, cache_control: bool = False) -> CompiledMessage:
+    """Get the compiled system message for a persona, building it on first use"""
+    # Keyed by version too, so an engine still holding a reloaded persona
+    # never serves or caches the other definition's prompt
+    key = (persona.id, getattr(persona, "version", 0), cache_control)
+    message = _compiled.get(key)
+    if message is None:
+        with _compile_lock:
+            message = _compiled.get(key)
+            if message is None:
+                text = render_system_prompt(persona)
+                content = text
+                if cache_control:
+                    content = [{
+                        "type": "text",
+                        "text": text,
+                        "cache_control": {"type": "ephemeral"}
+                    }]
+                message = CompiledMessage("system", content, text)
+                _compiled[key] = message
+    return message
+
+
+def clear_compiled_prompts() -> None:
+    """Drop all compiled prompts, e.g. after persona definitions change"""
+    with _compile_lock:
+        _compiled.clear()
+
+
+def encode_chat_payload(payload: Dict) -> bytes:
+    """Serialize a chat payload, splicing in pre-encoded compiled messages"""
+    messages: List = payload["messages"]
+    encoded_messages = b",".join(
+        m.encoded if isinstance(m, CompiledMessage) else json.dumps(m, separators=(",", ":")).encode()
+        for m in messages
+    )
+    rest = {k: v for k, v in payload.items() if k != "messages"}
+    rest_encoded = json.dumps(rest, separators=(",", ":")).encode()
+    if rest:
+        return b'{"messages":[' + encoded_messages + b"]," + rest_encoded[1:]
+    return b'{"messages":[' + encoded_messages + b"]}"
@@ -0,0 +1,314 @@
+"""
+Per-persona question and case banks with a local retrieval index
+A persona may ship ``<id>.questions.jsonl`` next to its metadata: one JSON
+object per line with the item's ``text``, its ``kind`` (question, case,
+follow_up, ...) and optional ``tags``. Each turn the engine looks up the
+few items closest to the latest exchange and hands them to the model, so
+interviews stay grounded with a short prompt and a cheaper model
+
+Items are sparse tf-idf vectors over hashed words and word pairs, so no
+embedding model or network is needed. They are kept in an inverted index
+(posting lists in flat NumPy arrays), and a lookup only touches the items
+sharing a feature with the query, which keeps it well under a millisecond
+at 100k items. Build large indexes offline with
+``python src/question_bank.py build``; they are saved as
+``<id>.questions.npz`` and rebuilt when missing or stale.
+
+Example:
+    python src/question_bank.py build personas/
+    python src/question_bank.py search personas/case.questions.jsonl "pricing a new product"
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("interview.question_bank")
+
+INDEX_VERSION = 1
+# Banks at least this large get their index saved when built on load
+SAVE_MIN_ITEMS = 4096
+# Below this similarity a match shares little more than a common word
+MIN_SCORE = 0.15
+# Postings a lookup may score; the commonest query features are skipped
+# beyond it, as they barely change the ranking and have the longest lists
+MAX_QUERY_POSTINGS = int(os.getenv("QUESTION_BANK_MAX_POSTINGS", "16384"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can could do does for from had has have how i if in into is it its "
+    "me my of on or our so that the their them then there these they this to was we were what when "
+    "where which who why will with would you your".split()
+)
+
+
+class BankItem(NamedTuple):
+    text: str
+    kind: str
+    tags: Tuple[str, ...]
+
+
+def _stem(word: str) -> str:
+    """Strip common English suffixes so inflections share a feature"""
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def hashed_features(text: str) -> np.ndarray:
+    """32-bit hashes of a text's stemmed words and word pairs, with repeats"""
+    words = [_stem(word) for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+    features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return np.fromiter((zlib.crc32(feature.encode()) for feature in features), dtype=np.uint32, count=len(features))
+
+
+class InvertedIndex:
+    """Cosine similarity search over tf-idf vectors stored as posting lists.
+
+    The postings of feature ``features[i]`` are ``items[starts[i]:starts[i + 1]]``,
+    with the items' unit-normalized tf-idf weights at the same positions in
+    ``weights``.
+    """
+
+    def __init__(
+        self,
+        features: np.ndarray,
+        starts: np.ndarray,
+        items: np.ndarray,
+        weights: np.ndarray,
+        idf: np.ndarray,
+        count: int
+    ):
+        self.features = features
+        self.starts = starts
+        self.items = items
+        self.weights = weights
+        self.idf = idf
+        self.count = count
+        self.max_postings = MAX_QUERY_POSTINGS
+
+    @classmethod
+    def build(cls, documents: Sequence[np.ndarray]) -> "InvertedIndex":
+        """Index the hashed features of each document (see hashed_features)"""
+        count = len(documents)
+        hashes = np.concatenate(documents) if count else np.zeros(0, dtype=np.uint32)
+        owners = np.repeat(np.arange(count, dtype=np.int32), [len(document) for document in documents])
+
+        # Group by feature, then item; runs of equal pairs give term frequencies
+        order = np.lexsort((owners, hashes))
+        hashes, owners = hashes[order], owners[order]
+        first = np.ones(len(hashes), dtype=bool)
+        first[1:] = (hashes[1:] != hashes[:-1]) | (owners[1:] != owners[:-1])
+        pair_starts = np.flatnonzero(first)
+        frequencies = np.diff(np.append(pair_starts, len(hashes)))
+        hashes, owners = hashes[pair_starts], owners[pair_starts]
+
+        features, starts, document_frequency = np.unique(hashes, return_index=True, return_counts=True)
+        idf = (np.log((count + 1) / (document_frequency + 1)) + 1).astype(np.float32)
+        weights = (1 + np.log(frequencies)) * np.repeat(idf, document_frequency)
+        norms = np.sqrt(np.bincount(owners, weights=weights ** 2, minlength=count))
+        weights = (weights / np.maximum(norms[owners], 1e-12)).astype(np.float32)
+        return cls(features, np.append(starts, len(owners)), owners, weights, idf, count)
+
+    def search(self, hashes: np.ndarray, k: int, exhaustive: bool = False) -> List[Tuple[int, float]]:
+        """Up to ``k`` (item id, similarity) pairs for a query's hashed features, most similar first.
+
+        Features are scored rarest first until ``max_postings`` is spent;
+        ``exhaustive`` scores them all.
+        """
+        query, frequencies = np.unique(hashes, return_counts=True)
+        positions = np.searchsorted(self.features, query)
+        known = positions < len(self.features)
+        known[known] = self.features[positions[known]] == query[known]
+        positions, frequencies = positions[known], frequencies[known]
+        if not len(positions):
+            return []
+        query_weights = (1 + np.log(frequencies)) * self.idf[positions]
+        query_weights /= np.linalg.norm(query_weights)
+
+        # Rarest features first: they say the most and have the shortest lists
+        lengths = self.starts[positions + 1] - self.starts[positions]
+        order = np.argsort(lengths, kind="stable")
+        budget = None if exhaustive else self.max_postings
+        items, weights = [], []
+        for position, query_weight, length in zip(positions[order], query_weights[order], lengths[order]):
+            if budget is not None:
+                if items and length > budget:
+                    break
+                budget -= length
+            start, end = self.starts[position], self.starts[position + 1]
+            items.append(self.items[start:end])
+            weights.append(self.weights[start:end] * query_weight)
+        if not items:
+            return []
+        items = np.concatenate(items)
+        scores = np.bincount(items, weights=np.concatenate(weights))[items]
+        # An item appears once per list it is in, so the top k items are
+        # among the top k * lists postings (cheaper than scanning all scores)
+        best = min(len(items), k * len(weights))
+        best = np.argpartition(scores, -best)[-best:]
+        top: Dict[int, float] = {}
+        for position in best[np.argsort(scores[best])[::-1]]:
+            top.setdefault(int(items[position]), float(scores[position]))
+            if len(top) == k:
+                break
+        return list(top.items())
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"features": self.features, "starts": self.starts, "items": self.items,
+                "weights": self.weights, "idf": self.idf}
+
+
+def _digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def index_path(bank_path: str) -> str:
+    """Where the precomputed index of a bank file is kept"""
+    return os.path.splitext(bank_path)[0] + ".npz"
+
+
+def load_items(path: str) -> List[BankItem]:
+    """Parse a bank file, skipping blank lines"""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if not isinstance(data, dict) or not data.get("text"):
+                raise ValueError(f"{path}:{number}: each line needs a text")
+            items.append(BankItem(data["text"], data.get("kind", "question"), tuple(data.get("tags", ()))))
+    return items
+
+
+def _index_items(items: Sequence[BankItem]) -> InvertedIndex:
+    return InvertedIndex.build([hashed_features(" ".join((item.text,) + item.tags)) for item in items])
+
+
+def build_index(bank_path: str, items: Optional[Sequence[BankItem]] = None) -> InvertedIndex:
+    """Index a bank file and save the index next to it"""
+    items = load_items(bank_path) if items is None else items
+    index = _index_items(items)
+    np.savez(index_path(bank_path), source=np.array(_digest(bank_path)),
+             version=np.array([INDEX_VERSION, len(items)]), **index.arrays())
+    return index
+
+
+def _load_index(bank_path: str, count: int) -> Optional[InvertedIndex]:
+    """The saved index of a bank file, or None if it is missing or stale"""
+    try:
+        with np.load(index_path(bank_path)) as data:
+            if data["version"].tolist() != [INDEX_VERSION, count] or str(data["source"]) != _digest(bank_path):
+                return None
+            return InvertedIndex(data["features"], data["starts"], data["items"],
+                                 data["weights"], data["idf"], count)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class QuestionBank:
+    """A persona's bank items and their index"""
+
+    def __init__(self, items: Sequence[BankItem], index: InvertedIndex):
+        self.items = list(items)
+        self.index = index
+
+    @classmethod
+    def load(cls, path: str) -> "QuestionBank":
+        """Load a bank file with its saved index, building the index if needed"""
+        items = load_items(path)
+        index = _load_index(path, len(items))
+        if index is None and len(items) < SAVE_MIN_ITEMS:
+            # Small banks index in milliseconds; nothing worth saving
+            index = _index_items(items)
+        elif index is None:
+            started = time.perf_counter()
+            try:
+                index = build_index(path, items)
+            except OSError:
+                # Read-only deployments rebuild it in memory on every start
+                index = _index_items(items)
+            logger.info("Built question bank index for %s in %.1fs", path, time.perf_counter() - started)
+        return cls(items, index)
+
+    def search(
+        self,
+        text: str,
+        k: int,
+        exclude: Sequence[int] = (),
+        min_score: float = MIN_SCORE
+    ) -> List[Tuple[int, BankItem]]:
+        """Up to ``k`` items most similar to ``text``, skipping ids in ``exclude``"""
+        excluded = set(exclude)
+        hits = self.index.search(hashed_features(text), k + len(excluded))
+        return [(item_id, self.items[item_id]) for item_id, score in hits
+                if item_id not in excluded and score >= min_score][:k]
+
+
+_banks: Dict[str, Tuple[int, Optional[QuestionBank]]] = {}
+_banks_lock = threading.Lock()
+
+
+def get_question_bank(persona) -> Optional[QuestionBank]:
+    """The persona's question bank, loaded once per persona version (None if it has none)"""
+    path = persona.question_bank
+    if not path:
+        return None
+    cached = _banks.get(path)
+    if cached is None or cached[0] != persona.version:
+        with _banks_lock:
+            cached = _banks.get(path)
+            if cached is None or cached[0] != persona.version:
+                try:
+                    bank = QuestionBank.load(path)
+                except (OSError, ValueError) as e:
+                    logger.warning("Cannot load question bank %s: %s", path, e)
+                    bank = None
+                cached = (persona.version, bank)
+                _banks[path] = cached
+    return cached[1]
+
+
+def main() -> None:
+    usage = ("usage: question_bank.py build [BANK.jsonl | DIR ...]\n"
+             "       question_bank.py search BANK.jsonl TEXT [K]")
+    if len(sys.argv) < 2 or sys.argv[1] not in ("build", "search"):
+        sys.exit(usage)
+
+    if sys.argv[1] == "build":
+        default_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "personas")
+        paths = []
+        for target in sys.argv[2:] or [default_dir]:
+            if os.path.isdir(target):
+                paths += sorted(os.path.join(target, name) for name in os.listdir(target)
+                                if name.endswith(".questions.jsonl"))
+            else:
+                paths.append(target)
+        for path in paths:
+            started = time.perf_counter()
+            index = build_index(path)
+            print(f"{path}: {index.count} items, {len(index.features)} features, "
+                  f"{time.perf_counter() - started:.2f}s")
+        return
+
+    if len(sys.argv) not in (4, 5):
+        sys.exit(usage)
+    bank = QuestionBank.load(sys.argv[2])
+    for item_id, item in bank.search(sys.argv[3], int(sys.argv[4]) if len(sys.argv) == 5 else 5):
+        print(f"{item_id:>6}  [{item.kind}] {item.text}")
+
+
+if __name__ == "__main__":
+    main()
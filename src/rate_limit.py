@@ -0,0 +1,371 @@
+"""
+Per-key rate limiting and fair scheduling of upstream-bound requests
+Token buckets keyed by API key and by session cap how fast one client can
+send turns. A fair-queuing scheduler then bounds how many upstream-bound
+requests run at once per API key and in total; waiting keys are served
+round robin, so one busy key cannot starve the others. The total follows
+the adaptive limit (adaptive_limit.py), which shrinks while the provider is
+slow. Anything over a limit is turned away with RateLimited (429 for a
+client's own limits, 503 when the server is out of capacity, both with
+Retry-After) instead of queueing until it times out. Bounding the requests
+that wait on the provider also bounds the server threads they hold, which
+leaves the rest for read-only endpoints
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from adaptive_limit import AdaptiveLimit, get_adaptive_limit
+from metrics import Counter, Histogram, REGISTRY
+
+RATE_LIMITED = REGISTRY.register(Counter(
+    "rate_limited_total", "Requests turned away by rate limiting or scheduling", ("reason",)))
+SCHEDULER_WAIT = REGISTRY.register(Histogram(
+    "upstream_scheduler_wait_seconds", "Time upstream-bound requests waited for a slot"))
+
+DEFAULT_MAX_KEYS = 100000
+
+
+class RateLimited(Exception):
+    """Request over a rate or concurrency limit; retry after ``retry_after`` seconds.
+
+    ``status`` is the HTTP status to answer with: 429 when the client went
+    over its own limits, 503 when the server is out of capacity.
+    """
+
+    def __init__(self, message: str, retry_after: float, reason: str, status: int = 429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+        self.status = status
+        RATE_LIMITED.inc(reason=reason)
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value (whole seconds, at least 1)"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBuckets:
+    """Token buckets sharing one rate and burst, keyed by string.
+
+    Not thread-safe; RequestLimiter serializes access. The least recently
+    used buckets are dropped beyond ``max_keys`` (a dropped bucket comes
+    back full, which only ever errs towards admitting).
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = DEFAULT_MAX_KEYS):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _tokens(self, key: str, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.burst
+        return min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+
+    def wait_time(self, key: str, now: float) -> float:
+        """Seconds until the bucket holds a token (0 if it does now)"""
+        if not self.enabled:
+            return 0.0
+        return max(0.0, (1 - self._tokens(key, now)) / self.rate)
+
+    def take(self, key: str, now: float) -> None:
+        """Spend a token; call only after wait_time returned 0"""
+        if not self.enabled:
+            return
+        self._buckets[key] = [self._tokens(key, now) - 1, now]
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+class Ticket:
+    """An admitted request's scheduler slot; release it when the request finishes"""
+
+    def __init__(self, release: Callable[[float], None]):
+        self._release = release
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        """Give the slot back (idempotent)"""
+        if not self._released:
+            self._released = True
+            self._release(time.monotonic() - self._started)
+
+    def __enter__(self) -> "Ticket":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.release()
+        return False
+
+
+class _Waiter:
+    """A queued request, woken through ``notify`` when granted a slot"""
+
+    __slots__ = ("notify", "granted")
+
+    def __init__(self, notify: Callable[[], None]):
+        self.notify = notify
+        self.granted = False
+
+
+class FairScheduler:
+    """Bounds in-flight requests per key and globally, queueing fairly across keys.
+
+    A request runs at once when both limits have room and no earlier
+    request of its key is waiting. Otherwise it joins its key's queue
+    (bounded by ``max_queued_per_key``, and all queues together by
+    ``max_queued``); freed slots go to the waiting keys round robin. A
+    request that cannot get a slot within ``queue_timeout`` is rejected
+    rather than left to pile up. With ``limit``, the global bound is the
+    adaptive limit's current value, capped at ``max_in_flight``.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        max_in_flight_per_key: int = 4,
+        max_queued_per_key: int = 4,
+        queue_timeout: float = 5.0,
+        max_queued: int = 64,
+        limit: Optional[AdaptiveLimit] = None
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_key = max_in_flight_per_key
+        self.max_queued_per_key = max_queued_per_key
+        self.queue_timeout = queue_timeout
+        self.max_queued = max_queued
+        self.limit = limit
+        self.in_flight = 0
+        self.queued = 0
+        self._in_flight: Dict[str, int] = {}
+        # Keys with waiting requests, in round-robin order
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        # Moving average of how long a slot is held, for Retry-After estimates
+        self._hold_seconds = 1.0
+        self._lock = threading.Lock()
+
+    def _capacity(self) -> int:
+        if self.limit is None:
+            return self.max_in_flight
+        return min(self.max_in_flight, self.limit.current)
+
+    def _has_room(self, key: str) -> bool:
+        return (self.in_flight < self._capacity()
+                and self._in_flight.get(key, 0) < self.max_in_flight_per_key)
+
+    def _grant(self, key: str) -> None:
+        self.in_flight += 1
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+
+    def _retry_after(self, key: str) -> float:
+        ahead = len(self._queues.get(key, ())) + 1
+        return self._hold_seconds * ahead / self.max_in_flight_per_key
+
+    def _enter(self, key: str, notify: Callable[[], None]) -> Optional[_Waiter]:
+        """Take a slot now (returns None) or queue for one (returns the waiter)"""
+        with self._lock:
+            if key not in self._queues and self._has_room(key):
+                self._grant(key)
+                return None
+            queue = self._queues.get(key, ())
+            if len(queue) >= self.max_queued_per_key:
+                raise RateLimited("Too many concurrent requests for this API key",
+                                  self._retry_after(key), "queue_full")
+            # Shed at once rather than after a wait that is bound to time out
+            expected_wait = self._hold_seconds * (self.queued + 1) / self._capacity()
+            if self.queued >= self.max_queued or expected_wait > self.queue_timeout:
+                raise RateLimited("Server busy, please try again shortly", expected_wait, "overloaded", 503)
+            waiter = _Waiter(notify)
+            self._queues.setdefault(key, deque()).append(waiter)
+            self.queued += 1
+            return waiter
+
+    def _abandon(self, key: str, waiter: _Waiter) -> bool:
+        """Withdraw a waiter; False if it was granted meanwhile and now owns a slot"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            queue = self._queues.get(key)
+            if queue is not None:
+                queue.remove(waiter)
+                self.queued -= 1
+                if not queue:
+                    del self._queues[key]
+            return True
+
+    def _release(self, key: str, held: float) -> None:
+        with self._lock:
+            self._hold_seconds += 0.2 * (held - self._hold_seconds)
+            self.in_flight -= 1
+            remaining = self._in_flight[key] - 1
+            if remaining:
+                self._in_flight[key] = remaining
+            else:
+                del self._in_flight[key]
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting keys round robin; called with the lock held"""
+        while self._queues and self.in_flight < self._capacity():
+            for key in self._queues:
+                if self._has_room(key):
+                    break
+            else:
+                return
+            queue = self._queues[key]
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self._grant(key)
+            waiter.granted = True
+            waiter.notify()
+
+    def _timed_out(self, key: str) -> RateLimited:
+        with self._lock:
+            retry_after = self._retry_after(key)
+        return RateLimited("Server busy, request timed out waiting for capacity", retry_after, "queue_timeout", 503)
+
+    def acquire(self, key: str) -> Ticket:
+        """Block until the key gets a slot; raises RateLimited"""
+        started = time.monotonic()
+        event = threading.Event()
+        waiter = self._enter(key, event.set)
+        if waiter is not None and not event.wait(self.queue_timeout) and self._abandon(key, waiter):
+            raise self._timed_out(key)
+        SCHEDULER_WAIT.observe(time.monotonic() - started)
+        return Ticket(lambda held: self._release(key, held))
+
+    def try_acquire(self, key: str) -> Optional[Ticket]:
+        """A slot now if one is free and none of the key's requests wait, else None; never queues"""
+        with self._lock:
+            if key in self._queues or not self._has_room(key):
+                return None
+            self._grant(key)
+        return Ticket(lambda held: self._release(key, held))
+
+    async def aacquire(self, key: str) -> Ticket:
+        """Wait for a slot without blocking the event loop; raises RateLimited"""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def notify() -> None:
+            # Slots may be freed from other threads (e.g. the Flask app's)
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        waiter = self._enter(key, notify)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(granted), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if self._abandon(key, waiter):
+                    raise self._timed_out(key)
+            except asyncio.CancelledError:
+                if not self._abandon(key, waiter):
+                    self._release(key, 0.0)
+                raise
+        SCHEDULER_WAIT.observe(time.monotonic() - started)
+        return Ticket(lambda held: self._release(key, held))
+
+
+class RequestLimiter:
+    """Token-bucket rate limits per API key and per session in front of a FairScheduler"""
+
+    def __init__(self, key_buckets: TokenBuckets, session_buckets: TokenBuckets, scheduler: FairScheduler):
+        self.key_buckets = key_buckets
+        self.session_buckets = session_buckets
+        self.scheduler = scheduler
+        self._lock = threading.Lock()
+
+    def check(self, key: str, session_id: Optional[str] = None) -> None:
+        """Spend a token from the key's and the session's bucket, or from neither.
+
+        ``key`` identifies the caller (a hash of the API key). Raises
+        RateLimited with the wait until both buckets have a token.
+        """
+        now = time.monotonic()
+        with self._lock:
+            key_wait = self.key_buckets.wait_time(key, now)
+            session_wait = self.session_buckets.wait_time(session_id, now) if session_id else 0.0
+            if key_wait or session_wait:
+                reason = "key" if key_wait >= session_wait else "session"
+                raise RateLimited(f"Rate limit exceeded for this {'API key' if reason == 'key' else 'session'}",
+                                  max(key_wait, session_wait), reason)
+            self.key_buckets.take(key, now)
+            if session_id:
+                self.session_buckets.take(session_id, now)
+
+    def try_admit(self, key: str) -> Optional[Ticket]:
+        """Admit optional work (a speculative prefetch) only if it can run now.
+
+        Spends a token from the key's bucket and takes a free slot, or does
+        neither and returns None; it never queues ahead of real requests.
+        The session bucket is left for the session's own turns.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.key_buckets.wait_time(key, now):
+                return None
+            ticket = self.scheduler.try_acquire(key)
+            if ticket is not None:
+                self.key_buckets.take(key, now)
+        return ticket
+
+    def admit(self, key: str, session_id: Optional[str] = None) -> Ticket:
+        """Rate-limit a request and wait for its upstream slot"""
+        self.check(key, session_id)
+        return self.scheduler.acquire(key)
+
+    async def aadmit(self, key: str, session_id: Optional[str] = None) -> Ticket:
+        """Async counterpart of admit"""
+        self.check(key, session_id)
+        return await self.scheduler.aacquire(key)
+
+
+_limiter: Optional[RequestLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RequestLimiter:
+    """Get the process-wide request limiter, configured from the environment"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RequestLimiter(
+                    TokenBuckets(
+                        float(os.getenv("RATE_LIMIT_KEY_PER_MINUTE", "60")) / 60,
+                        float(os.getenv("RATE_LIMIT_KEY_BURST", "20"))
+                    ),
+                    TokenBuckets(
+                        float(os.getenv("RATE_LIMIT_SESSION_PER_MINUTE", "20")) / 60,
+                        float(os.getenv("RATE_LIMIT_SESSION_BURST", "5"))
+                    ),
+                    FairScheduler(
+                        max_in_flight=int(os.getenv("UPSTREAM_MAX_IN_FLIGHT", os.getenv("OPENROUTER_POOL_SIZE", "32"))),
+                        max_in_flight_per_key=int(os.getenv("UPSTREAM_MAX_IN_FLIGHT_PER_KEY", "4")),
+                        max_queued_per_key=int(os.getenv("UPSTREAM_MAX_QUEUED_PER_KEY", "4")),
+                        queue_timeout=float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "5")),
+                        max_queued=int(os.getenv("UPSTREAM_MAX_QUEUED", "64")),
+                        limit=get_adaptive_limit()
+                    )
+                )
+    return _limiter
@@ -0,0 +1,134 @@
+"""
+Response caching
+Precomputed JSON bodies with strong ETags for static API responses such as
+the persona catalog, and a content-addressed completion cache (in-memory
+LRU, optionally backed by a directory on disk) for idempotent completions
+like feedback finalization, so replays never pay for the same call twice
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Payload fields that determine a completion's output
+CACHE_KEY_FIELDS = ("model", "messages", "temperature", "max_tokens", "response_format")
+
+
+class CachedJSON:
+    """A JSON response body encoded once, with a strong ETag"""
+
+    def __init__(self, data, max_age: int = 300):
+        self.body = json.dumps(data, separators=(",", ":")).encode()
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.cache_control = f"public, max-age={max_age}"
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header already names this body"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+
+    def headers(self) -> Dict[str, str]:
+        """Caching headers to send with this body"""
+        return {"ETag": self.etag, "Cache-Control": self.cache_control}
+
+
+def completion_cache_key(payload: Dict) -> str:
+    """Content address of a completion request"""
+    key_data = {name: payload.get(name) for name in CACHE_KEY_FIELDS}
+    canonical = json.dumps(key_data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class CompletionCache:
+    """LRU cache of completion texts keyed by request content.
+
+    With ``directory`` set, entries are also written to disk so they
+    survive restarts and are shared between workers on the same host.
+    """
+
+    def __init__(self, max_entries: int = 1024, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, payload: Dict) -> Optional[str]:
+        """Get the cached completion text for a request, if any"""
+        key = completion_cache_key(payload)
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                return content
+
+        content = self._read_disk(key)
+        if content is not None:
+            self._remember(key, content)
+        return content
+
+    def set(self, payload: Dict, content: str) -> None:
+        """Cache the completion text for a request"""
+        key = completion_cache_key(payload)
+        self._remember(key, content)
+        self._write_disk(key, content)
+
+    def _remember(self, key: str, content: str) -> None:
+        """Insert into the in-memory LRU, evicting the oldest entries"""
+        with self._lock:
+            self._entries[key] = content
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        """Disk location of an entry, fanned out by key prefix"""
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        """Read an entry from disk, if disk caching is enabled"""
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)["content"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, content: str) -> None:
+        """Atomically write an entry to disk, if disk caching is enabled"""
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"content": content}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+_completion_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """Get the process-wide completion cache, configured from the environment"""
+    global _completion_cache
+    if _completion_cache is None:
+        with _cache_lock:
+            if _completion_cache is None:
+                _completion_cache = CompletionCache(
+                    max_entries=int(os.getenv("COMPLETION_CACHE_SIZE", "1024")),
+                    directory=os.getenv("COMPLETION_CACHE_DIR") or None
+                )
+    return _completion_cache
@@ -0,0 +1,130 @@
+"""
+Running interview evaluation
+Keeps per-dimension scores, strengths and improvement areas up to date while
+the interview is in progress, so end-of-interview feedback is assembled from
+already-computed partials instead of one large blocking completion
+"""
+
+import json
+import threading
+from typing import Callable, Dict, Hashable, List, Optional
+
+import background
+from feedback_report import (
+    MAX_LIST_ITEMS,
+    SCORE_DIMENSIONS,
+    FeedbackParseError,
+    FeedbackReport,
+    parse_feedback_report
+)
+
+
+class RunningEvaluation:
+    """Evaluation state covering ``history[:evaluated_count]``"""
+
+    def __init__(self):
+        self.report = FeedbackReport()
+        self.evaluated_count = 0
+        self._lock = threading.Lock()
+
+    def export_state(self) -> Dict[str, any]:
+        """Export the evaluation for session storage"""
+        with self._lock:
+            return {"report": self.report.to_dict(), "evaluated_count": self.evaluated_count}
+
+    def load_state(self, state: Optional[Dict[str, any]]) -> None:
+        """Restore an evaluation produced by export_state"""
+        if not state:
+            return
+        self.report = FeedbackReport.from_dict(state["report"])
+        self.evaluated_count = state.get("evaluated_count", 0)
+
+    def is_current(self, history: List[Dict[str, str]]) -> bool:
+        """Whether every turn in the history has been evaluated"""
+        return self.evaluated_count >= len(history) and self.evaluated_count > 0
+
+    def build_prompt(self, persona, history: List[Dict[str, str]]) -> str:
+        """Build the prompt that folds unevaluated turns into the evaluation"""
+        with self._lock:
+            current = self.report.to_dict()
+            new_turns = history[self.evaluated_count:]
+
+        transcript = "\n".join(
+            f"{'CANDIDATE' if msg['role'] == 'user' else 'INTERVIEWER'}: {msg['content']}"
+            for msg in new_turns
+        )
+        dimensions = "\n".join(f'- "{key}": {label} (1-10)' for key, label in SCORE_DIMENSIONS.items())
+
+        return f"""You are evaluating a candidate during a {persona.interview_type} interview with {persona.company}.
+
+Evaluation so far (null scores mean not yet assessed):
+{json.dumps(current, indent=2)}
+
+New exchanges since the last update:
+{transcript}
+
+Update the evaluation to reflect the whole interview so far. Scores:
+{dimensions}
+
+Keep 3-{MAX_LIST_ITEMS} concise strengths and areas for improvement, and a 2-3 sentence overall assessment.
+Respond with only a JSON object with keys "scores", "strengths", "areas_for_improvement" and "overall_assessment"."""
+
+    def apply(self, report: FeedbackReport, evaluated_count: int) -> bool:
+        """Adopt an updated report; ignored if it covers no more history than the current one"""
+        with self._lock:
+            if evaluated_count <= self.evaluated_count:
+                return False
+            # Keep earlier scores for dimensions the update left unassessed
+            for key, value in self.report.scores.items():
+                if report.scores.get(key) is None:
+                    report.scores[key] = value
+            # Delivery is measured from audio, never produced by the model
+            report.delivery = self.report.delivery
+            self.report = report
+            self.evaluated_count = evaluated_count
+        return True
+
+    def set_delivery(self, delivery: Optional[Dict[str, any]]) -> None:
+        """Attach speech-delivery analytics to the report"""
+        with self._lock:
+            self.report.delivery = delivery
+
+    def schedule_update(
+        self,
+        persona,
+        history: List[Dict[str, str]],
+        complete: Callable[[str], str],
+        on_update: Optional[Callable[["RunningEvaluation"], None]] = None,
+        key: Optional[Hashable] = None,
+        admit: Optional[str] = None
+    ) -> bool:
+        """Evaluate new turns on a background thread.
+
+        ``complete(prompt)`` runs the completion and returns its text.
+        ``key`` names the update across requests (by default this instance)
+        and ``admit`` is the rate-limit key it takes an upstream slot under;
+        see background.submit. Returns False when nothing is new or an
+        update for the key is already pending. Unparseable updates are
+        dropped; the next turn retries them.
+        """
+        with self._lock:
+            if self.evaluated_count >= len(history):
+                return False
+
+        snapshot = list(history)
+        prompt = self.build_prompt(persona, snapshot)
+
+        def update():
+            try:
+                report = parse_feedback_report(complete(prompt))
+                if self.apply(report, len(snapshot)) and on_update:
+                    on_update(self)
+            except FeedbackParseError:
+                pass
+
+        return background.submit(key if key is not None else (id(self), "evaluation"), update, admit)
+
+    def to_feedback(self) -> Dict[str, any]:
+        """Assemble the feedback report from the running evaluation"""
+        with self._lock:
+            return self.report.to_dict()
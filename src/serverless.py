@@ -0,0 +1,19 @@
+"""
+Serverless entry point (Vercel)
+Serves the ASGI app with only what the request path needs: no Flask, no
+.env parsing (the platform injects the environment) and no dev-server
+banner. The HTTP client libraries and the audio stack are imported on
+first use, so a cold start that serves the page or the persona list never
+loads them. Voice mode needs a long-lived server and is not available here,
+and feedback jobs run inline (JOB_INLINE) rather than on background threads.
+Profile with: python benchmarks/cold_start.py
+"""
+
+import os
+
+os.environ.setdefault("LOAD_DOTENV", "0")
+# The instance may be frozen as soon as it answers, so background job
+# threads would stall; feedback is generated inside the end request instead
+os.environ.setdefault("JOB_INLINE", "1")
+
+from asgi import app  # noqa: E402,F401
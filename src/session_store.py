@@ -0,0 +1,296 @@
+"""
+Session storage for interview sessions
+Stores compact, JSON-serializable session records (persona id, history,
+start time) instead of live engine objects, with TTL eviction. Backends:
+in-memory LRU, SQLite file and Redis (spoken over RESP, no client library)
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+DEFAULT_TTL_SECONDS = 2 * 60 * 60
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+LOCK_STRIPES = 64
+
+
+def hash_api_key(api_key: str) -> str:
+    """Hash an API key so session records never hold the raw secret"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class SessionStore(ABC):
+    """Key-value store for serialized interview sessions with TTL expiry"""
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._session_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def lock(self, session_id: str) -> threading.Lock:
+        """Get the in-process lock guarding read-modify-write of a session"""
+        return self._session_locks[hash(session_id) % LOCK_STRIPES]
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Get a session record, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, session_id: str, record: Dict) -> None:
+        """Create or replace a session record and refresh its TTL"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Delete a session record if present"""
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU store bounded by session count and TTL.
+
+    Records of at least ``compress_min_bytes`` serialized are kept
+    zlib-compressed; transcripts are repetitive prose and shrink severalfold.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        compress_min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES
+    ):
+        super().__init__(ttl_seconds)
+        self.max_sessions = max_sessions
+        self.compress_min_bytes = compress_min_bytes
+        self._records: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._records.get(session_id)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._records[session_id]
+                return None
+            self._records.move_to_end(session_id)
+        if isinstance(payload, bytes):
+            payload = zlib.decompress(payload)
+        return json.loads(payload)
+
+    def set(self, session_id: str, record: Dict) -> None:
+        # Store the serialized form so callers cannot mutate stored state
+        # in place and memory use matches what durable backends hold
+        payload = json.dumps(record, separators=(",", ":"))
+        if len(payload) >= self.compress_min_bytes:
+            payload = zlib.compress(payload.encode(), 1)
+        with self._lock:
+            self._records[session_id] = (time.time() + self.ttl_seconds, payload)
+            self._records.move_to_end(session_id)
+            self._evict()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._records.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _evict(self) -> None:
+        """Drop expired sessions from the LRU end, then enforce the size cap"""
+        now = time.time()
+        while self._records:
+            oldest_id, (expires_at, _) = next(iter(self._records.items()))
+            if expires_at > now and len(self._records) <= self.max_sessions:
+                break
+            del self._records[oldest_id]
+
+
+class SQLiteSessionStore(SessionStore):
+    """Durable store in a SQLite file, shareable by workers on one host"""
+
+    def __init__(self, path: str, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at > ?",
+            (session_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, session_id: str, record: Dict) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(record, separators=(",", ":")), now + self.ttl_seconds)
+            )
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def delete(self, session_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+
+class RedisSessionStore(SessionStore):
+    """Store backed by any server speaking the Redis protocol (RESP2).
+
+    Talks to the server over a plain socket so no client library is
+    needed; keys expire server-side via ``SET ... EX``.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        key_prefix: str = "interview:session:"
+    ):
+        super().__init__(ttl_seconds)
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.key_prefix = key_prefix
+        self._local = threading.local()
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        payload = self._command("GET", self.key_prefix + session_id)
+        return json.loads(payload) if payload is not None else None
+
+    def set(self, session_id: str, record: Dict) -> None:
+        self._command(
+            "SET",
+            self.key_prefix + session_id,
+            json.dumps(record, separators=(",", ":")),
+            "EX",
+            str(self.ttl_seconds)
+        )
+
+    def delete(self, session_id: str) -> None:
+        self._command("DEL", self.key_prefix + session_id)
+
+    def _connection(self):
+        """Get this thread's connection as a (socket, reader) pair"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=5)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+            if self.password:
+                self._send(conn, "AUTH", self.password)
+            if self.db:
+                self._send(conn, "SELECT", str(self.db))
+        return conn
+
+    def _command(self, *args: str):
+        """Run one command, reconnecting once if the connection dropped"""
+        try:
+            return self._send(self._connection(), *args)
+        except (ConnectionError, OSError):
+            self._local.conn = None
+            return self._send(self._connection(), *args)
+
+    def _send(self, conn, *args: str):
+        """Encode a command as a RESP array, send it and read the reply"""
+        sock, reader = conn
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        sock.sendall(b"".join(parts))
+        return self._read_reply(reader)
+
+    def _read_reply(self, reader):
+        """Read one RESP reply"""
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise ValueError(f"Redis error: {body.decode()}")
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length == -1:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            count = int(body)
+            if count == -1:
+                return None
+            return [self._read_reply(reader) for _ in range(count)]
+        raise ValueError(f"Unexpected Redis reply: {line!r}")
+
+
+def create_session_store(url: Optional[str] = None) -> SessionStore:
+    """Create a session store from a URL (defaults to SESSION_STORE_URL).
+
+    Supported forms: ``memory://``, ``sqlite:///sessions.db`` (relative) or
+    ``sqlite:////var/lib/app/sessions.db`` (absolute), and
+    ``redis://[:password@]host[:port][/db]``.
+    """
+    url = url or os.getenv("SESSION_STORE_URL", "memory://")
+    ttl_seconds = int(os.getenv("SESSION_TTL_SECONDS", str(DEFAULT_TTL_SECONDS)))
+    parsed = urlparse(url)
+
+    if parsed.scheme == "memory":
+        max_sessions = int(os.getenv("SESSION_MAX_COUNT", str(DEFAULT_MAX_SESSIONS)))
+        compress_min_bytes = int(os.getenv("SESSION_COMPRESS_MIN_BYTES", str(DEFAULT_COMPRESS_MIN_BYTES)))
+        return MemorySessionStore(
+            ttl_seconds=ttl_seconds,
+            max_sessions=max_sessions,
+            compress_min_bytes=compress_min_bytes
+        )
+
+    if parsed.scheme == "sqlite":
+        # Three slashes for a relative path, four for an absolute one
+        path = parsed.path[1:]
+        return SQLiteSessionStore(path or "sessions.db", ttl_seconds=ttl_seconds)
+
+    if parsed.scheme == "redis":
+        return RedisSessionStore(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=parsed.password,
+            ttl_seconds=ttl_seconds
+        )
+
+    raise ValueError(f"Unsupported session store URL: {url}")
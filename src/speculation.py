@@ -0,0 +1,273 @@
+"""
+Speculative prefetch of interviewer replies
+While the candidate is still typing, the client posts drafts of the answer.
+After a quiet period the latest draft is answered on a small worker pool, and if
+the submitted answer is close enough to that draft the prefetched reply is
+used instead of starting a fresh completion. Enabled with SPECULATIVE_PREFETCH=1
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import Counter, REGISTRY
+from model_router import get_router
+from rate_limit import get_limiter
+
+SPECULATIONS = REGISTRY.register(Counter(
+    "speculation_total", "Speculative prefetch outcomes", ("outcome",)))
+
+
+def normalize_answer(text: str) -> str:
+    """Collapse whitespace and case so trivial edits don't count as changes"""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def similarity(a: str, b: str) -> float:
+    """Similarity of two answers in [0, 1]"""
+    a, b = normalize_answer(a), normalize_answer(b)
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+class Speculation:
+    """A debounced prefetch for one draft of a session's next answer"""
+
+    def __init__(
+        self,
+        draft: str,
+        history_length: int,
+        compute: Callable[[str], str],
+        due: float,
+        key: Optional[str] = None
+    ):
+        self.draft = draft
+        self.history_length = history_length
+        self.compute = compute
+        self.due = due
+        self.key = key
+        self.future: Future = Future()
+
+    @property
+    def started(self) -> bool:
+        """Whether the debounce elapsed and the reply is being (or was) computed"""
+        return self.future.running() or (self.future.done() and not self.future.cancelled())
+
+    def cancel(self) -> None:
+        """Stop the prefetch if it has not started; a running one cannot be interrupted"""
+        self.future.cancel()
+
+
+class SpeculativePrefetcher:
+    """Per-process registry of in-progress speculations, one per session.
+
+    Debounced drafts are started by one dispatcher thread and computed on a
+    pool of ``workers`` threads. A session has at most one prefetch running:
+    a newer draft waits for it to finish and then starts only if it is still
+    the latest, so fast typing costs at most one upstream call at a time.
+
+    Speculations live in this process only, so a draft and the answer that
+    follows it must reach the same worker for the prefetch to be used.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        debounce: float = 0.6,
+        threshold: float = 0.9,
+        min_chars: int = 20,
+        max_sessions: int = 1000,
+        workers: int = 4
+    ):
+        self.enabled = enabled
+        self.debounce = debounce
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.max_sessions = max_sessions
+        self.workers = workers
+        self._sessions: "OrderedDict[str, Speculation]" = OrderedDict()
+        # Sessions whose prefetch is queued on or running in the pool
+        self._running: Dict[str, Speculation] = {}
+        # (due, sequence, session id, speculation) of debounced drafts
+        self._timers: List[Tuple[float, int, str, Speculation]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._dispatcher: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def draft(
+        self,
+        session_id: str,
+        draft: str,
+        history_length: int,
+        compute: Callable[[str], str],
+        key: Optional[str] = None
+    ) -> bool:
+        """Note a new draft, prefetching ``compute(draft)`` once typing pauses.
+
+        With ``key`` (the caller's API key hash) the prefetch is charged to
+        the key's rate limit and upstream slots, and skipped when they have
+        no room. Returns whether a prefetch is pending or running for the
+        session.
+        """
+        if not self.enabled:
+            return False
+        # A prefetch is an extra upstream call; none while the provider is under pressure
+        if len(draft.strip()) < self.min_chars or get_router().degraded:
+            self.discard(session_id)
+            return False
+
+        with self._wakeup:
+            current = self._sessions.get(session_id)
+            if (current is not None and current.started
+                    and current.history_length == history_length
+                    and similarity(current.draft, draft) >= self.threshold):
+                # Already answering a close enough draft
+                return True
+            if current is not None:
+                if current.started:
+                    SPECULATIONS.inc(outcome="superseded")
+                current.cancel()
+
+            speculation = Speculation(draft, history_length, compute, time.monotonic() + self.debounce, key)
+            self._sessions[session_id] = speculation
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)[1].cancel()
+            heapq.heappush(self._timers, (speculation.due, next(self._sequence), session_id, speculation))
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="speculation", daemon=True)
+                self._dispatcher.start()
+            self._wakeup.notify()
+        return True
+
+    def _dispatch_loop(self) -> None:
+        """Start drafts as their debounce elapses"""
+        with self._wakeup:
+            while True:
+                if not self._timers:
+                    self._wakeup.wait()
+                    continue
+                wait = self._timers[0][0] - time.monotonic()
+                if wait > 0:
+                    self._wakeup.wait(wait)
+                    continue
+                _, _, session_id, speculation = heapq.heappop(self._timers)
+                self._start(session_id, speculation)
+
+    def _start(self, session_id: str, speculation: Speculation) -> None:
+        """Hand a due speculation to the pool unless it was replaced or the session has one running (lock held)"""
+        if (self._sessions.get(session_id) is not speculation or speculation.future.cancelled()
+                or session_id in self._running):
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="interview-speculation")
+        self._running[session_id] = speculation
+        self._executor.submit(self._run, session_id, speculation)
+
+    def _run(self, session_id: str, speculation: Speculation) -> None:
+        """Compute a prefetched reply on the pool, then start the session's next draft if it is due"""
+        future = speculation.future
+        ticket = None
+        try:
+            if speculation.key is not None and not future.cancelled():
+                ticket = get_limiter().try_admit(speculation.key)
+                if ticket is None:
+                    SPECULATIONS.inc(outcome="throttled")
+                    speculation.cancel()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(speculation.compute(speculation.draft))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            if ticket is not None:
+                ticket.release()
+            with self._wakeup:
+                del self._running[session_id]
+                latest = self._sessions.get(session_id)
+                if latest is not None and latest is not speculation and latest.due <= time.monotonic():
+                    self._start(session_id, latest)
+
+    def claim(self, session_id: str, answer: str, history_length: int) -> Optional[Future]:
+        """Take the session's prefetch if it was made for this answer.
+
+        Returns a future for the prefetched reply, or None when there is no
+        usable speculation; a mismatched one is dropped either way.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            speculation = self._sessions.pop(session_id, None)
+        if speculation is None:
+            return None
+
+        if not speculation.started:
+            speculation.cancel()
+            SPECULATIONS.inc(outcome="not_started")
+            return None
+        if (speculation.history_length != history_length
+                or similarity(speculation.draft, answer) < self.threshold):
+            SPECULATIONS.inc(outcome="miss")
+            return None
+        SPECULATIONS.inc(outcome="hit")
+        return speculation.future
+
+    def discard(self, session_id: str) -> None:
+        """Drop any speculation for a session"""
+        with self._lock:
+            speculation = self._sessions.pop(session_id, None)
+        if speculation is not None:
+            speculation.cancel()
+
+
+def prefetched_reply(future: Optional[Future], timeout: float = 30) -> Optional[str]:
+    """Wait for a claimed prefetch; None if there is none or it failed"""
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=timeout)
+    except Exception:
+        SPECULATIONS.inc(outcome="failed")
+        return None
+
+
+async def aprefetched_reply(future: Optional[Future], timeout: float = 30) -> Optional[str]:
+    """Await a claimed prefetch without blocking the event loop"""
+    if future is None:
+        return None
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except Exception:
+        SPECULATIONS.inc(outcome="failed")
+        return None
+
+
+_prefetcher: Optional[SpeculativePrefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> SpeculativePrefetcher:
+    """Get the process-wide prefetcher, configured from the environment"""
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = SpeculativePrefetcher(
+                    enabled=os.getenv("SPECULATIVE_PREFETCH", "").lower() in ("1", "true", "yes"),
+                    debounce=float(os.getenv("SPECULATION_DEBOUNCE_SECONDS", "0.6")),
+                    threshold=float(os.getenv("SPECULATION_THRESHOLD", "0.9")),
+                    min_chars=int(os.getenv("SPECULATION_MIN_CHARS", "20")),
+                    workers=int(os.getenv("SPECULATION_WORKERS", "4"))
+                )
+    return _prefetcher
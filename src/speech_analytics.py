@@ -0,0 +1,274 @@
+"""
+Speech-delivery analytics for recorded interviews
+Computes speaking rate, pause distribution, filler-word density, pitch
+variability and loudness for every answer of a recording in one batch pass.
+Audio is read through a memory map in fixed-size blocks and framed with
+strided views, so an hour-long interview is analyzed in seconds without
+loading it into RAM
+
+Voice interviews append each answer to a raw PCM recording under
+VOICE_RECORDING_DIR, which is analyzed when the interview ends.
+
+Example:
+    python src/speech_analytics.py recording.wav answers.json
+"""
+
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from voice import SAMPLE_RATE, frame_db, frame_signal
+
+FRAME_LENGTH = 1024  # 64 ms at 16 kHz: long enough for yin down to fmin
+HOP_LENGTH = 320  # 20 ms
+BLOCK_SECONDS = 60
+PITCH_RANGE = (65.0, 400.0)
+# Pitch is tracked at half the sample rate: plenty for speech f0, half the work
+PITCH_DECIMATION = 2
+MIN_PAUSE_SECONDS = 0.25
+PAUSE_BUCKETS = (0.25, 0.5, 1.0, 2.0)
+
+RECORDING_DIR = os.getenv("VOICE_RECORDING_DIR", os.path.join(tempfile.gettempdir(), "interview-recordings"))
+
+FILLER_PATTERN = re.compile(
+    r"\b(?:um+|uh+|erm*|hmm+|like|you know|i mean|basically|actually|literally|kind of|sort of)\b",
+    re.IGNORECASE
+)
+
+
+def recording_path(session_id: str) -> str:
+    """Raw PCM recording of a session's answers"""
+    name = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)
+    return os.path.join(RECORDING_DIR, f"{name}.pcm")
+
+
+def append_recording(session_id: str, audio: np.ndarray) -> Tuple[int, int]:
+    """Append a float utterance to the session's recording; returns its sample offsets"""
+    path = recording_path(session_id)
+    os.makedirs(RECORDING_DIR, exist_ok=True)
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    with open(path, "ab") as f:
+        start = f.tell() // 2
+        f.write(pcm.tobytes())
+    return start, start + len(pcm)
+
+
+def delete_recording(session_id: str) -> None:
+    try:
+        os.remove(recording_path(session_id))
+    except OSError:
+        pass
+
+
+def open_audio(path: str) -> Tuple[np.ndarray, int]:
+    """Memory-map 16-bit PCM audio from a raw ``.pcm`` file (16 kHz mono) or a WAV file.
+
+    Returns int16 samples (first channel) and the sample rate; nothing is
+    read from disk until the samples are touched.
+    """
+    if not path.endswith(".wav"):
+        return np.memmap(path, dtype="<i2", mode="r"), SAMPLE_RATE
+
+    with open(path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"Not a WAV file: {path}")
+        channels = sample_rate = bits = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No audio data in {path}")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(size - 16 + size % 2, 1)
+                if audio_format != 1 or bits != 16:
+                    raise ValueError("Only 16-bit PCM WAV files are supported")
+            elif chunk_id == b"data":
+                if channels is None:
+                    raise ValueError(f"WAV data before format chunk in {path}")
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + size % 2, 1)
+
+    frames = size // (2 * channels)
+    samples = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(frames, channels))
+    return samples[:, 0], sample_rate
+
+
+def frame_features(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Tuple[np.ndarray, np.ndarray]:
+    """Level (dBFS) and pitch (Hz, NaN where unpitched) of every hop of a recording.
+
+    Works through the signal ``BLOCK_SECONDS`` at a time; each block
+    overlaps the next by one frame so frame boundaries match a single pass.
+    """
+    import librosa
+
+    frame_count = max(0, (len(samples) - FRAME_LENGTH) // HOP_LENGTH + 1)
+    levels = np.empty(frame_count, dtype=np.float32)
+    pitch = np.empty(frame_count, dtype=np.float32)
+    block_frames = BLOCK_SECONDS * sample_rate // HOP_LENGTH
+
+    for first in range(0, frame_count, block_frames):
+        count = min(block_frames, frame_count - first)
+        start = first * HOP_LENGTH
+        end = start + (count - 1) * HOP_LENGTH + FRAME_LENGTH
+        block = np.asarray(samples[start:end], dtype=np.float32) / 32768.0
+
+        levels[first:first + count] = frame_db(frame_signal(block, FRAME_LENGTH, HOP_LENGTH))
+        # Averaging sample pairs low-passes before decimating
+        decimated = block.reshape(-1, PITCH_DECIMATION).mean(axis=1)
+        f0 = librosa.yin(
+            decimated,
+            fmin=PITCH_RANGE[0],
+            fmax=PITCH_RANGE[1],
+            sr=sample_rate // PITCH_DECIMATION,
+            frame_length=FRAME_LENGTH // PITCH_DECIMATION,
+            hop_length=HOP_LENGTH // PITCH_DECIMATION,
+            center=False
+        )[:count]
+        pitch[first:first + count] = f0
+    return levels, pitch
+
+
+def voiced_mask(levels: np.ndarray, margin_db: float = 12.0, min_db: float = -50.0) -> np.ndarray:
+    """Frames louder than the recording's noise floor by ``margin_db``"""
+    if not len(levels):
+        return np.zeros(0, dtype=bool)
+    noise_floor = float(np.percentile(levels, 10))
+    return levels > max(noise_floor + margin_db, min_db)
+
+
+def pause_lengths(voiced: np.ndarray, hop_seconds: float) -> np.ndarray:
+    """Lengths in seconds of the silent runs between the first and last voiced frame"""
+    indices = np.flatnonzero(voiced)
+    if len(indices) < 2:
+        return np.zeros(0)
+    gaps = np.diff(indices) - 1
+    return gaps[gaps > 0] * hop_seconds
+
+
+def filler_count(text: str) -> int:
+    return len(FILLER_PATTERN.findall(text))
+
+
+def _pitch_variability(pitch: np.ndarray) -> Optional[float]:
+    """Standard deviation of pitch in semitones around its median"""
+    pitch = pitch[np.isfinite(pitch) & (pitch > PITCH_RANGE[0]) & (pitch < PITCH_RANGE[1])]
+    if len(pitch) < 10:
+        return None
+    semitones = 12 * np.log2(pitch / np.median(pitch))
+    return float(np.std(semitones))
+
+
+def _round(value: Optional[float], digits: int = 2) -> Optional[float]:
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def _delivery_stats(
+    levels: np.ndarray,
+    pitch: np.ndarray,
+    voiced: np.ndarray,
+    texts: Sequence[str],
+    hop_seconds: float
+) -> Tuple[Dict[str, any], np.ndarray]:
+    """Delivery numbers for one span of frames; also returns its pause lengths"""
+    words = sum(len(text.split()) for text in texts)
+    fillers = sum(filler_count(text) for text in texts)
+    indices = np.flatnonzero(voiced)
+    pauses = pause_lengths(voiced, hop_seconds)
+    pauses = pauses[pauses >= MIN_PAUSE_SECONDS]
+    # Leading and trailing silence (endpointing margins) is not the speaker's
+    span = (indices[-1] - indices[0] + 1) * hop_seconds if len(indices) else 0.0
+    voiced_levels = levels[voiced]
+
+    stats = {
+        "speaking_seconds": _round(span, 1),
+        "words": words,
+        "speaking_rate_wpm": _round(words / span * 60, 0) if span else None,
+        "articulation_rate_wpm": _round(words / (len(indices) * hop_seconds) * 60, 0) if len(indices) else None,
+        "pause_count": int(len(pauses)),
+        "pause_seconds_total": _round(pauses.sum(), 1),
+        "longest_pause_seconds": _round(pauses.max(), 2) if len(pauses) else 0.0,
+        "filler_words": fillers,
+        "fillers_per_100_words": _round(fillers / words * 100, 1) if words else None,
+        "pitch_variability_semitones": _round(_pitch_variability(pitch[voiced])),
+        "loudness_dbfs": _round(voiced_levels.mean(), 1) if len(voiced_levels) else None,
+        "loudness_variability_db": _round(voiced_levels.std(), 1) if len(voiced_levels) else None,
+    }
+    return stats, pauses
+
+
+def analyze_recording(path: str, answers: Sequence[Dict[str, any]]) -> Dict[str, any]:
+    """Delivery analytics for a recording, per answer and overall.
+
+    ``answers`` gives each answer's ``start`` and ``end`` sample offsets in
+    the recording and its transcript ``text``.
+    """
+    samples, sample_rate = open_audio(path)
+    levels, pitch = frame_features(samples, sample_rate)
+    voiced = voiced_mask(levels)
+    hop_seconds = HOP_LENGTH / sample_rate
+
+    per_answer: List[Dict[str, any]] = []
+    all_pauses = []
+    spans = []
+    for answer in answers:
+        first = int(answer["start"]) // HOP_LENGTH
+        last = min(len(levels), max(first, (int(answer["end"]) - FRAME_LENGTH) // HOP_LENGTH + 1))
+        span = slice(first, last)
+        stats, pauses = _delivery_stats(levels[span], pitch[span], voiced[span], [answer.get("text", "")], hop_seconds)
+        per_answer.append(stats)
+        all_pauses.append(pauses)
+        spans.append(np.arange(first, last))
+
+    if spans:
+        frames = np.concatenate(spans)
+        overall, _ = _delivery_stats(
+            levels[frames], pitch[frames], voiced[frames],
+            [answer.get("text", "") for answer in answers], hop_seconds
+        )
+    else:
+        overall, _ = _delivery_stats(levels, pitch, voiced, [], hop_seconds)
+
+    # Pauses are counted within answers only; gaps between answers are turn-taking
+    pauses = np.concatenate(all_pauses) if all_pauses else np.zeros(0)
+    speaking_seconds = sum(stats["speaking_seconds"] or 0 for stats in per_answer)
+    words = sum(stats["words"] for stats in per_answer)
+    bucket_edges = list(PAUSE_BUCKETS) + [np.inf]
+    histogram, _ = np.histogram(pauses, bins=bucket_edges)
+    overall.update({
+        "speaking_seconds": _round(speaking_seconds, 1),
+        "speaking_rate_wpm": _round(words / speaking_seconds * 60, 0) if speaking_seconds else None,
+        "pause_count": int(len(pauses)),
+        "pause_seconds_total": _round(pauses.sum(), 1),
+        "longest_pause_seconds": _round(pauses.max(), 2) if len(pauses) else 0.0,
+        "pauses_per_minute": _round(len(pauses) / speaking_seconds * 60, 1) if speaking_seconds else None,
+        "pause_median_seconds": _round(np.median(pauses), 2) if len(pauses) else None,
+        "pause_p90_seconds": _round(np.percentile(pauses, 90), 2) if len(pauses) else None,
+        "pause_histogram": {
+            (f"{low:g}-{high:g}s" if np.isfinite(high) else f"{low:g}s+"): int(count)
+            for low, high, count in zip(bucket_edges[:-1], bucket_edges[1:], histogram)
+        },
+        "recording_seconds": _round(len(samples) / sample_rate, 1),
+    })
+    return {"overall": overall, "answers": per_answer}
+
+
+def main() -> None:
+    if len(sys.argv) != 3:
+        sys.exit("usage: speech_analytics.py RECORDING(.wav|.pcm) ANSWERS.json")
+    with open(sys.argv[2], encoding="utf-8") as f:
+        answers = json.load(f)
+    print(json.dumps(analyze_recording(sys.argv[1], answers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
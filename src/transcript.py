@@ -0,0 +1,157 @@
+"""
+Compact interview transcripts
+Turns are stored as ``__slots__`` objects with interned roles instead of
+per-message dicts, older turns are zlib-compressed once they leave the hot
+window, and each transcript is held under a per-session memory cap by
+eliding the oldest turns already folded into the rolling summary and
+evaluation. Chat-message dicts are built on demand when a turn is read
+"""
+
+import os
+import sys
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+# Content left in place of a turn dropped to stay under the memory cap
+ELIDED_CONTENT = "[earlier turn omitted]"
+
+
+class Turn:
+    """One chat message; content is text, or zlib-compressed UTF-8 once cold"""
+
+    __slots__ = ("role", "_content")
+
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self._content: Union[str, bytes, None] = content
+
+    @property
+    def content(self) -> str:
+        content = self._content
+        if content is None:
+            return ELIDED_CONTENT
+        if isinstance(content, bytes):
+            return zlib.decompress(content).decode("utf-8")
+        return content
+
+    @property
+    def size(self) -> int:
+        """Approximate bytes held by the content"""
+        return len(self._content) if self._content is not None else 0
+
+    @property
+    def compressed(self) -> bool:
+        return isinstance(self._content, bytes)
+
+    @property
+    def elided(self) -> bool:
+        return self._content is None
+
+    def compress(self, min_bytes: int) -> int:
+        """Compress the content if large enough and it pays off; returns bytes saved"""
+        content = self._content
+        if not isinstance(content, str) or len(content) < min_bytes:
+            return 0
+        packed = zlib.compress(content.encode("utf-8"), 6)
+        if len(packed) >= len(content):
+            return 0
+        self._content = packed
+        return len(content) - len(packed)
+
+    def elide(self) -> int:
+        """Drop the content; returns bytes freed"""
+        freed = self.size
+        self._content = None
+        return freed
+
+    def to_message(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+
+class Transcript:
+    """Append-only conversation history that reads like a list of chat messages.
+
+    Indexing and iteration yield fresh ``{"role", "content"}`` dicts, so
+    callers that mutate what they read cannot corrupt the stored turns.
+    """
+
+    def __init__(
+        self,
+        messages: Iterable[Dict[str, str]] = (),
+        max_bytes: Optional[int] = None,
+        hot_messages: Optional[int] = None,
+        compress_min_bytes: Optional[int] = None
+    ):
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("TRANSCRIPT_MAX_BYTES", "262144"))
+        self.hot_messages = hot_messages if hot_messages is not None else int(
+            os.getenv("TRANSCRIPT_HOT_MESSAGES", "12"))
+        self.compress_min_bytes = compress_min_bytes if compress_min_bytes is not None else int(
+            os.getenv("TRANSCRIPT_COMPRESS_MIN_BYTES", "512"))
+        self._turns: List[Turn] = []
+        self.size = 0
+        self.extend(messages)
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [turn.to_message() for turn in self._turns[index]]
+        return self._turns[index].to_message()
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for turn in self._turns:
+            yield turn.to_message()
+
+    def __add__(self, other: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        return list(self) + list(other)
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"Transcript({len(self)} turns, {self.size} bytes)"
+
+    def append(self, message: Dict[str, str]) -> None:
+        """Add a message, compressing the turn that left the hot window.
+
+        The memory cap is enforced separately by ``trim``, once the caller
+        knows how much of the history is safe to drop.
+        """
+        turn = Turn(message["role"], message["content"])
+        if message["content"] == ELIDED_CONTENT:
+            # Stays elided across export_state/from_state round trips
+            turn.elide()
+        self._turns.append(turn)
+        self.size += turn.size
+        cold = len(self._turns) - self.hot_messages - 1
+        if cold >= 0:
+            self.size -= self._turns[cold].compress(self.compress_min_bytes)
+
+    def extend(self, messages: Iterable[Dict[str, str]]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def trim(self, covered: int = 0) -> int:
+        """Bring the transcript under its memory cap; returns bytes freed.
+
+        Turns before ``covered`` (already summarized and evaluated) are
+        dropped first, oldest first. If that is not enough, any turn outside
+        the hot window is dropped too, so only the hot window can exceed it.
+        """
+        freed = 0
+        limits = (min(covered, len(self._turns)), max(0, len(self._turns) - self.hot_messages))
+        for limit in limits:
+            for turn in self._turns[:limit]:
+                if self.size <= self.max_bytes:
+                    return freed
+                if not turn.elided:
+                    turn_freed = turn.elide()
+                    self.size -= turn_freed
+                    freed += turn_freed
+        return freed
+
+    def to_list(self) -> List[Dict[str, str]]:
+        """Plain chat messages, e.g. for JSON export"""
+        return list(self)
@@ -0,0 +1,391 @@
+"""
+Append-only transcript log for resuming interviews on any worker
+Every turn a session commits is appended to one log file as a JSON line,
+after a "start" line with its persona and API key hash. Writers hand their
+lines to a log thread that writes everything queued in one write and one
+fsync (group commit), so concurrent turns across sessions share a disk
+flush. Each process indexes the file by session id, following what other
+processes append, and a session missing from the session store (the worker
+restarted) or behind the log (another worker took a turn) is rebuilt by
+replaying its turns into a fresh engine. The index of live sessions is
+checkpointed next to the log, so a restarted process reads only what was
+appended after the checkpoint
+
+The log doubles as an archive for analytics; export it in the input format
+of batch_evaluate.py with:
+    python src/transcript_log.py export /tmp/interview-transcripts.log > transcripts.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from metrics import Histogram, REGISTRY
+from session_store import DEFAULT_TTL_SECONDS
+
+logger = logging.getLogger("interview.transcript_log")
+
+COMMIT_SECONDS = REGISTRY.register(Histogram(
+    "transcript_log_commit_seconds", "Time to write and fsync one group commit",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)))
+COMMIT_RECORDS = REGISTRY.register(Histogram(
+    "transcript_log_commit_records", "Records written per group commit",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)))
+
+START = "start"
+TURN = "turn"
+END = "end"
+
+# Expired sessions are dropped from the index at most this often
+PRUNE_SECONDS = 60.0
+
+# The index is checkpointed when pruned, and after indexing this many bytes
+CHECKPOINT_BYTES = 1 << 20
+CHECKPOINT_SUFFIX = ".index"
+
+# fdatasync skips flushing metadata such as mtime, where the platform has it
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+class SessionEntry:
+    """Where a session's records are in the log, and how far it has got"""
+
+    __slots__ = ("spans", "messages", "updated_at")
+
+    def __init__(self):
+        self.spans: List[Tuple[int, int]] = []
+        self.messages = 0
+        self.updated_at = 0.0
+
+
+class TranscriptLog:
+    """Append-only log of interview turns with an in-memory index by session.
+
+    Several processes may share the file: each batch is one ``O_APPEND``
+    write, so lines never interleave, and each process catches its index
+    up by reading what was appended since it last looked. A torn last line
+    left by a crash is skipped.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = DEFAULT_TTL_SECONDS, fsync: bool = True):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.fsync = fsync
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        # Start on a fresh line if the last write before a crash was cut short
+        self._newline = self._torn_tail()
+        self._queue: List[Tuple[bytes, Future]] = []
+        self._ready = threading.Condition()
+        self._writer: Optional[threading.Thread] = None
+        self._index: Dict[str, SessionEntry] = {}
+        self._scanned = 0
+        self.checkpoint_path = path + CHECKPOINT_SUFFIX
+        self._load_checkpoint()
+        self._checkpointed = self._scanned
+        self._pruned_at = time.time()
+        self._index_lock = threading.Lock()
+
+    def _torn_tail(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if not f.tell():
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def append(self, record: Dict) -> Future:
+        """Queue a record; the future resolves to True once it is on disk (False if the write failed)"""
+        future: Future = Future()
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        with self._ready:
+            self._queue.append((line, future))
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="transcript-log", daemon=True)
+                self._writer.start()
+            self._ready.notify()
+        return future
+
+    def _write_loop(self) -> None:
+        """Commit whatever queued up while the previous commit was flushing"""
+        while True:
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+                batch, self._queue = self._queue, []
+
+            data = b"".join(line for line, _ in batch)
+            if self._newline:
+                data = b"\n" + data
+            started = time.perf_counter()
+            try:
+                written = os.write(self._fd, data)
+                if written != len(data):
+                    raise OSError(f"short write ({written} of {len(data)} bytes)")
+                if self.fsync:
+                    _sync(self._fd)
+                self._newline = False
+                ok = True
+            except OSError as e:
+                logger.error("Cannot write %d records to transcript log %s: %s", len(batch), self.path, e)
+                ok = False
+            COMMIT_SECONDS.observe(time.perf_counter() - started)
+            COMMIT_RECORDS.observe(len(batch))
+            for _, future in batch:
+                future.set_result(ok)
+
+    def log_session(self, session_id: str, record: Dict) -> Optional[Future]:
+        """Append the turns a session record gained since it was last logged.
+
+        The first call for a session also logs its start. Updates
+        ``record["logged"]`` (the history length already in the log), so
+        call it before the record is stored. Returns the last append's
+        future, or None if there was nothing to log.
+        """
+        history = record["engine"]["history"]
+        logged = record.get("logged")
+        written = None
+        if logged is None:
+            logged = 0
+            written = self.append({
+                "session_id": session_id,
+                "type": START,
+                "time": time.time(),
+                "persona_id": record["persona_id"],
+                "api_key_hash": record["api_key_hash"],
+                "start_time": record["start_time"]
+            })
+        if len(history) > logged:
+            written = self.append({
+                "session_id": session_id,
+                "type": TURN,
+                "time": time.time(),
+                "offset": logged,
+                "messages": history[logged:]
+            })
+        record["logged"] = len(history)
+        return written
+
+    def end(self, session_id: str) -> Future:
+        """Mark a session as ended; it can no longer be resumed"""
+        return self.append({"session_id": session_id, "type": END, "time": time.time()})
+
+    def _catch_up(self) -> None:
+        """Index the complete lines appended since the last call (index lock held)"""
+        with open(self.path, "rb") as f:
+            f.seek(self._scanned)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written by another process
+                    break
+                self._index_line(line, self._scanned)
+                self._scanned += len(line)
+
+        now = time.time()
+        pruning = now - self._pruned_at >= PRUNE_SECONDS
+        if pruning:
+            self._pruned_at = now
+            cutoff = now - self.ttl_seconds
+            for session_id in [key for key, entry in self._index.items() if entry.updated_at <= cutoff]:
+                del self._index[session_id]
+        if self._scanned - self._checkpointed >= CHECKPOINT_BYTES or (pruning and self._scanned > self._checkpointed):
+            self._save_checkpoint()
+
+    def _load_checkpoint(self) -> None:
+        """Start from the index a previous process saved, if it belongs to this file"""
+        try:
+            with open(self.checkpoint_path, "rb") as f:
+                checkpoint = json.load(f)
+            stat = os.stat(self.path)
+            # A log rotated or truncated since is indexed from scratch
+            if checkpoint["inode"] != stat.st_ino or checkpoint["scanned"] > stat.st_size:
+                return
+            cutoff = time.time() - self.ttl_seconds
+            index: Dict[str, SessionEntry] = {}
+            for session_id, (spans, messages, updated_at) in checkpoint["sessions"].items():
+                if updated_at <= cutoff:
+                    continue
+                entry = index[session_id] = SessionEntry()
+                entry.spans = [(position, length) for position, length in spans]
+                entry.messages = messages
+                entry.updated_at = updated_at
+            scanned = checkpoint["scanned"]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring transcript log checkpoint %s: %s", self.checkpoint_path, e)
+            return
+        self._index, self._scanned = index, scanned
+
+    def _save_checkpoint(self) -> None:
+        """Write the index and how far it covers the log (index lock held)"""
+        checkpoint = {
+            "inode": os.fstat(self._fd).st_ino,
+            "scanned": self._scanned,
+            "sessions": {
+                session_id: [entry.spans, entry.messages, entry.updated_at]
+                for session_id, entry in self._index.items()
+            }
+        }
+        # Processes sharing the log each replace the whole file, never a part of it
+        temporary = f"{self.checkpoint_path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "w") as f:
+                json.dump(checkpoint, f, separators=(",", ":"))
+            os.replace(temporary, self.checkpoint_path)
+        except OSError as e:
+            logger.warning("Cannot write transcript log checkpoint %s: %s", self.checkpoint_path, e)
+            return
+        self._checkpointed = self._scanned
+
+    def _index_line(self, line: bytes, position: int) -> None:
+        try:
+            record = json.loads(line)
+            session_id, kind = record["session_id"], record["type"]
+        except (ValueError, KeyError, TypeError):
+            return
+        if kind == END:
+            self._index.pop(session_id, None)
+            return
+        entry = self._index.get(session_id)
+        if entry is None:
+            if kind != START:
+                return
+            entry = self._index[session_id] = SessionEntry()
+        entry.spans.append((position, len(line)))
+        entry.updated_at = record.get("time", entry.updated_at)
+        if kind == TURN:
+            entry.messages = max(entry.messages, record["offset"] + len(record["messages"]))
+
+    def _read(self, spans: List[Tuple[int, int]]) -> Iterator[Dict]:
+        with open(self.path, "rb") as f:
+            for position, length in spans:
+                f.seek(position)
+                yield json.loads(f.read(length))
+
+    def replay(self, session_id: str) -> Optional[Dict]:
+        """Rebuild a session record from the log, or None if the session is unknown, ended or expired"""
+        with self._index_lock:
+            self._catch_up()
+            entry = self._index.get(session_id)
+            if entry is None or entry.updated_at <= time.time() - self.ttl_seconds:
+                return None
+            spans = list(entry.spans)
+
+        record: Optional[Dict] = None
+        history: List[Dict[str, str]] = []
+        for line in self._read(spans):
+            if line["type"] == START:
+                record = {key: line[key] for key in ("persona_id", "api_key_hash", "start_time")}
+            elif line["type"] == TURN and line["offset"] <= len(history):
+                # A turn logged twice (a retried save) overlaps what is already replayed
+                history[line["offset"]:] = line["messages"]
+        if record is None:
+            return None
+        record["logged"] = len(history)
+        record["engine"] = {
+            "persona_id": record["persona_id"],
+            "history": history,
+            "start_time": record["start_time"],
+            "interview_started": True
+        }
+        return record
+
+    def resume(self, session_id: str, record: Optional[Dict]) -> Optional[Dict]:
+        """The session record to use: ``record`` if it is current, else one replayed from the log.
+
+        A stored record is behind the log when another worker took a turn
+        since; its rolling summary and evaluation cover an unchanged prefix
+        of the history, so they are kept.
+        """
+        if record is not None and "logged" not in record:
+            return record
+        with self._index_lock:
+            self._catch_up()
+            entry = self._index.get(session_id)
+            if entry is None or (record is not None and entry.messages <= record["logged"]):
+                return record
+
+        replayed = self.replay(session_id)
+        if replayed is None or record is None:
+            return replayed
+        if record["api_key_hash"] != replayed["api_key_hash"]:
+            return record
+        record["engine"]["history"] = replayed["engine"]["history"]
+        record["logged"] = replayed["logged"]
+        return record
+
+
+def export_sessions(path: str) -> Iterator[Dict]:
+    """Every session in a log, in batch_evaluate's input format; ended sessions come out as they end"""
+    sessions: Dict[str, Dict] = {}
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                session_id, kind = record["session_id"], record["type"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            if kind == START:
+                sessions[session_id] = {
+                    "id": session_id,
+                    "persona_id": record["persona_id"],
+                    "start_time": record["start_time"],
+                    "ended": False,
+                    "history": []
+                }
+            elif session_id not in sessions:
+                continue
+            elif kind == TURN:
+                sessions[session_id]["history"][record["offset"]:] = record["messages"]
+            elif kind == END:
+                session = sessions.pop(session_id)
+                session["ended"] = True
+                yield session
+    yield from sessions.values()
+
+
+_log: Optional[TranscriptLog] = None
+_log_lock = threading.Lock()
+
+
+def get_transcript_log() -> Optional[TranscriptLog]:
+    """Get the process-wide transcript log, or None unless TRANSCRIPT_LOG_PATH is set"""
+    global _log
+    path = os.getenv("TRANSCRIPT_LOG_PATH", "")
+    if not path:
+        return None
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = TranscriptLog(
+                    path,
+                    ttl_seconds=int(os.getenv("SESSION_TTL_SECONDS", str(DEFAULT_TTL_SECONDS))),
+                    fsync=os.getenv("TRANSCRIPT_LOG_FSYNC", "1") != "0"
+                )
+    return _log
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export interview transcripts from a transcript log")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("log", help="transcript log file")
+    parser.add_argument("--ended", action="store_true", help="only interviews that were ended")
+    parser.add_argument("--persona", help="only interviews with this persona id")
+    args = parser.parse_args()
+
+    for session in export_sessions(args.log):
+        if args.ended and not session["ended"]:
+            continue
+        if args.persona and session["persona_id"] != args.persona:
+            continue
+        sys.stdout.write(json.dumps(session) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Voice pipeline building blocks
+Streaming endpointing of 16 kHz PCM audio with vectorized frame energies,
+pluggable speech-to-text (VOICE_STT_BACKEND) and text-to-speech
+(VOICE_TTS_BACKEND) backends, and sentence chunking of streamed replies so
+the first sentence can be synthesized while the rest is still generating
+"""
+
+import importlib
+import io
+import os
+import re
+import wave
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Dict, List, Optional, Type
+
+import numpy as np
+
+from http_client import get_session
+
+SAMPLE_RATE = 16000
+
+
+def pcm16_to_float(data: bytes) -> np.ndarray:
+    """Decode little-endian 16-bit PCM into float32 samples in [-1, 1)"""
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def to_wav(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Encode float samples as a mono 16-bit WAV file"""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def frame_signal(samples: np.ndarray, frame_length: int, hop_length: Optional[int] = None) -> np.ndarray:
+    """View a signal as overlapping frames (frames x frame_length) without copying"""
+    hop_length = hop_length or frame_length
+    if len(samples) < frame_length:
+        return np.empty((0, frame_length), dtype=samples.dtype)
+    return np.lib.stride_tricks.sliding_window_view(samples, frame_length)[::hop_length]
+
+
+def frame_db(frames: np.ndarray) -> np.ndarray:
+    """RMS level of each frame in dBFS"""
+    return 10 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-10)
+
+
+class VoiceActivityDetector:
+    """Streaming endpointer: splits pushed audio into utterances.
+
+    Frames are classified by energy against an adaptive noise floor. Speech
+    starts after ``start_ms`` of voiced frames (keeping ``pre_roll_ms`` of
+    audio before it) and ends after ``silence_ms`` without voice.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: int = 30,
+        silence_ms: int = 600,
+        start_ms: int = 90,
+        min_speech_ms: int = 250,
+        pre_roll_ms: int = 300,
+        max_utterance_ms: int = 30000,
+        margin_db: float = 12.0,
+        min_db: float = -50.0
+    ):
+        self.sample_rate = sample_rate
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = max_utterance_ms // frame_ms
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.noise_db = min_db - margin_db
+        self._leftover = np.empty(0, dtype=np.float32)
+        self._pre_roll: Deque[np.ndarray] = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._utterance: List[np.ndarray] = []
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._speech_frames = 0
+        self.in_speech = False
+
+    @property
+    def speech_samples(self) -> int:
+        """Samples in the utterance being collected"""
+        return len(self._utterance) * self.frame_length
+
+    def current(self) -> np.ndarray:
+        """Audio of the utterance collected so far"""
+        if not self._utterance:
+            return np.empty(0, dtype=np.float32)
+        return np.concatenate(self._utterance)
+
+    def push(self, samples: np.ndarray) -> List[np.ndarray]:
+        """Add audio; returns any utterances that ended within it"""
+        samples = np.concatenate((self._leftover, samples)) if len(self._leftover) else samples
+        count = len(samples) // self.frame_length
+        self._leftover = samples[count * self.frame_length:].copy()
+        if count == 0:
+            return []
+
+        frames = samples[:count * self.frame_length].reshape(count, self.frame_length)
+        levels = frame_db(frames)
+        voiced = levels > max(self.noise_db + self.margin_db, self.min_db)
+
+        # Track the noise floor from unvoiced frames: fall fast, rise slowly
+        quiet = levels[~voiced]
+        if len(quiet):
+            level = float(np.median(quiet))
+            self.noise_db = level if level < self.noise_db else 0.9 * self.noise_db + 0.1 * level
+
+        ended = []
+        for frame, is_voiced in zip(frames, voiced):
+            utterance = self._step(frame, bool(is_voiced))
+            if utterance is not None:
+                ended.append(utterance)
+        return ended
+
+    def _step(self, frame: np.ndarray, voiced: bool) -> Optional[np.ndarray]:
+        """Advance the endpointing state machine by one frame"""
+        if not self.in_speech:
+            self._pre_roll.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.start_frames:
+                self.in_speech = True
+                self._utterance = list(self._pre_roll)
+                self._pre_roll.clear()
+                self._speech_frames = self._voiced_run
+                self._silent_run = 0
+            return None
+
+        self._utterance.append(frame)
+        if voiced:
+            self._speech_frames += 1
+            self._silent_run = 0
+        else:
+            self._silent_run += 1
+        if self._silent_run >= self.silence_frames or len(self._utterance) >= self.max_frames:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[np.ndarray]:
+        """End the current utterance now; None if there was not enough speech"""
+        utterance = self.current() if self._speech_frames >= self.min_speech_frames else None
+        self._utterance = []
+        self._voiced_run = self._silent_run = self._speech_frames = 0
+        self.in_speech = False
+        return utterance
+
+
+# ---------------------------------------------------------------------------
+# Speech-to-text
+# ---------------------------------------------------------------------------
+
+class SpeechToText(ABC):
+    """Transcribes mono float32 audio"""
+
+    @abstractmethod
+    def transcribe(
+        self,
+        audio: np.ndarray,
+        sample_rate: int = SAMPLE_RATE,
+        prompt: Optional[str] = None,
+        final: bool = True
+    ) -> str:
+        """Transcribe an utterance; ``final`` is False for partial results while it is still being spoken"""
+
+
+class OfflineSpeechToText(SpeechToText):
+    """Stand-in backend for development without a speech service.
+
+    Returns lines from VOICE_STT_SCRIPT (one per utterance, cycling) if
+    set, otherwise a placeholder naming the utterance's length.
+    """
+
+    def __init__(self, script_path: Optional[str] = None):
+        script_path = script_path or os.getenv("VOICE_STT_SCRIPT")
+        self.lines: List[str] = []
+        if script_path:
+            with open(script_path, encoding="utf-8") as f:
+                self.lines = [line.strip() for line in f if line.strip()]
+        self._next = 0
+
+    def transcribe(
+        self,
+        audio: np.ndarray,
+        sample_rate: int = SAMPLE_RATE,
+        prompt: Optional[str] = None,
+        final: bool = True
+    ) -> str:
+        if not self.lines:
+            return f"[{len(audio) / sample_rate:.1f} seconds of speech]"
+        # Partial transcripts of an utterance all map to the line its final one gets
+        line = self.lines[self._next % len(self.lines)]
+        if final:
+            self._next += 1
+        return line
+
+
+class HTTPSpeechToText(SpeechToText):
+    """OpenAI-compatible ``/audio/transcriptions`` endpoint (hosted or a local Whisper server)"""
+
+    def __init__(self, url: Optional[str] = None, api_key: Optional[str] = None, model: Optional[str] = None):
+        self.url = url or os.getenv("VOICE_STT_URL", "https://api.openai.com/v1/audio/transcriptions")
+        self.api_key = api_key or os.getenv("VOICE_STT_API_KEY", "")
+        self.model = model or os.getenv("VOICE_STT_MODEL", "whisper-1")
+        self.timeout = float(os.getenv("VOICE_STT_TIMEOUT", "15"))
+
+    def transcribe(
+        self,
+        audio: np.ndarray,
+        sample_rate: int = SAMPLE_RATE,
+        prompt: Optional[str] = None,
+        final: bool = True
+    ) -> str:
+        data = {"model": self.model, "response_format": "json"}
+        if prompt:
+            # Conditions recognition on the question being answered
+            data["prompt"] = prompt[-500:]
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            response = get_session().post(
+                self.url,
+                headers=headers,
+                data=data,
+                files={"file": ("speech.wav", to_wav(audio, sample_rate), "audio/wav")},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+        except Exception as e:
+            raise ValueError(f"Transcription failed: {e}")
+        return response.json().get("text", "").strip()
+
+
+# ---------------------------------------------------------------------------
+# Text-to-speech
+# ---------------------------------------------------------------------------
+
+class TextToSpeech(ABC):
+    """Synthesizes one sentence at a time"""
+
+    mime_type = "audio/mpeg"
+
+    @abstractmethod
+    def synthesize(self, text: str) -> bytes:
+        """Synthesize a sentence as audio of ``mime_type``"""
+
+
+class GTTSTextToSpeech(TextToSpeech):
+    """Google Translate TTS via gTTS (needs network access)"""
+
+    def __init__(self, lang: Optional[str] = None, tld: Optional[str] = None):
+        self.lang = lang or os.getenv("VOICE_TTS_LANG", "en")
+        self.tld = tld or os.getenv("VOICE_TTS_TLD", "com")
+
+    def synthesize(self, text: str) -> bytes:
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        try:
+            gTTS(text, lang=self.lang, tld=self.tld).write_to_fp(buffer)
+        except Exception as e:
+            raise ValueError(f"Speech synthesis failed: {e}")
+        return buffer.getvalue()
+
+
+class SilentTextToSpeech(TextToSpeech):
+    """Offline stand-in: silence lasting about as long as the sentence would take to say"""
+
+    mime_type = "audio/wav"
+
+    def __init__(self, words_per_minute: float = 160):
+        self.words_per_minute = words_per_minute
+
+    def synthesize(self, text: str) -> bytes:
+        seconds = len(text.split()) * 60 / self.words_per_minute
+        return to_wav(np.zeros(int(seconds * 8000), dtype=np.float32), 8000)
+
+
+STT_BACKENDS: Dict[str, Type[SpeechToText]] = {
+    "offline": OfflineSpeechToText,
+    "http": HTTPSpeechToText,
+}
+
+TTS_BACKENDS: Dict[str, Type[TextToSpeech]] = {
+    "gtts": GTTSTextToSpeech,
+    "silent": SilentTextToSpeech,
+}
+
+
+def _load_backend(spec: str, builtins: Dict[str, type]):
+    """Instantiate a backend by short name or ``package.module:Class``"""
+    if spec in builtins:
+        return builtins[spec]()
+    if ":" not in spec:
+        raise ValueError(f"Unknown voice backend: {spec}")
+    module_name, class_name = spec.split(":", 1)
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def create_speech_to_text(spec: Optional[str] = None) -> SpeechToText:
+    """Create the STT backend named by VOICE_STT_BACKEND"""
+    return _load_backend(spec or os.getenv("VOICE_STT_BACKEND", "offline"), STT_BACKENDS)
+
+
+def create_text_to_speech(spec: Optional[str] = None) -> TextToSpeech:
+    """Create the TTS backend named by VOICE_TTS_BACKEND"""
+    return _load_backend(spec or os.getenv("VOICE_TTS_BACKEND", "gtts"), TTS_BACKENDS)
+
+
+# ---------------------------------------------------------------------------
+# Sentence chunking
+# ---------------------------------------------------------------------------
+
+# Sentence end: terminal punctuation, optional closing quotes/brackets, then whitespace
+SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+")
+ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "prof", "st", "vs", "etc", "inc", "co", "e.g", "i.e"}
+# Written stage directions such as *leans back* or (nods) that should not be read aloud
+STAGE_DIRECTION = re.compile(r"\*[^*]*\*|\([^)]*\)")
+
+
+def speakable(text: str) -> str:
+    """Strip stage directions and markup from text before synthesis"""
+    text = STAGE_DIRECTION.sub(" ", text)
+    return re.sub(r"\s+", " ", text.replace("_", " ")).strip()
+
+
+class SentenceChunker:
+    """Cuts a token stream into sentences as soon as each one is complete.
+
+    Fragments shorter than ``min_chars`` are held back and joined to the next
+    sentence so synthesis is not spent on a lone "Great." between pauses.
+    """
+
+    def __init__(self, min_chars: int = 12):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns the sentences it completed"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            last_word = candidate.rstrip(".!?…\"')]").rsplit(None, 1)[-1:] or [""]
+            if last_word[0].lower().rstrip(".") in ABBREVIATIONS or len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Whatever is left once the stream ends"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
@@ -0,0 +1,313 @@
+"""
+Socket.IO voice channel for spoken interviews
+Clients stream 16 kHz mono PCM16 microphone audio over Socket.IO. The
+server endpoints it into utterances, sends partial transcripts while the
+candidate is still talking (which also seed the speculative prefetch), and
+answers each finished utterance with the streamed interviewer reply plus
+one synthesized audio clip per sentence, sent in order as each is ready.
+Answers are also appended to the session's recording for delivery analytics.
+Served by the ASGI app under /socket.io/
+
+Client -> server: ``voice_start`` {session_id}, binary ``audio`` chunks,
+``voice_stop`` (end the utterance now, e.g. push-to-talk release)
+Server -> client: ``voice_ready``, ``transcript`` {text, final},
+``reply_delta`` {token}, ``reply_audio`` {index, text, mime_type, audio},
+``reply_done`` {response}, ``voice_error`` {error, retry_after when rate limited}
+"""
+
+import asyncio
+import os
+import time
+from functools import partial
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import socketio
+
+from async_engine import AsyncInterviewEngine
+from interview_engine import InterviewEngine
+from metrics import Histogram, REGISTRY
+from rate_limit import RateLimited, get_limiter
+from session_store import hash_api_key
+from speech_analytics import append_recording
+from speculation import aprefetched_reply, get_prefetcher
+from voice import (
+    SAMPLE_RATE,
+    SentenceChunker,
+    VoiceActivityDetector,
+    create_speech_to_text,
+    create_text_to_speech,
+    pcm16_to_float,
+    speakable,
+)
+
+VOICE_LATENCY = REGISTRY.register(Histogram(
+    "voice_turn_latency_seconds", "Time from the end of the candidate's speech to each stage of the reply",
+    ("stage",)))
+
+LoadSession = Callable[[Optional[str], str], Awaitable[Tuple[Dict, AsyncInterviewEngine]]]
+SaveSession = Callable[[str, Dict, InterviewEngine], Awaitable[None]]
+
+
+class VoiceConnection:
+    """Audio and turn-taking state of one connected client"""
+
+    def __init__(self, session_id: str, api_key: str, last_question: str = ""):
+        self.session_id = session_id
+        self.api_key = api_key
+        self.last_question = last_question
+        self.vad = VoiceActivityDetector(
+            silence_ms=int(os.getenv("VOICE_SILENCE_MS", "600")),
+            max_utterance_ms=int(os.getenv("VOICE_MAX_UTTERANCE_MS", "30000"))
+        )
+        self.turn: Optional[asyncio.Future] = None
+        self.partial: Optional[asyncio.Future] = None
+        self.partial_samples = 0
+
+    @property
+    def busy(self) -> bool:
+        """Whether an utterance is being answered"""
+        return self.turn is not None and not self.turn.done()
+
+
+class VoiceChannel:
+    """Socket.IO server that runs spoken turns against the session store"""
+
+    def __init__(self, load_session: LoadSession, save_session: SaveSession):
+        self.load_session = load_session
+        self.save_session = save_session
+        self.stt = create_speech_to_text()
+        self.tts = create_text_to_speech()
+        self.partial_interval = int(float(os.getenv("VOICE_PARTIAL_SECONDS", "1.0")) * SAMPLE_RATE)
+        self.tts_concurrency = int(os.getenv("VOICE_TTS_CONCURRENCY", "2"))
+        self.connections: Dict[str, VoiceConnection] = {}
+        self._api_keys: Dict[str, str] = {}
+
+        self.sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+        self.sio.on("connect", self.connect)
+        self.sio.on("disconnect", self.disconnect)
+        self.sio.on("voice_start", self.voice_start)
+        self.sio.on("audio", self.audio)
+        self.sio.on("voice_stop", self.voice_stop)
+        self.asgi = socketio.ASGIApp(self.sio, socketio_path="socket.io")
+
+    async def _error(self, sid: str, error: Exception) -> None:
+        await self.sio.emit("voice_error", {"error": str(error)}, to=sid)
+
+    async def connect(self, sid: str, environ: Dict, auth: Optional[Dict] = None) -> None:
+        """Accept a connection carrying the user's OpenRouter key in its auth payload"""
+        api_key = (auth or {}).get("api_key") or ""
+        if not api_key.startswith("sk-or-v1-"):
+            raise socketio.exceptions.ConnectionRefusedError("Invalid API key format")
+        self._api_keys[sid] = api_key
+
+    async def disconnect(self, sid: str, *args) -> None:
+        self._api_keys.pop(sid, None)
+        connection = self.connections.pop(sid, None)
+        if connection is not None:
+            for task in (connection.partial, connection.turn):
+                if task is not None:
+                    task.cancel()
+
+    async def voice_start(self, sid: str, data: Optional[Dict] = None) -> None:
+        """Attach the connection to an interview session"""
+        session_id = (data or {}).get("session_id")
+        try:
+            _, engine = await self.load_session(session_id, self._api_keys.get(sid, ""))
+            if not engine.interview_started:
+                raise ValueError("Interview not started")
+        except Exception as e:
+            await self._error(sid, e)
+            return
+
+        replies = [m["content"] for m in engine.conversation_history if m["role"] == "assistant"]
+        self.connections[sid] = VoiceConnection(session_id, self._api_keys[sid], replies[-1] if replies else "")
+        await self.sio.emit("voice_ready", {"sample_rate": SAMPLE_RATE}, to=sid)
+
+    async def audio(self, sid: str, data: bytes) -> None:
+        """Endpoint a chunk of PCM16 audio, transcribing and answering finished utterances"""
+        connection = self.connections.get(sid)
+        if connection is None or not isinstance(data, (bytes, bytearray)):
+            return
+        if connection.busy:
+            # Clients stop sending while the reply plays; anything that slips
+            # through (e.g. echo of the reply) must not start another turn
+            return
+
+        utterances = connection.vad.push(pcm16_to_float(bytes(data)))
+        if utterances:
+            self._start_turn(sid, connection, utterances[0])
+            return
+
+        vad = connection.vad
+        if (vad.in_speech and vad.speech_samples - connection.partial_samples >= self.partial_interval
+                and (connection.partial is None or connection.partial.done())):
+            connection.partial_samples = vad.speech_samples
+            connection.partial = asyncio.ensure_future(self._partial(sid, connection, vad.current()))
+
+    async def voice_stop(self, sid: str, data: Optional[Dict] = None) -> None:
+        """End the current utterance without waiting for silence"""
+        connection = self.connections.get(sid)
+        if connection is None or connection.busy:
+            return
+        utterance = connection.vad.flush()
+        if utterance is not None:
+            self._start_turn(sid, connection, utterance)
+
+    def _start_turn(self, sid: str, connection: VoiceConnection, utterance: np.ndarray) -> None:
+        if connection.partial is not None:
+            connection.partial.cancel()
+        connection.partial_samples = 0
+        connection.turn = asyncio.ensure_future(self._turn(sid, connection, utterance, time.perf_counter()))
+
+    async def _transcribe(self, connection: VoiceConnection, audio: np.ndarray, final: bool) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(
+            self.stt.transcribe, audio, SAMPLE_RATE, connection.last_question, final
+        ))
+
+    async def _partial(self, sid: str, connection: VoiceConnection, audio: np.ndarray) -> None:
+        """Send a partial transcript and let the prefetcher start on it"""
+        try:
+            text = await self._transcribe(connection, audio, final=False)
+            if not text or connection.busy:
+                return
+            await self.sio.emit("transcript", {"text": text, "final": False}, to=sid)
+
+            prefetcher = get_prefetcher()
+            if prefetcher.enabled:
+                record, engine = await self.load_session(connection.session_id, connection.api_key)
+                # The prefetch runs on its own thread, so it uses the blocking engine
+                prefetcher.draft(
+                    connection.session_id,
+                    text,
+                    len(engine.conversation_history),
+                    InterviewEngine.from_state(record["engine"], api_key=connection.api_key).prefetch_response,
+                    key=record["api_key_hash"]
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Partial results are best effort; the final transcript decides
+            pass
+
+    async def _turn(self, sid: str, connection: VoiceConnection, audio: np.ndarray, ended: float) -> None:
+        """Transcribe a finished utterance and speak the interviewer's reply"""
+        speaker = _SentenceSpeaker(self, sid, ended)
+        ticket = None
+        try:
+            text = await self._transcribe(connection, audio, final=True)
+            VOICE_LATENCY.observe(time.perf_counter() - ended, stage="transcript")
+            await self.sio.emit("transcript", {"text": text, "final": True}, to=sid)
+            if not text:
+                return
+            # Spoken turns share the rate limits and upstream slots of typed ones
+            ticket = await get_limiter().aadmit(hash_api_key(connection.api_key), connection.session_id)
+
+            record, engine = await self.load_session(connection.session_id, connection.api_key)
+            # Answers are kept for delivery analytics when the interview ends
+            loop = asyncio.get_running_loop()
+            start, end = await loop.run_in_executor(None, append_recording, connection.session_id, audio)
+            record.setdefault("voice", {"answers": []})["answers"].append({"start": start, "end": end, "text": text})
+
+            prefetch = get_prefetcher().claim(connection.session_id, text, len(engine.conversation_history))
+            reply = await aprefetched_reply(prefetch)
+            if reply is not None:
+                engine.commit_response(text, reply)
+                await self.sio.emit("reply_delta", {"token": reply}, to=sid)
+                speaker.feed(reply)
+            else:
+                chunks = []
+                async for token in engine.stream_ai_response(text):
+                    if not chunks:
+                        VOICE_LATENCY.observe(time.perf_counter() - ended, stage="first_token")
+                    chunks.append(token)
+                    await self.sio.emit("reply_delta", {"token": token}, to=sid)
+                    speaker.feed(token)
+                reply = "".join(chunks)
+
+            # Returns once the turn is durable in the transcript log
+            await self.save_session(connection.session_id, record, engine)
+            connection.last_question = reply
+            await speaker.finish()
+            await self.sio.emit("reply_done", {"response": reply}, to=sid)
+        except asyncio.CancelledError:
+            speaker.cancel()
+            raise
+        except RateLimited as e:
+            speaker.cancel()
+            await self.sio.emit("voice_error", {"error": str(e), "reason": e.reason,
+                                                "retry_after": int(e.retry_after_header)}, to=sid)
+        except Exception as e:
+            speaker.cancel()
+            await self._error(sid, e)
+        finally:
+            if ticket is not None:
+                ticket.release()
+            # Drop audio that arrived while answering
+            connection.vad.flush()
+
+
+class _SentenceSpeaker:
+    """Synthesizes reply sentences as they complete and sends the clips in order"""
+
+    def __init__(self, channel: VoiceChannel, sid: str, ended: float):
+        self.channel = channel
+        self.sid = sid
+        self.ended = ended
+        self.chunker = SentenceChunker()
+        self.semaphore = asyncio.Semaphore(channel.tts_concurrency)
+        self.queue: "asyncio.Queue[Optional[Tuple[str, asyncio.Future]]]" = asyncio.Queue()
+        self.sender = asyncio.ensure_future(self._send())
+        self.index = 0
+
+    def feed(self, text: str) -> None:
+        for sentence in self.chunker.feed(text):
+            self._synthesize(sentence)
+
+    def _synthesize(self, sentence: str) -> None:
+        text = speakable(sentence)
+        if text:
+            self.queue.put_nowait((text, asyncio.ensure_future(self._run(text))))
+
+    async def _run(self, text: str) -> bytes:
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.channel.tts.synthesize, text)
+
+    async def _send(self) -> None:
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            text, clip = item
+            try:
+                audio = await clip
+            except Exception as e:
+                # A sentence that fails to synthesize is still shown as text
+                await self.channel._error(self.sid, e)
+                continue
+            if self.index == 0:
+                VOICE_LATENCY.observe(time.perf_counter() - self.ended, stage="first_audio")
+            await self.channel.sio.emit("reply_audio", {
+                "index": self.index,
+                "text": text,
+                "mime_type": self.channel.tts.mime_type,
+                "audio": audio
+            }, to=self.sid)
+            self.index += 1
+
+    async def finish(self) -> None:
+        """Synthesize the trailing fragment and wait until every clip is sent"""
+        rest = self.chunker.flush()
+        if rest:
+            self._synthesize(rest)
+        self.queue.put_nowait(None)
+        await self.sender
+
+    def cancel(self) -> None:
+        self.sender.cancel()
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not None:
+                item[1].cancel()
@@ -12,6 +12,12 @@ class InterviewApp {
         this.isWaitingForResponse = false;
         this.apiKey = sessionStorage.getItem('openrouter_api_key');
         this.messages = [];
+        // Speculative prefetch: drafts are sent while typing until the server says it's off
+        this.prefetchEnabled = true;
+        this.draftTimer = null;
+        this.lastDraft = '';
+        // Voice mode: microphone audio over Socket.IO (ASGI server only)
+        this.voice = null;
         
         this.init();
     }
@@ -59,7 +65,9 @@ class InterviewApp {
                 this.sendResponse();
             }
         });
+        document.getElementById('response-input')?.addEventListener('input', () => this.scheduleDraft());
         document.getElementById('end-interview-btn')?.addEventListener('click', () => this.endInterview());
+        document.getElementById('voice-btn')?.addEventListener('click', () => this.toggleVoice());
 
         // Feedback section
         document.getElementById('new-interview-btn')?.addEventListener('click', () => this.resetToWelcome());
@@ -214,6 +222,42 @@ class InterviewApp {
         }
     }
 
+    scheduleDraft() {
+        if (!this.prefetchEnabled || !this.currentSessionId || this.isWaitingForResponse) {
+            return;
+        }
+        clearTimeout(this.draftTimer);
+        this.draftTimer = setTimeout(() => this.sendDraft(), 300);
+    }
+
+    async sendDraft() {
+        const draft = document.getElementById('response-input').value.trim();
+        if (!draft || draft === this.lastDraft || this.isWaitingForResponse) {
+            return;
+        }
+        this.lastDraft = draft;
+
+        try {
+            const response = await fetch('/api/interview/draft', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-API-Key': this.apiKey
+                },
+                body: JSON.stringify({
+                    session_id: this.currentSessionId,
+                    draft: draft
+                })
+            });
+            const data = await response.json();
+            if (response.ok && data.enabled === false) {
+                this.prefetchEnabled = false;
+            }
+        } catch (error) {
+            // Prefetching is best effort; the answer is still sent normally
+        }
+    }
+
     async sendResponse() {
         const input = document.getElementById('response-input');
         const message = input.value.trim();
@@ -248,13 +292,15 @@ class InterviewApp {
         });
 
         input.value = '';
+        clearTimeout(this.draftTimer);
+        this.lastDraft = '';
         this.isWaitingForResponse = true;
         document.getElementById('send-response-btn').disabled = true;
 
         try {
             this.showLoading('Interviewer is thinking...');
 
-            const response = await fetch('/api/interview/respond', {
+            const response = await fetch('/api/interview/respond/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -266,12 +312,13 @@ class InterviewApp {
                 })
             });
 
-            const data = await response.json();
-
             if (!response.ok) {
+                const data = await response.json();
                 if (response.status === 401) {
                     this.showError('Invalid API key. Please check and try again.');
                     this.handleLogout();
+                } else if (response.status === 429 || response.status === 503) {
+                    this.showError(`${data.error}. Please wait ${data.retry_after}s and send again.`);
                 } else {
                     throw new Error(data.error || 'Failed to get AI response');
                 }
@@ -281,22 +328,44 @@ class InterviewApp {
                 return;
             }
 
-            // Add AI response to chat
-            const aiMessageDiv = document.createElement('div');
-            aiMessageDiv.className = 'message interviewer-message';
-            aiMessageDiv.innerHTML = `
-                <div class="message-content">
-                    <p>${this.escapeHtml(data.response)}</p>
-                </div>
-                <div class="message-time">${new Date().toLocaleTimeString()}</div>
-            `;
-            chatMessages.appendChild(aiMessageDiv);
-            chatMessages.scrollTop = chatMessages.scrollHeight;
+            // Add AI response to chat as soon as the first token arrives
+            let aiText = null;
+            let finalResponse = null;
+
+            await this.readEventStream(response, (event, data) => {
+                if (event === 'error') {
+                    throw new Error(data.error || 'Failed to get AI response');
+                }
+                if (event === 'done') {
+                    finalResponse = data.response;
+                    return;
+                }
+
+                if (!aiText) {
+                    this.hideLoading();
+                    const aiMessageDiv = document.createElement('div');
+                    aiMessageDiv.className = 'message interviewer-message';
+                    aiMessageDiv.innerHTML = `
+                        <div class="message-content">
+                            <p></p>
+                        </div>
+                        <div class="message-time">${new Date().toLocaleTimeString()}</div>
+                    `;
+                    chatMessages.appendChild(aiMessageDiv);
+                    aiText = aiMessageDiv.querySelector('p');
+                }
+                aiText.textContent += data.token;
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            });
+
+            if (finalResponse === null) {
+                throw new Error('Connection closed before the response completed');
+            }
 
             // Store response
             this.messages.push({
                 role: 'assistant',
-                content: data.response
+                content: finalResponse
             });
 
             this.hideLoading();
@@ -310,6 +379,227 @@ class InterviewApp {
         }
     }
 
+    async toggleVoice() {
+        if (this.voice) {
+            this.stopVoice();
+        } else {
+            await this.startVoice();
+        }
+    }
+
+    loadSocketIO() {
+        if (window.io) {
+            return Promise.resolve();
+        }
+        return new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = 'https://cdn.socket.io/4.7.5/socket.io.min.js';
+            script.onload = resolve;
+            script.onerror = () => reject(new Error('Could not load the Socket.IO client'));
+            document.head.appendChild(script);
+        });
+    }
+
+    async startVoice() {
+        if (!this.currentSessionId) {
+            return;
+        }
+
+        try {
+            await this.loadSocketIO();
+            const stream = await navigator.mediaDevices.getUserMedia({
+                audio: { echoCancellation: true, noiseSuppression: true, channelCount: 1 }
+            });
+            // The server expects 16 kHz mono PCM16; the browser resamples for us
+            const context = new AudioContext({ sampleRate: 16000 });
+            const source = context.createMediaStreamSource(stream);
+            const processor = context.createScriptProcessor(2048, 1, 1);
+            const socket = io({ auth: { api_key: this.apiKey } });
+
+            const voice = {
+                socket, stream, context, source, processor,
+                playing: [],
+                speaking: false,
+                replyDone: true,
+                aiText: null,
+                interim: null
+            };
+            this.voice = voice;
+
+            processor.onaudioprocess = (e) => {
+                // Mute the upload while the interviewer talks so the reply isn't heard as an answer
+                if (voice.speaking || !socket.connected) {
+                    return;
+                }
+                const samples = e.inputBuffer.getChannelData(0);
+                const pcm = new Int16Array(samples.length);
+                for (let i = 0; i < samples.length; i++) {
+                    pcm[i] = Math.max(-1, Math.min(1, samples[i])) * 0x7fff;
+                }
+                socket.emit('audio', pcm.buffer);
+            };
+            source.connect(processor);
+            processor.connect(context.destination);
+
+            socket.on('connect', () => socket.emit('voice_start', { session_id: this.currentSessionId }));
+            socket.on('connect_error', (error) => {
+                this.showError('Voice connection failed: ' + error.message);
+                this.stopVoice();
+            });
+            socket.on('transcript', (data) => this.onVoiceTranscript(data));
+            socket.on('reply_delta', (data) => this.onVoiceReplyDelta(data));
+            socket.on('reply_audio', (data) => this.onVoiceReplyAudio(data));
+            socket.on('reply_done', (data) => {
+                voice.replyDone = true;
+                this.messages.push({ role: 'assistant', content: data.response });
+                this.finishVoicePlayback();
+            });
+            socket.on('voice_error', (data) => {
+                voice.replyDone = true;
+                this.finishVoicePlayback();
+                this.showError('Voice error: ' + data.error);
+            });
+
+            const button = document.getElementById('voice-btn');
+            button.textContent = '⏹ Stop Voice';
+            button.classList.add('active');
+            document.getElementById('response-input').placeholder = 'Listening... just start talking';
+        } catch (error) {
+            this.showError('Could not start voice mode: ' + error.message);
+            this.stopVoice();
+        }
+    }
+
+    stopVoice() {
+        const voice = this.voice;
+        this.voice = null;
+        if (voice) {
+            voice.processor.disconnect();
+            voice.source.disconnect();
+            voice.stream.getTracks().forEach(track => track.stop());
+            voice.context.close();
+            voice.socket.disconnect();
+            voice.playing.forEach(audio => audio.pause());
+        }
+        const button = document.getElementById('voice-btn');
+        if (button) {
+            button.textContent = '🎤 Voice';
+            button.classList.remove('active');
+        }
+        const input = document.getElementById('response-input');
+        if (input) {
+            input.placeholder = 'Type your response here and press Enter or click Send...';
+        }
+    }
+
+    onVoiceTranscript(data) {
+        const input = document.getElementById('response-input');
+        if (!data.final) {
+            input.value = data.text;
+            return;
+        }
+        input.value = '';
+        if (!data.text) {
+            return;
+        }
+
+        const chatMessages = document.getElementById('chat-messages');
+        const userMessageDiv = document.createElement('div');
+        userMessageDiv.className = 'message user-message';
+        userMessageDiv.innerHTML = `
+            <div class="message-content">
+                <p>${this.escapeHtml(data.text)}</p>
+            </div>
+            <div class="message-time">${new Date().toLocaleTimeString()}</div>
+        `;
+        chatMessages.appendChild(userMessageDiv);
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+        this.messages.push({ role: 'user', content: data.text });
+
+        this.voice.speaking = true;
+        this.voice.replyDone = false;
+        this.voice.aiText = null;
+    }
+
+    onVoiceReplyDelta(data) {
+        const chatMessages = document.getElementById('chat-messages');
+        if (!this.voice.aiText) {
+            const aiMessageDiv = document.createElement('div');
+            aiMessageDiv.className = 'message interviewer-message';
+            aiMessageDiv.innerHTML = `
+                <div class="message-content">
+                    <p></p>
+                </div>
+                <div class="message-time">${new Date().toLocaleTimeString()}</div>
+            `;
+            chatMessages.appendChild(aiMessageDiv);
+            this.voice.aiText = aiMessageDiv.querySelector('p');
+        }
+        this.voice.aiText.textContent += data.token;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    }
+
+    onVoiceReplyAudio(data) {
+        const voice = this.voice;
+        const url = URL.createObjectURL(new Blob([data.audio], { type: data.mime_type }));
+        const audio = new Audio(url);
+        audio.onended = () => {
+            URL.revokeObjectURL(url);
+            voice.playing.shift();
+            if (voice.playing.length) {
+                voice.playing[0].play();
+            } else {
+                this.finishVoicePlayback();
+            }
+        };
+        voice.playing.push(audio);
+        // Clips arrive in order; start the first one as soon as it lands
+        if (voice.playing.length === 1) {
+            audio.play();
+        }
+    }
+
+    finishVoicePlayback() {
+        // Hand the turn back to the candidate once the reply has been fully spoken
+        if (this.voice && this.voice.replyDone && !this.voice.playing.length) {
+            this.voice.speaking = false;
+        }
+    }
+
+    async readEventStream(response, onEvent) {
+        // Parse a text/event-stream body incrementally (EventSource cannot POST)
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        event = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        data += line.slice(5).trim();
+                    }
+                });
+                if (data) {
+                    onEvent(event, JSON.parse(data));
+                }
+            }
+        }
+    }
+
     startTimer() {
         let seconds = 0;
         this.timerInterval = setInterval(() => {
@@ -327,6 +617,7 @@ class InterviewApp {
         }
 
         clearInterval(this.timerInterval);
+        this.stopVoice();
 
         try {
             this.showLoading('Generating your feedback...');
@@ -340,24 +631,29 @@ class InterviewApp {
                 body: JSON.stringify({ session_id: this.currentSessionId })
             });
 
-            const data = await response.json();
+            const job = await response.json();
 
             if (!response.ok) {
                 if (response.status === 401) {
                     this.showError('Invalid API key. Please check and try again.');
                     this.handleLogout();
+                } else if (response.status === 429 || response.status === 503) {
+                    this.showError(`${job.error}. Please wait ${job.retry_after}s and try again.`);
                 } else {
-                    throw new Error(data.error || 'Failed to end interview');
+                    throw new Error(job.error || 'Failed to end interview');
                 }
                 this.hideLoading();
                 return;
             }
 
+            // Feedback is generated in the background; wait for the job
+            const data = await this.waitForFeedback(job);
+
             // Display feedback
             document.getElementById('feedback-duration').textContent = data.duration;
             document.getElementById('feedback-message-count').textContent = data.message_count;
             document.getElementById('feedback-display').innerHTML = 
-                `<p>${this.escapeHtml(data.feedback)}</p>`;
+                this.renderFeedback(data.feedback);
 
             // Display transcript
             let transcriptHtml = '';
@@ -381,6 +677,81 @@ class InterviewApp {
         }
     }
 
+    async waitForFeedback(job) {
+        while (job.status !== 'done') {
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Feedback generation failed');
+            }
+            const started = Date.now();
+            // The server may hold the poll until the job finishes
+            const response = await fetch(
+                `/api/interview/feedback?job_id=${encodeURIComponent(job.job_id)}&wait=25`,
+                { headers: { 'X-API-Key': this.apiKey } }
+            );
+            job = await response.json();
+            if (!response.ok) {
+                throw new Error(job.error || 'Failed to get feedback');
+            }
+            if (job.status !== 'done' && Date.now() - started < 1000) {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+            }
+        }
+        return job.result;
+    }
+
+    renderFeedback(feedback) {
+        // Unstructured fallback when the report could not be parsed
+        if (!feedback || feedback.raw_feedback !== undefined) {
+            return `<p>${this.escapeHtml(feedback ? feedback.raw_feedback : '')}</p>`;
+        }
+
+        const scoreLabels = {
+            technical_knowledge: 'Technical/Domain Knowledge',
+            communication: 'Communication Skills',
+            problem_solving: 'Problem Solving',
+            fit: `Fit with ${this.currentPersona.company}`
+        };
+        const list = items => items.length
+            ? `<ul>${items.map(item => `<li>${this.escapeHtml(item)}</li>`).join('')}</ul>`
+            : '<p>--</p>';
+
+        const scores = Object.entries(scoreLabels).map(([key, label]) => {
+            const score = feedback.scores[key];
+            return `<li><strong>${this.escapeHtml(label)}:</strong> ${score === null ? '--' : score + '/10'}</li>`;
+        }).join('');
+
+        return `
+            <h4>Scores</h4>
+            <ul>${scores}</ul>
+            <h4>Key Strengths</h4>
+            ${list(feedback.strengths)}
+            <h4>Areas for Improvement</h4>
+            ${list(feedback.areas_for_improvement)}
+            <h4>Overall Assessment</h4>
+            <p>${this.escapeHtml(feedback.overall_assessment)}</p>
+            ${feedback.delivery ? this.renderDelivery(feedback.delivery.overall) : ''}
+        `;
+    }
+
+    renderDelivery(delivery) {
+        const value = (number, unit) => number === null || number === undefined ? '--' : `${number}${unit}`;
+        const pauses = Object.entries(delivery.pause_histogram)
+            .map(([bucket, count]) => `${bucket}: ${count}`).join(', ');
+        const rows = [
+            ['Speaking Rate', value(delivery.speaking_rate_wpm, ' words/min')],
+            ['Pauses', `${value(delivery.pauses_per_minute, '/min')} (${pauses})`],
+            ['Longest Pause', value(delivery.longest_pause_seconds, 's')],
+            ['Filler Words', `${delivery.filler_words} (${value(delivery.fillers_per_100_words, ' per 100 words')})`],
+            ['Pitch Variability', value(delivery.pitch_variability_semitones, ' semitones')],
+            ['Loudness', `${value(delivery.loudness_dbfs, ' dBFS')} ± ${value(delivery.loudness_variability_db, ' dB')}`]
+        ].map(([label, text]) => `<li><strong>${label}:</strong> ${this.escapeHtml(text)}</li>`).join('');
+
+        return `
+            <h4>Speaking Delivery</h4>
+            <ul>${rows}</ul>
+        `;
+    }
+
     resetToWelcome() {
         this.currentSessionId = null;
         this.currentPersona = null;
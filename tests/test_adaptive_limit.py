@@ -0,0 +1,102 @@
+"""AIMD upstream concurrency limit"""
+
+import pytest
+
+import adaptive_limit
+from adaptive_limit import MIN_SAMPLES, AdaptiveLimit
+from rate_limit import FairScheduler
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(adaptive_limit.time, "monotonic", clock)
+    return clock
+
+
+def test_overload_cuts_the_limit_multiplicatively(clock):
+    limit = AdaptiveLimit(max_limit=20, min_limit=2, backoff=0.5, cooldown=1.0)
+    limit.observe("turn", "m", None, overloaded=True)
+    assert limit.current == 10
+
+
+def test_backs_off_at_most_once_per_cooldown(clock):
+    limit = AdaptiveLimit(max_limit=20, min_limit=2, backoff=0.5, cooldown=1.0)
+    limit.observe("turn", "m", None, overloaded=True)
+    limit.observe("turn", "m", None, overloaded=True)
+    assert limit.current == 10
+    clock.now += 1.0
+    limit.observe("turn", "m", None, overloaded=True)
+    assert limit.current == 5
+
+
+def test_never_drops_below_min_limit(clock):
+    limit = AdaptiveLimit(max_limit=20, min_limit=3, backoff=0.1)
+    for _ in range(5):
+        clock.now += 10
+        limit.observe("turn", "m", None, overloaded=True)
+    assert limit.current == 3
+
+
+def test_fast_calls_grow_the_limit_back_to_max(clock):
+    limit = AdaptiveLimit(max_limit=8, min_limit=2, backoff=0.5)
+    limit.observe("turn", "m", None, overloaded=True)
+    assert limit.current == 4
+    # About one slot per limit's worth of calls
+    for _ in range(4):
+        limit.observe("turn", "m", 0.5)
+    assert limit.current == 4
+    limit.observe("turn", "m", 0.5)
+    assert limit.current == 5
+    for _ in range(100):
+        limit.observe("turn", "m", 0.5)
+    assert limit.current == 8
+
+
+def test_latency_over_tolerance_counts_as_slow(clock):
+    limit = AdaptiveLimit(max_limit=10, tolerance=2.0, backoff=0.5, cooldown=0.0)
+    for _ in range(MIN_SAMPLES):
+        limit.observe("turn", "m", 1.0)
+    assert limit.current == 10
+    for _ in range(5):
+        limit.observe("turn", "m", 10.0)
+    assert limit.current < 10
+
+
+def test_latency_is_judged_per_kind_and_model(clock):
+    limit = AdaptiveLimit(max_limit=10, tolerance=2.0, backoff=0.5, cooldown=0.0)
+    for _ in range(MIN_SAMPLES):
+        limit.observe("turn", "fast", 1.0)
+    # A model that is always slow sets its own baseline
+    for _ in range(10):
+        limit.observe("feedback", "slow", 20.0)
+    assert limit.current == 10
+
+
+def test_degraded_below_threshold(clock):
+    limit = AdaptiveLimit(max_limit=10, min_limit=1, backoff=0.4, degrade_below=0.5)
+    assert not limit.degraded
+    limit.observe("turn", "m", None, overloaded=True)
+    assert limit.degraded
+    for _ in range(50):
+        limit.observe("turn", "m", 0.5)
+    assert not limit.degraded
+
+
+def test_scheduler_capacity_follows_the_limit(clock):
+    limit = AdaptiveLimit(max_limit=4, min_limit=1, backoff=0.5)
+    scheduler = FairScheduler(max_in_flight=4, max_in_flight_per_key=4, limit=limit)
+    limit.observe("turn", "m", None, overloaded=True)
+    tickets = [scheduler.try_acquire("a"), scheduler.try_acquire("a")]
+    assert all(tickets)
+    assert scheduler.try_acquire("a") is None
+    for ticket in tickets:
+        ticket.release()
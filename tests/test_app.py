@@ -0,0 +1,60 @@
+"""Flask app session persistence"""
+
+import importlib
+import uuid
+
+import pytest
+
+from feedback_report import FeedbackReport
+from interview_engine import InterviewEngine
+from session_store import hash_api_key
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("app")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("SESSION_STORE_URL", "memory://")
+        patch.setenv("JOB_QUEUE_PATH", str(directory / "jobs.db"))
+        patch.setenv("TRANSCRIPT_LOG_PATH", str(directory / "transcripts.log"))
+        yield importlib.import_module("app")
+
+
+@pytest.fixture(autouse=True)
+def offline_engine(monkeypatch):
+    monkeypatch.setattr(InterviewEngine, "_after_turn", lambda self: None)
+
+
+def new_session(app_module):
+    api_key = f"sk-or-v1-{uuid.uuid4().hex}"
+    engine = InterviewEngine(api_key=api_key)
+    engine.start_interview("tech")
+    session_id = f"session_{uuid.uuid4().hex}"
+    record = {"api_key_hash": hash_api_key(api_key), "persona_id": "tech", "start_time": "2026-01-01T10:00:00"}
+    app_module.save_session(session_id, record, engine)
+    return session_id, api_key
+
+
+def test_save_session_keeps_background_state_stored_meanwhile(app_module):
+    session_id, api_key = new_session(app_module)
+    record = app_module.session_store.get(session_id)
+    engine = InterviewEngine.from_state(record["engine"], api_key=api_key)
+    engine.commit_response("I built a cache.", "Why there?")
+
+    evaluation = {"report": FeedbackReport(overall_assessment="Strong start").to_dict(), "evaluated_count": 2}
+    app_module.store_engine_state(session_id, "evaluation", evaluation)
+
+    app_module.save_session(session_id, record, engine)
+    stored = app_module.session_store.get(session_id)["engine"]
+    assert stored["evaluation"] == evaluation
+    assert len(stored["history"]) == 2
+
+
+def test_save_session_keeps_its_own_newer_background_state(app_module):
+    session_id, api_key = new_session(app_module)
+    record = app_module.session_store.get(session_id)
+    engine = InterviewEngine.from_state(record["engine"], api_key=api_key)
+    app_module.store_engine_state(session_id, "context", {"summary": "old", "summarized_count": 2})
+    engine.context.load_state({"summary": "newer", "summarized_count": 4})
+    app_module.save_session(session_id, record, engine)
+    assert app_module.session_store.get(session_id)["engine"]["context"] == {"summary": "newer", "summarized_count": 4}
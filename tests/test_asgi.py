@@ -0,0 +1,203 @@
+"""ASGI routes: sessions, streaming errors, rate limits and blocking I/O kept off the loop"""
+
+import asyncio
+import importlib
+import json
+import threading
+import uuid
+
+import pytest
+
+from async_engine import AsyncInterviewEngine
+from feedback_report import FeedbackReport
+from rate_limit import FairScheduler, RequestLimiter, TokenBuckets
+
+
+@pytest.fixture(scope="module")
+def asgi(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("asgi")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("SESSION_STORE_URL", "memory://")
+        patch.setenv("JOB_QUEUE_PATH", str(directory / "jobs.db"))
+        patch.setenv("TRANSCRIPT_LOG_PATH", str(directory / "transcripts.log"))
+        yield importlib.import_module("asgi")
+
+
+@pytest.fixture(autouse=True)
+def offline_engine(monkeypatch):
+    # No background summaries or evaluations reaching for the provider
+    monkeypatch.setattr(AsyncInterviewEngine, "_after_turn", lambda self: None)
+
+
+@pytest.fixture
+def api_key():
+    return f"sk-or-v1-{uuid.uuid4().hex}"
+
+
+def call(asgi, method, path, api_key=None, body=None, query=b""):
+    """Run one request through the app; returns (status, headers, body, messages sent)"""
+    headers = [(b"content-type", b"application/json")]
+    if api_key:
+        headers.append((b"x-api-key", api_key.encode()))
+    scope = {"type": "http", "method": method, "path": path, "headers": headers, "query_string": query}
+    request = [{"type": "http.request", "body": json.dumps(body).encode() if body is not None else b""}]
+    messages = []
+
+    async def receive():
+        return request.pop(0) if request else {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    starts = [m for m in messages if m["type"] == "http.response.start"]
+    assert len(starts) == 1, messages
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    assert not messages[-1].get("more_body"), "response left open"
+    return starts[0]["status"], dict(starts[0]["headers"]), body, messages
+
+
+def start(asgi, api_key):
+    status, _, body, _ = call(asgi, "POST", "/api/interview/start", api_key, {"persona_id": "tech"})
+    assert status == 200
+    return json.loads(body)["session_id"]
+
+
+def events(body):
+    parsed = []
+    for block in body.decode().strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        parsed.append((lines.get("event"), json.loads(lines["data"])))
+    return parsed
+
+
+def test_start_and_status(asgi, api_key):
+    session_id = start(asgi, api_key)
+    status, _, body, _ = call(asgi, "GET", "/api/interview/status", query=f"session_id={session_id}".encode())
+    assert status == 200
+    assert json.loads(body)["persona_id"] == "tech"
+
+
+def test_requests_need_a_valid_api_key(asgi):
+    assert call(asgi, "POST", "/api/interview/start", None, {"persona_id": "tech"})[0] == 401
+    assert call(asgi, "POST", "/api/interview/start", "not-a-key", {"persona_id": "tech"})[0] == 401
+
+
+def test_stream_sends_tokens_then_done_and_saves_the_turn(asgi, api_key, monkeypatch):
+    async def stream_ai_response(self, user_input):
+        for token in ("Tell ", "me ", "more."):
+            yield token
+        self.commit_response(user_input, "Tell me more.")
+
+    monkeypatch.setattr(AsyncInterviewEngine, "stream_ai_response", stream_ai_response)
+    session_id = start(asgi, api_key)
+    status, headers, body, _ = call(asgi, "POST", "/api/interview/respond/stream", api_key,
+                                    {"session_id": session_id, "user_message": "I built a cache."})
+    assert status == 200
+    assert headers[b"content-type"] == b"text/event-stream"
+    assert events(body) == [(None, {"token": "Tell "}), (None, {"token": "me "}), (None, {"token": "more."}),
+                            ("done", {"response": "Tell me more."})]
+
+    status, _, body, _ = call(asgi, "GET", "/api/interview/status", query=f"session_id={session_id}".encode())
+    assert json.loads(body)["message_count"] == 2
+
+
+def test_stream_failing_midway_ends_with_an_error_event(asgi, api_key, monkeypatch):
+    async def stream_ai_response(self, user_input):
+        yield "Tell "
+        raise ValueError("API request failed: connection reset")
+
+    monkeypatch.setattr(AsyncInterviewEngine, "stream_ai_response", stream_ai_response)
+    session_id = start(asgi, api_key)
+    status, _, body, _ = call(asgi, "POST", "/api/interview/respond/stream", api_key,
+                              {"session_id": session_id, "user_message": "I built a cache."})
+    assert status == 200
+    assert events(body) == [(None, {"token": "Tell "}), ("error", {"error": "API request failed: connection reset"})]
+
+    # The failed turn was not saved
+    status, _, body, _ = call(asgi, "GET", "/api/interview/status", query=f"session_id={session_id}".encode())
+    assert json.loads(body)["message_count"] == 0
+
+
+def test_stream_errors_before_the_headers_are_plain_json(asgi, api_key):
+    session_id = start(asgi, api_key)
+    status, _, body, _ = call(asgi, "POST", "/api/interview/respond/stream", api_key, {"session_id": session_id})
+    assert (status, json.loads(body)) == (400, {"error": "No message provided"})
+    status, _, body, _ = call(asgi, "POST", "/api/interview/respond/stream", api_key,
+                              {"session_id": "session_missing", "user_message": "hi"})
+    assert (status, json.loads(body)) == (400, {"error": "Invalid session"})
+
+
+def test_session_of_another_key_is_refused(asgi, api_key):
+    session_id = start(asgi, api_key)
+    status, _, _, _ = call(asgi, "POST", "/api/interview/respond", f"sk-or-v1-{uuid.uuid4().hex}",
+                           {"session_id": session_id, "user_message": "hi"})
+    assert status == 401
+
+
+def test_rate_limited_turn_gets_429_with_retry_after(asgi, api_key, monkeypatch):
+    limiter = RequestLimiter(TokenBuckets(1 / 60, 1), TokenBuckets(0, 1), FairScheduler())
+    monkeypatch.setattr(asgi, "get_limiter", lambda: limiter)
+    monkeypatch.setattr(AsyncInterviewEngine, "get_ai_response", lambda self, text: _reply(self, text))
+    session_id = start(asgi, api_key)
+    body = {"session_id": session_id, "user_message": "hi"}
+    assert call(asgi, "POST", "/api/interview/respond", api_key, body)[0] == 200
+    status, headers, response, _ = call(asgi, "POST", "/api/interview/respond", api_key, body)
+    assert status == 429
+    assert headers[b"retry-after"] == b"60"
+    assert json.loads(response)["reason"] == "key"
+
+
+async def _reply(engine, text):
+    engine.commit_response(text, "Go on.")
+    return "Go on."
+
+
+def test_session_store_calls_run_off_the_event_loop(asgi, api_key, monkeypatch):
+    threads = []
+    store = asgi.session_store
+    get, set_ = store.get, store.set
+
+    def recording(method):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return method(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(store, "get", recording(get))
+    monkeypatch.setattr(store, "set", recording(set_))
+    monkeypatch.setattr(AsyncInterviewEngine, "get_ai_response", lambda self, text: _reply(self, text))
+    session_id = start(asgi, api_key)
+    call(asgi, "POST", "/api/interview/respond", api_key, {"session_id": session_id, "user_message": "hi"})
+    assert threads
+    assert threading.main_thread() not in threads
+
+
+def test_unknown_route_is_404(asgi):
+    assert call(asgi, "GET", "/api/nope")[0] == 404
+
+
+def test_saving_a_turn_keeps_background_state_stored_meanwhile(asgi, api_key):
+    session_id = start(asgi, api_key)
+    record, engine = asyncio.run(asgi._load_session(session_id, api_key))
+    engine.commit_response("I built a cache.", "Why there?")
+
+    # A background evaluation and summary land while the request is in flight
+    evaluation = {"report": FeedbackReport(overall_assessment="Strong start").to_dict(), "evaluated_count": 2}
+    asgi._store_engine_state(session_id, "evaluation", evaluation)
+    asgi._store_engine_state(session_id, "context", {"summary": "Built a cache", "summarized_count": 2})
+
+    asyncio.run(asgi._save_session(session_id, record, engine))
+    stored = asgi.session_store.get(session_id)["engine"]
+    assert stored["evaluation"] == evaluation
+    assert stored["context"]["summarized_count"] == 2
+    assert len(stored["history"]) == 2
+
+
+def test_saving_a_turn_keeps_its_own_newer_background_state(asgi, api_key):
+    session_id = start(asgi, api_key)
+    record, engine = asyncio.run(asgi._load_session(session_id, api_key))
+    asgi._store_engine_state(session_id, "context", {"summary": "old", "summarized_count": 2})
+    engine.context.load_state({"summary": "newer", "summarized_count": 4})
+    asyncio.run(asgi._save_session(session_id, record, engine))
+    assert asgi.session_store.get(session_id)["engine"]["context"] == {"summary": "newer", "summarized_count": 4}
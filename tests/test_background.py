@@ -0,0 +1,152 @@
+"""Background tasks: one per key across requests, bounded backlog and scheduler admission"""
+
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import background
+from interview_engine import InterviewEngine
+from rate_limit import FairScheduler
+from running_evaluation import RunningEvaluation
+
+PERSONA = SimpleNamespace(interview_type="technical", company="Acme")
+HISTORY = [{"role": "user", "content": "I built a cache."}, {"role": "assistant", "content": "Why there?"}]
+REPORT = '{"scores": {}, "strengths": ["Clear"], "areas_for_improvement": [], "overall_assessment": "Good"}'
+
+
+class Blocked:
+    """A task body that waits until released, counting its calls"""
+
+    def __init__(self, result=None):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.done = threading.Event()
+        self.result = result
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        self.done.set()
+        return self.result
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = FairScheduler(max_in_flight=2, max_in_flight_per_key=2)
+    monkeypatch.setattr(background, "get_limiter", lambda: SimpleNamespace(scheduler=scheduler))
+    return scheduler
+
+
+def submit_when_idle(key, fn, admit=None):
+    """Submit once the key's previous task has finished"""
+    for _ in range(500):
+        if background.submit(key, fn, admit):
+            return
+        threading.Event().wait(0.01)
+    pytest.fail("key stayed in flight after its task finished")
+
+
+def test_one_task_per_key_until_it_finishes(scheduler):
+    key = (uuid.uuid4().hex, "evaluation")
+    task = Blocked()
+    assert background.submit(key, task)
+    assert task.started.wait(5)
+    assert not background.submit(key, task)
+    assert background.submit((uuid.uuid4().hex, "evaluation"), lambda: None)
+
+    task.release.set()
+    assert task.done.wait(5)
+    submit_when_idle(key, lambda: None)
+    assert task.calls == 1
+
+
+def test_evaluations_from_separate_engines_share_one_update(scheduler):
+    key = (uuid.uuid4().hex, "evaluation")
+    complete = Blocked(REPORT)
+    first, second = RunningEvaluation(), RunningEvaluation()
+    assert first.schedule_update(PERSONA, HISTORY, complete, key=key)
+    assert complete.started.wait(5)
+    # The next request's engine was loaded before the first update landed
+    assert not second.schedule_update(PERSONA, HISTORY, complete, key=key)
+    complete.release.set()
+    assert complete.done.wait(5)
+    assert complete.calls == 1
+
+
+def test_engines_for_one_session_schedule_one_evaluation(monkeypatch, scheduler):
+    complete = Blocked(REPORT)
+    monkeypatch.setattr(InterviewEngine, "_complete", complete)
+    api_key = f"sk-or-v1-{uuid.uuid4().hex}"
+    session_id = f"session_{uuid.uuid4().hex}"
+    engine = InterviewEngine(api_key=api_key)
+    engine.start_interview("tech")
+    state = engine.export_state()
+
+    for answer in ("I built a cache.", "It cut latency."):
+        engine = InterviewEngine.from_state(state, api_key=api_key)
+        engine.session_id = session_id
+        engine.commit_response(answer, "Why?")
+        state = engine.export_state()
+        assert complete.started.wait(5)
+    complete.release.set()
+    assert complete.done.wait(5)
+    assert complete.calls == 1
+
+
+def test_turns_on_one_session_schedule_one_summary(monkeypatch, scheduler):
+    summarize = Blocked("Built a cache")
+    monkeypatch.setattr(InterviewEngine, "_summarize", summarize)
+    monkeypatch.setattr(InterviewEngine, "_complete", lambda *args, **kwargs: REPORT)
+    api_key = f"sk-or-v1-{uuid.uuid4().hex}"
+    session_id = f"session_{uuid.uuid4().hex}"
+    engine = InterviewEngine(api_key=api_key)
+    engine.start_interview("tech")
+    state = engine.export_state()
+    # Enough turns that the oldest have aged out of the verbatim window
+    state["history"] = HISTORY * 2 * engine.context.keep_turns
+
+    for answer in ("I built a cache.", "It cut latency."):
+        engine = InterviewEngine.from_state(state, api_key=api_key)
+        engine.session_id = session_id
+        engine.commit_response(answer, "Why?")
+        assert engine.context.needs_summary(engine.conversation_history)
+        state = engine.export_state()
+        assert summarize.started.wait(5)
+    summarize.release.set()
+    assert summarize.done.wait(5)
+    assert summarize.calls == 1
+
+
+def test_backlog_is_bounded(monkeypatch, scheduler):
+    monkeypatch.setattr(background, "BACKGROUND_MAX_PENDING", 2)
+    tasks = [Blocked(), Blocked()]
+    try:
+        for task in tasks:
+            assert background.submit((uuid.uuid4().hex, "summary"), task)
+        assert not background.submit((uuid.uuid4().hex, "summary"), lambda: None)
+    finally:
+        for task in tasks:
+            task.release.set()
+    for task in tasks:
+        assert task.done.wait(5)
+
+
+def test_task_without_a_free_slot_is_dropped(scheduler):
+    admit = uuid.uuid4().hex
+    held = [scheduler.try_acquire(admit), scheduler.try_acquire(admit)]
+    ran = threading.Event()
+    key = (uuid.uuid4().hex, "evaluation")
+    assert background.submit(key, ran.set, admit)
+    submit_when_idle(key, ran.set, admit)
+    assert not ran.wait(0.1)
+
+    for ticket in held:
+        ticket.release()
+    done = threading.Event()
+    submit_when_idle(key, done.set, admit)
+    assert done.wait(5)
+    assert scheduler.in_flight == 0
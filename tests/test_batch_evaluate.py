@@ -0,0 +1,125 @@
+"""Batch evaluation: transcript reading, token-budgeted slices and resuming"""
+
+import asyncio
+import json
+
+import pytest
+
+import batch_evaluate
+from async_engine import AsyncInterviewEngine
+from batch_evaluate import completed_ids, evaluation_slices, normalize_history, read_transcripts, run_batch
+from context_window import count_message_tokens
+
+
+def interview(turns, words=50):
+    history = []
+    for n in range(turns):
+        history.append({"role": "assistant", "content": f"question {n} " + "word " * words})
+        history.append({"role": "user", "content": f"answer {n} " + "word " * words})
+    return history
+
+
+def test_short_transcript_is_one_slice():
+    history = interview(3)
+    assert evaluation_slices(history, 10000) == [len(history)]
+    assert evaluation_slices([], 100) == [0]
+
+
+@pytest.mark.parametrize("budget", [150, 300, 1000])
+def test_slices_fit_the_budget_and_cut_before_answers(budget):
+    history = interview(40)
+    ends = evaluation_slices(history, budget)
+    assert ends[-1] == len(history)
+    assert ends == sorted(set(ends))
+    start = 0
+    for end in ends:
+        assert count_message_tokens(history[start:end]) <= budget
+        if end < len(history):
+            assert history[end]["role"] == "user"
+        start = end
+
+
+def test_oversized_message_gets_a_slice_of_its_own():
+    history = interview(2) + [{"role": "assistant", "content": "word " * 2000}] + interview(2)
+    ends = evaluation_slices(history, 300)
+    assert ends[-1] == len(history)
+    assert any(end - start == 1 for start, end in zip([0] + ends, ends))
+
+
+def test_evaluate_transcript_folds_long_transcripts_a_slice_at_a_time(monkeypatch):
+    monkeypatch.setenv("CONTEXT_MAX_PROMPT_TOKENS", "400")
+    evaluated = []
+
+    async def get_interview_feedback(self):
+        evaluated.append(len(self.conversation_history))
+        return {"scores": {}, "evaluated": len(self.conversation_history)}
+
+    monkeypatch.setattr(AsyncInterviewEngine, "get_interview_feedback", get_interview_feedback)
+    history = interview(20)
+    result = asyncio.run(batch_evaluate.evaluate_transcript(
+        {"id": "t1", "persona_id": "tech", "history": history}, "sk-or-v1-test"))
+    assert result["status"] == "ok"
+    assert evaluated == evaluation_slices(history, 400)
+    assert len(evaluated) > 1
+    assert result["feedback"]["evaluated"] == len(history)
+
+
+def test_unparseable_feedback_fails_the_transcript(monkeypatch):
+    monkeypatch.setenv("CONTEXT_MAX_PROMPT_TOKENS", "400")
+    evaluated = []
+
+    async def get_interview_feedback(self):
+        evaluated.append(len(self.conversation_history))
+        return {"raw_feedback": "Scores: great"}
+
+    monkeypatch.setattr(AsyncInterviewEngine, "get_interview_feedback", get_interview_feedback)
+    history = interview(20)
+    result = asyncio.run(batch_evaluate.evaluate_transcript(
+        {"id": "t1", "persona_id": "tech", "history": history}, "sk-or-v1-test"))
+    assert result["status"] == "error"
+    assert "Unparseable feedback" in result["error"]
+    # No later slice is folded into a missing evaluation
+    assert evaluated == evaluation_slices(history, 400)[:1]
+
+
+def test_evaluate_transcript_reports_errors():
+    result = asyncio.run(batch_evaluate.evaluate_transcript({"id": "t1", "history": []}, "sk-or-v1-test"))
+    assert result["status"] == "error"
+    assert result["error"] == "persona_id not specified"
+
+
+def test_normalize_history_maps_speaker_labels():
+    assert normalize_history([{"role": "Interviewer", "content": "q"}, {"role": "candidate", "content": "a"}]) == [
+        {"role": "assistant", "content": "q"}, {"role": "user", "content": "a"}]
+    with pytest.raises(ValueError):
+        normalize_history([{"role": "narrator", "content": "x"}])
+
+
+def test_read_transcripts_skips_done_ids_and_flags_bad_lines(tmp_path):
+    path = tmp_path / "in.jsonl"
+    path.write_text('{"id": "a"}\n\n{"persona_id": "tech"}\nnot json\n{"id": "b"}\n')
+    transcripts = list(read_transcripts(str(path), skip_ids={"b"}))
+    assert [t["id"] for t in transcripts] == ["a", "line-3", "line-4"]
+    assert "invalid" in transcripts[2]
+
+
+def test_run_batch_resumes_and_retries_failures(tmp_path, monkeypatch):
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps({"id": f"t{n}", "persona_id": "tech"}) + "\n" for n in range(5)))
+    output = tmp_path / "out.jsonl"
+    output.write_text(
+        json.dumps({"id": "t0", "status": "ok"}) + "\n"
+        + json.dumps({"id": "t1", "status": "error"}) + "\n"
+        + '{"id": "t2", "sta'
+    )
+    scored = []
+
+    async def evaluate_transcript(transcript, api_key, model=None):
+        scored.append(transcript["id"])
+        return {"id": transcript["id"], "status": "ok"}
+
+    monkeypatch.setattr(batch_evaluate, "evaluate_transcript", evaluate_transcript)
+    counts = asyncio.run(run_batch(str(source), str(output), "sk-or-v1-test", concurrency=2))
+    assert sorted(scored) == ["t1", "t2", "t3", "t4"]
+    assert counts == {"skipped": 1, "ok": 4, "error": 0}
+    assert completed_ids(str(output)) == {f"t{n}" for n in range(5)}
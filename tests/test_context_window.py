@@ -0,0 +1,140 @@
+"""Context window: summary scheduling thresholds, token-budget trimming and summary placement"""
+
+import uuid
+
+import pytest
+
+import interview_engine
+from context_window import ContextWindow, count_message_tokens, estimate_tokens, message_tokens
+from interview_engine import InterviewEngine
+from transcript import ELIDED_CONTENT, Transcript
+
+SYSTEM = [{"role": "system", "content": "You are the interviewer."}]
+
+
+def exchanges(count, words=5):
+    """``count`` user/assistant pairs with numbered, distinguishable content"""
+    history = []
+    for i in range(count):
+        history.append({"role": "user", "content": f"answer {i} " + "word " * words})
+        history.append({"role": "assistant", "content": f"question {i} " + "word " * words})
+    return history
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("one two three") >= 3
+    assert message_tokens({"role": "user", "content": ""}) > 0
+
+
+@pytest.mark.parametrize("messages, summarized_count, due", [
+    (5, 0, False),
+    (6, 0, True),
+    (7, 2, False),
+    (8, 2, True),
+])
+def test_needs_summary_once_a_fold_batch_has_aged_out(messages, summarized_count, due):
+    # keep_turns=2 keeps 4 messages verbatim and folds 2 at a time
+    window = ContextWindow(max_prompt_tokens=1000, keep_turns=2, summarized_count=summarized_count)
+    assert window.needs_summary(exchanges(4)[:messages]) is due
+
+
+def test_build_sends_everything_within_budget():
+    history = exchanges(3)
+    window = ContextWindow(max_prompt_tokens=10000, keep_turns=2)
+    assert window.build(SYSTEM, history) == SYSTEM + history
+
+
+def test_build_trims_oldest_turns_to_the_budget():
+    history = exchanges(10, words=20)
+    budget = count_message_tokens(SYSTEM) + count_message_tokens(history[-5:])
+    window = ContextWindow(max_prompt_tokens=budget, keep_turns=2)
+
+    messages = window.build(SYSTEM, history)
+    assert count_message_tokens(messages) <= budget
+    assert messages[0] == SYSTEM[0]
+    # The newest turns survive, and the window opens on a candidate answer
+    assert messages[1:] == history[-4:]
+    assert messages[1]["role"] == "user"
+
+
+def test_build_keeps_the_newest_message_even_over_budget():
+    history = exchanges(2, words=200)
+    window = ContextWindow(max_prompt_tokens=1, keep_turns=2)
+    assert window.build(SYSTEM, history) == SYSTEM + history[-1:]
+
+
+def test_trailing_messages_count_against_the_budget():
+    history = exchanges(4, words=20)
+    trailing = [{"role": "system", "content": "Ask about caching. " * 10}]
+    budget = count_message_tokens(SYSTEM) + count_message_tokens(history[-4:])
+    window = ContextWindow(max_prompt_tokens=budget, keep_turns=2)
+
+    messages = window.build(SYSTEM, history, trailing)
+    assert messages[-1] == trailing[0]
+    assert count_message_tokens(messages) <= budget
+    assert len(messages) < len(SYSTEM) + 4 + 1
+
+
+def test_summary_replaces_the_turns_it_covers():
+    history = exchanges(4)
+    window = ContextWindow(max_prompt_tokens=10000, keep_turns=2, summary="Built a cache.", summarized_count=4)
+
+    messages = window.build(SYSTEM, history)
+    assert messages[0] == SYSTEM[0]
+    assert messages[1]["role"] == "system"
+    assert messages[1]["content"].endswith("Built a cache.")
+    # Summarized turns are not repeated verbatim; the first unsummarized one is
+    assert messages[2:] == history[4:]
+
+
+def test_summary_counts_against_the_budget():
+    history = exchanges(4, words=20)
+    budget = count_message_tokens(SYSTEM) + count_message_tokens(history[2:])
+    plain = ContextWindow(max_prompt_tokens=budget, keep_turns=2, summarized_count=2)
+    summarized = ContextWindow(max_prompt_tokens=budget, keep_turns=2, summary="notes " * 50, summarized_count=2)
+    assert plain.build(SYSTEM, history) == SYSTEM + history[2:]
+
+    messages = summarized.build(SYSTEM, history)
+    assert count_message_tokens(messages) <= budget
+    # The oldest unsummarized turns make room for the summary
+    verbatim = messages[2:]
+    assert 0 < len(verbatim) < len(history[2:])
+    assert verbatim == history[-len(verbatim):]
+    assert verbatim[0]["role"] == "user"
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(interview_engine, "QUESTION_BANK_TOP_K", 0)
+    engine = InterviewEngine(api_key=f"sk-or-v1-{uuid.uuid4().hex}")
+    engine.start_interview("tech")
+    engine.context = ContextWindow(max_prompt_tokens=10000, keep_turns=2)
+    return engine
+
+
+def test_build_messages_puts_the_summary_after_the_persona_prompt(engine):
+    engine.conversation_history = Transcript(exchanges(4))
+    engine.context.load_state({"summary": "Built a cache.", "summarized_count": 4})
+
+    messages = engine._build_messages(pending={"role": "user", "content": "It cut latency."})
+    assert messages[0]["content"] == engine._system_message()["content"]
+    assert messages[1]["content"].endswith("Built a cache.")
+    assert messages[2:] == exchanges(4)[4:] + [{"role": "user", "content": "It cut latency."}]
+
+
+def test_build_messages_never_sends_elided_turns(engine):
+    history = exchanges(4, words=200)
+    # Room for the unsummarized turns only, kept uncompressed so sizes are exact
+    max_bytes = sum(len(message["content"]) for message in history[4:])
+    engine.conversation_history = Transcript(history, max_bytes=max_bytes, hot_messages=2, compress_min_bytes=10 ** 9)
+    engine.context.load_state({"summary": "Built a cache.", "summarized_count": 4})
+    engine.evaluation.evaluated_count = 4
+    # Only turns covered by both the summary and the evaluation are dropped
+    engine.conversation_history.trim(4)
+    assert engine.conversation_history[3]["content"] == ELIDED_CONTENT
+    assert engine.conversation_history[4] == history[4]
+
+    messages = engine._build_messages()
+    assert all(message["content"] != ELIDED_CONTENT for message in messages)
+    assert messages[2:] == history[4:]
@@ -0,0 +1,201 @@
+"""Feedback report extraction, local repair and model-side repair"""
+
+import json
+
+import pytest
+import requests
+
+import interview_engine
+from feedback_report import (
+    FEEDBACK_RESPONSE_FORMAT,
+    SCORE_DIMENSIONS,
+    FeedbackParseError,
+    FeedbackReport,
+    JSONObjectExtractor,
+    build_repair_prompt,
+    extract_json_object,
+    parse_feedback_report,
+    repair_json
+)
+from interview_engine import InterviewEngine
+
+REPORT = {
+    "scores": {"technical_knowledge": 7, "communication": 8, "problem_solving": 6, "fit": None},
+    "strengths": ["Clear structure"],
+    "areas_for_improvement": ["Quantify impact"],
+    "overall_assessment": "Solid {overall} performance."
+}
+
+
+def test_extracts_object_from_fenced_output_with_prose():
+    content = "Here is the feedback:\n```json\n" + json.dumps(REPORT) + "\n```\nGood luck!"
+    assert extract_json_object(content) == REPORT
+
+
+def test_extractor_handles_streamed_chunks_and_braces_in_strings():
+    text = "noise " + json.dumps(REPORT) + " trailing {"
+    extractor = JSONObjectExtractor()
+    objects = []
+    for start in range(0, len(text), 7):
+        objects += extractor.feed(text[start:start + 7])
+    assert objects == [REPORT]
+    assert extractor.partial() == "{"
+
+
+def test_escaped_quotes_do_not_end_a_string():
+    assert extract_json_object(r'{"overall_assessment": "said \"{hi\""}') == {"overall_assessment": 'said "{hi"'}
+
+
+def test_repairs_truncated_output():
+    truncated = json.dumps(REPORT)[:-40]
+    data = extract_json_object("```json\n" + truncated)
+    assert data["scores"] == REPORT["scores"]
+    assert data["strengths"] == ["Clear structure"]
+
+
+def test_repair_json_drops_trailing_commas_and_closes_brackets():
+    assert json.loads(repair_json('{"a": [1, 2,], "b": "cut')) == {"a": [1, 2], "b": "cut"}
+    assert json.loads(repair_json('{"a": {"b": 1},')) == {"a": {"b": 1}}
+
+
+@pytest.mark.parametrize("text", ['{"a": 1, "ke', '{"a": 1, "key":', '{"a": 1, "key": tr', '{"a": 1, "b": {"c'])
+def test_repair_json_drops_a_key_cut_off_before_its_value(text):
+    assert json.loads(repair_json(text))["a"] == 1
+
+
+def test_repair_json_keeps_cut_off_array_items():
+    assert json.loads(repair_json('{"a": ["x", "y')) == {"a": ["x", "y"]}
+
+
+def test_no_object_found():
+    assert extract_json_object("I cannot provide feedback.") is None
+    with pytest.raises(FeedbackParseError) as raised:
+        parse_feedback_report("I cannot provide feedback.")
+    assert raised.value.errors == ["no JSON object found"]
+
+
+def test_parse_coerces_scores_and_lists():
+    report = parse_feedback_report(json.dumps({
+        "scores": {"technical_knowledge": "7.5", "communication": 14, "problem_solving": 0},
+        "strengths": "Calm under pressure",
+        "areas_for_improvement": ["a", "", "b", "c", "d", "e", "f"],
+        "overall_assessment": "ok"
+    }))
+    assert report.scores == {"technical_knowledge": 7.5, "communication": 10, "problem_solving": 1, "fit": None}
+    assert report.strengths == ["Calm under pressure"]
+    assert report.areas_for_improvement == ["a", "b", "c", "d", "e"]
+
+
+def test_parse_lists_every_problem():
+    content = json.dumps({"scores": {"communication": "great"}, "strengths": 3, "overall_assessment": []})
+    with pytest.raises(FeedbackParseError) as raised:
+        parse_feedback_report(content)
+    assert raised.value.errors == [
+        "'scores.communication' must be a number from 1 to 10 or null",
+        "'strengths' must be a list of strings",
+        "'overall_assessment' must be a string"
+    ]
+    assert raised.value.content == content
+
+
+def test_to_dict_omits_missing_delivery():
+    data = FeedbackReport().to_dict()
+    assert "delivery" not in data
+    assert data["scores"] == {key: None for key in SCORE_DIMENSIONS}
+
+
+def test_repair_prompt_carries_errors_and_output():
+    error = FeedbackParseError(["'strengths' must be a list of strings"], '{"strengths": 3}')
+    prompt = build_repair_prompt(error)
+    assert "'strengths' must be a list of strings" in prompt
+    assert '{"strengths": 3}' in prompt
+    assert '"required"' in prompt
+
+
+@pytest.fixture
+def engine():
+    engine = InterviewEngine(api_key="sk-or-v1-test")
+    engine.start_interview("tech")
+    engine.conversation_history.extend([
+        {"role": "assistant", "content": "Tell me about a system you designed."},
+        {"role": "user", "content": "I built a queue-backed ingestion pipeline."}
+    ])
+    return engine
+
+
+def scripted_completions(engine, monkeypatch, outputs):
+    calls = []
+
+    def complete(prompt, **kwargs):
+        calls.append(kwargs["kind"])
+        return outputs[len(calls) - 1]
+
+    monkeypatch.setattr(engine, "_complete", complete)
+    return calls
+
+
+def test_feedback_is_repaired_by_the_model(engine, monkeypatch):
+    monkeypatch.setattr(interview_engine, "FEEDBACK_MAX_REPAIRS", 1)
+    calls = scripted_completions(engine, monkeypatch, ['{"scores": "none"}', json.dumps(REPORT)])
+    feedback = engine.get_interview_feedback()
+    assert calls == ["feedback", "feedback_repair"]
+    assert feedback["scores"]["communication"] == 8
+    assert feedback["strengths"] == ["Clear structure"]
+
+
+def test_valid_feedback_needs_no_repair(engine, monkeypatch):
+    calls = scripted_completions(engine, monkeypatch, ["```json\n" + json.dumps(REPORT) + "\n```"])
+    assert engine.get_interview_feedback()["overall_assessment"] == REPORT["overall_assessment"]
+    assert calls == ["feedback"]
+
+
+def test_unrepairable_feedback_returns_the_raw_output(engine, monkeypatch):
+    monkeypatch.setattr(interview_engine, "FEEDBACK_MAX_REPAIRS", 1)
+    calls = scripted_completions(engine, monkeypatch, ["no json", "still no json"])
+    assert engine.get_interview_feedback() == {"raw_feedback": "still no json"}
+    assert calls == ["feedback", "feedback_repair"]
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.headers = {}
+        self.url = "https://openrouter.test/api/v1/chat/completions"
+        self._data = data or {}
+        self.content = json.dumps(self._data).encode()
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error", response=self)
+
+
+class SchemaRejectingSession:
+    """Answers 400 to requests carrying response_format, else a fixed completion"""
+
+    def __init__(self, content):
+        self.content = content
+        self.requests = []
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        request = json.loads(data)
+        self.requests.append(request)
+        if "response_format" in request:
+            return FakeResponse(400, {"error": {"message": "response_format is not supported"}})
+        return FakeResponse(200, {"choices": [{"message": {"content": self.content}}]})
+
+
+def test_model_rejecting_the_schema_is_retried_without_it():
+    session = SchemaRejectingSession(json.dumps(REPORT))
+    engine = InterviewEngine(api_key="sk-or-v1-test", model="test/no-structured-output", http_session=session)
+    request = {"prompt": "evaluate", "max_tokens": 500, "temperature": 0.3,
+               "response_format": FEEDBACK_RESPONSE_FORMAT, "kind": "feedback"}
+
+    assert parse_feedback_report(engine._complete(**request)).scores == REPORT["scores"]
+    assert ["response_format" in sent for sent in session.requests] == [True, False]
+
+    # Later requests to the same model skip the schema straight away
+    engine._complete(**request)
+    assert ["response_format" in sent for sent in session.requests] == [True, False, False]
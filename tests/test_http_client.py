@@ -0,0 +1,130 @@
+"""Pooled HTTP transport: retries, Retry-After cap and a pool that never blocks"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_client
+from http_client import async_post, close_async_client, create_session, retry_count
+
+
+class Upstream(ThreadingHTTPServer):
+    """Answers POSTs from a script of (status, headers) pairs, then 200"""
+
+    daemon_threads = True
+
+    def __init__(self, script=(), delay=0.0):
+        super().__init__(("127.0.0.1", 0), UpstreamHandler)
+        self.script = list(script)
+        self.delay = delay
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v1/chat/completions"
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+            status, headers = self.server.script.pop(0) if self.server.script else (200, {})
+        time.sleep(self.server.delay)
+        body = json.dumps({"status": status}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def start_upstream():
+    servers = []
+
+    def start(script=(), delay=0.0):
+        server = Upstream(script, delay)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.delenv("OPENROUTER_FALLBACK_MODELS", raising=False)
+    monkeypatch.setenv("OPENROUTER_MAX_RETRIES", "2")
+    monkeypatch.setenv("OPENROUTER_BACKOFF_FACTOR", "0.01")
+    monkeypatch.setenv("OPENROUTER_BACKOFF_JITTER", "0")
+    monkeypatch.setattr(http_client, "MAX_RETRY_AFTER", 0.1)
+
+
+def test_retries_transient_failures(start_upstream):
+    upstream = start_upstream(script=[(503, {}), (502, {})])
+    response = create_session().post(upstream.url, data="{}", timeout=5)
+    assert response.status_code == 200
+    assert retry_count(response) == 2
+
+
+def test_returns_the_last_failure_once_retries_run_out(start_upstream):
+    upstream = start_upstream(script=[(503, {}), (503, {}), (503, {})])
+    response = create_session().post(upstream.url, data="{}", timeout=5)
+    assert response.status_code == 503
+    assert upstream.requests == 3
+
+
+def test_retry_after_is_capped(start_upstream):
+    upstream = start_upstream(script=[(429, {"Retry-After": "3600"})])
+    started = time.monotonic()
+    response = create_session().post(upstream.url, data="{}", timeout=5)
+    assert response.status_code == 200
+    assert time.monotonic() - started < 2
+
+
+def test_pool_overflow_opens_extra_connections_instead_of_blocking(start_upstream):
+    upstream = start_upstream(delay=0.2)
+    session = create_session(pool_size=1)
+    with ThreadPoolExecutor(4) as pool:
+        started = time.monotonic()
+        statuses = list(pool.map(lambda _: session.post(upstream.url, data="{}", timeout=5).status_code, range(4)))
+    assert statuses == [200] * 4
+    # Run side by side rather than one at a time over the single pooled connection
+    assert time.monotonic() - started < 0.6
+
+
+def test_retry_delay_caps_retry_after_and_backs_off():
+    assert http_client._retry_delay(1, "3600") == 0.1
+    assert http_client._retry_delay(1, "0.05") == 0.05
+    assert http_client._retry_delay(3, "soon") == pytest.approx(0.04)
+
+
+def test_async_post_retries_with_capped_waits(start_upstream):
+    upstream = start_upstream(script=[(429, {"Retry-After": "3600"}), (500, {})])
+    async def main():
+        started = time.monotonic()
+        try:
+            async with async_post(upstream.url, content=b"{}") as response:
+                await response.aread()
+                return response.status_code, response.extensions["retries"], time.monotonic() - started
+        finally:
+            await close_async_client()
+
+    status, retries, elapsed = asyncio.run(main())
+    assert (status, retries) == (200, 2)
+    assert elapsed < 2
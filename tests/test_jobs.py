@@ -0,0 +1,142 @@
+"""SQLite job queue: dedupe, ownership, retries, inline runs and waiting"""
+
+import asyncio
+import threading
+
+import pytest
+
+import jobs
+from jobs import DONE, FAILED, JobQueue
+
+KEY = "sk-or-v1-alice"
+
+
+class Handler:
+    def __init__(self, fail=0, block=False):
+        self.calls = []
+        self.fail = fail
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self, payload, api_key):
+        self.calls.append((payload, api_key, threading.current_thread().name))
+        self.release.wait(5)
+        if len(self.calls) <= self.fail:
+            raise ValueError("upstream failed")
+        return {"echo": payload["n"]}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+def make_queue(path, handler, **kwargs):
+    queue = JobQueue(path, **kwargs)
+    queue.register("echo", handler)
+    return queue
+
+
+def wait_done(queue, job_id, api_key=KEY, timeout=5.0):
+    return asyncio.run(queue.wait(job_id, api_key, timeout))
+
+
+def test_inline_submit_runs_the_job_before_returning(path):
+    handler = Handler()
+    queue = make_queue(path, handler, inline=True)
+    job = queue.submit("echo", {"n": 1}, KEY, "s1")
+    assert job["status"] == DONE
+    assert job["result"] == {"echo": 1}
+    assert handler.calls[0][1:] == (KEY, threading.current_thread().name)
+    assert queue._threads == []
+
+
+def test_workers_run_jobs_and_wait_returns_the_result(path):
+    handler = Handler()
+    queue = make_queue(path, handler, workers=2)
+    job = queue.submit("echo", {"n": 2}, KEY, "s1")
+    assert wait_done(queue, job["job_id"]) == {"job_id": job["job_id"], "status": DONE, "result": {"echo": 2}}
+    assert handler.calls[0][2].startswith("interview-jobs-")
+
+
+def test_same_dedupe_key_returns_the_same_job(path):
+    handler = Handler(block=True)
+    queue = make_queue(path, handler)
+    first = queue.submit("echo", {"n": 3}, KEY, "s1")
+    second = queue.submit("echo", {"n": 3}, KEY, "s1")
+    assert first["job_id"] == second["job_id"]
+    handler.release.set()
+    wait_done(queue, first["job_id"])
+    assert len(handler.calls) == 1
+    assert queue.find("s1", KEY)["status"] == DONE
+
+
+def test_jobs_belong_to_their_api_key(path):
+    queue = make_queue(path, Handler(), inline=True)
+    job = queue.submit("echo", {"n": 4}, KEY, "s1")
+    assert queue.get(job["job_id"], "sk-or-v1-mallory") is None
+    assert queue.find("s1", "sk-or-v1-mallory") is None
+    with pytest.raises(ValueError):
+        queue.submit("echo", {"n": 4}, "sk-or-v1-mallory", "s1")
+
+
+def test_failed_job_is_retried_by_submitting_again(path):
+    handler = Handler(fail=1)
+    queue = make_queue(path, handler, inline=True)
+    failed = queue.submit("echo", {"n": 5}, KEY, "s1")
+    assert failed["status"] == FAILED
+    assert failed["error"] == "upstream failed"
+    retried = queue.submit("echo", {"n": 5}, KEY, "s1")
+    assert retried == {"job_id": failed["job_id"], "status": DONE, "result": {"echo": 5}}
+
+
+def test_unknown_kind_fails(path):
+    queue = make_queue(path, Handler(), inline=True)
+    job = queue.submit("missing", {}, KEY, "s1")
+    assert job["status"] == FAILED
+    assert "No handler" in job["error"]
+
+
+def test_job_orphaned_by_a_restart_is_adopted_on_poll(path):
+    # The process that accepted the job died before running it
+    orphaned = make_queue(path, Handler(), inline=True)
+    orphaned._hand_over = lambda job_id, api_key: None
+    job = orphaned.submit("echo", {"n": 6}, KEY, "s1")
+    assert job["status"] == "queued"
+
+    restarted = make_queue(path, Handler(), inline=True)
+    assert restarted.get(job["job_id"], KEY)["result"] == {"echo": 6}
+
+
+def test_stale_running_job_runs_again(path, monkeypatch):
+    handler = Handler()
+    queue = make_queue(path, handler, inline=True, stale_seconds=60)
+    queue._hand_over = lambda job_id, api_key: None
+    job = queue.submit("echo", {"n": 7}, KEY, "s1")
+    with queue._connect() as conn:
+        conn.execute("UPDATE jobs SET status = 'running'")
+
+    other = make_queue(path, handler, inline=True, stale_seconds=60)
+    assert other.get(job["job_id"], KEY)["status"] == "running"
+    now = jobs.time.time()
+    monkeypatch.setattr(jobs.time, "time", lambda: now + 61)
+    assert other.get(job["job_id"], KEY)["status"] == DONE
+
+
+def test_finished_jobs_expire(path, monkeypatch):
+    queue = make_queue(path, Handler(), inline=True, ttl_seconds=60)
+    job = queue.submit("echo", {"n": 8}, KEY, "s1")
+    now = jobs.time.time()
+    monkeypatch.setattr(jobs.time, "time", lambda: now + 61)
+    queue.submit("echo", {"n": 9}, KEY, "s2")
+    assert queue.get(job["job_id"], KEY) is None
+
+
+def test_wait_times_out_on_a_running_job(path):
+    handler = Handler(block=True)
+    queue = make_queue(path, handler)
+    job = queue.submit("echo", {"n": 10}, KEY, "s1")
+    assert wait_done(queue, job["job_id"], timeout=0.1)["status"] in ("queued", "running")
+    handler.release.set()
+    assert wait_done(queue, job["job_id"])["status"] == DONE
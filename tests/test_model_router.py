@@ -0,0 +1,186 @@
+"""Model routing: health, fallback, hedging and cooldowns"""
+
+import asyncio
+import time
+
+import pytest
+
+from adaptive_limit import AdaptiveLimit
+from model_router import ModelRouter, ModelUnavailable
+
+
+def test_errors_other_than_model_unavailable_leave_health_alone():
+    router = ModelRouter(fallback_models=["fallback"], min_samples=1)
+
+    def attempt(model):
+        raise ValueError("API request failed: 401 Unauthorized")
+
+    for _ in range(10):
+        with pytest.raises(ValueError):
+            router.call("primary", "turn", attempt)
+    stats = router._model_stats("primary")
+    assert stats.error_rate() == 0
+    assert len(stats.outcomes) == 0
+    assert router.is_healthy("primary")
+    assert router.candidates("primary") == ["primary", "fallback"]
+
+
+def test_async_errors_other_than_model_unavailable_leave_health_alone():
+    router = ModelRouter(min_samples=1)
+
+    async def attempt(model):
+        raise ValueError("API request failed: 400 Bad Request")
+
+    async def main():
+        for _ in range(10):
+            with pytest.raises(ValueError):
+                await router.acall("primary", "turn", attempt)
+
+    asyncio.run(main())
+    assert router._model_stats("primary").error_rate() == 0
+    assert router.is_healthy("primary")
+
+
+def test_model_unavailable_counts_against_health():
+    router = ModelRouter(fallback_models=["fallback"], min_samples=2)
+
+    def attempt(model):
+        if model == "primary":
+            raise ModelUnavailable("API request failed: 503")
+        return model
+
+    for _ in range(2):
+        assert router.call("primary", "turn", attempt) == "fallback"
+    assert router._model_stats("primary").error_rate() == 1
+    assert router.candidates("primary") == ["fallback", "primary"]
+
+
+class Attempts:
+    """A fake attempt: per-model results, errors or delays, recording the calls"""
+
+    def __init__(self, **outcomes):
+        self.outcomes = outcomes
+        self.models = []
+
+    def __call__(self, model):
+        self.models.append(model)
+        outcome = self.outcomes.get(model, model)
+        if isinstance(outcome, tuple):
+            delay, outcome = outcome
+            time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_falls_back_in_order_on_model_unavailable():
+    router = ModelRouter(fallback_models=["b", "c"])
+    attempt = Attempts(a=ModelUnavailable("timeout"), b=ModelUnavailable("503"))
+    assert router.call("a", "turn", attempt) == "c"
+    assert attempt.models == ["a", "b", "c"]
+
+
+def test_raises_the_last_error_when_every_model_is_unavailable():
+    router = ModelRouter(fallback_models=["b"])
+    attempt = Attempts(a=ModelUnavailable("timeout"), b=ModelUnavailable("502 from b"))
+    with pytest.raises(ModelUnavailable, match="502 from b"):
+        router.call("a", "turn", attempt)
+
+
+def test_other_errors_do_not_fall_back():
+    router = ModelRouter(fallback_models=["b"])
+    attempt = Attempts(a=ValueError("API request failed: 400"))
+    with pytest.raises(ValueError, match="400"):
+        router.call("a", "turn", attempt)
+    assert attempt.models == ["a"]
+
+
+def test_healthy_fallbacks_are_ranked_by_latency():
+    router = ModelRouter(fallback_models=["slow", "fast"])
+    for _ in range(3):
+        router.record("slow", "turn", 2.0)
+        router.record("fast", "turn", 0.5)
+    assert router.candidates("primary") == ["primary", "fast", "slow"]
+
+
+def test_degraded_model_leads_turns_under_pressure():
+    limit = AdaptiveLimit(max_limit=10, min_limit=1, backoff=0.1)
+    router = ModelRouter(fallback_models=["b"], degraded_model="cheap", limit=limit)
+    assert router.candidates("a", "turn") == ["a", "b"]
+    limit.observe("turn", "a", None, overloaded=True)
+    assert router.candidates("a", "turn") == ["cheap", "a", "b"]
+    assert router.candidates("a", "feedback") == ["a", "b"]
+
+
+def test_rate_limited_model_cools_down_for_retry_after():
+    router = ModelRouter(fallback_models=["b"], cooldown=30)
+    attempt = Attempts(a=ModelUnavailable("429", retry_after=0.1, rate_limited=True))
+    assert router.call("a", "turn", attempt) == "b"
+    assert not router.is_healthy("a")
+    assert router.candidates("a") == ["b", "a"]
+    time.sleep(0.15)
+    assert router.is_healthy("a")
+    assert router.candidates("a") == ["a", "b"]
+
+
+def test_rate_limited_model_without_retry_after_uses_the_default_cooldown():
+    router = ModelRouter(fallback_models=["b"], cooldown=30)
+    router.call("a", "turn", Attempts(a=ModelUnavailable("429", rate_limited=True)))
+    assert router._model_stats("a").cooldown_until - time.monotonic() > 29
+
+
+def test_hedge_wins_and_the_loser_is_discarded():
+    router = ModelRouter(fallback_models=["b"], hedge=True, hedge_delay=0.05)
+    attempt = Attempts(a=(0.3, "slow reply"), b="fast reply")
+    discarded = []
+    assert router.call("a", "turn", attempt, hedge=True, discard=discarded.append) == "fast reply"
+    assert attempt.models == ["a", "b"]
+    deadline = time.monotonic() + 2
+    while not discarded and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert discarded == ["slow reply"]
+
+
+def test_no_hedge_when_the_primary_answers_in_time():
+    router = ModelRouter(fallback_models=["b"], hedge=True, hedge_delay=1.0)
+    attempt = Attempts(a=(0.01, "reply"))
+    assert router.call("a", "turn", attempt, hedge=True) == "reply"
+    assert attempt.models == ["a"]
+
+
+def test_hedged_call_falls_back_when_the_primary_fails():
+    router = ModelRouter(fallback_models=["b"], hedge=True, hedge_delay=5.0)
+    attempt = Attempts(a=ModelUnavailable("timeout"))
+    assert router.call("a", "turn", attempt, hedge=True) == "b"
+
+
+def test_async_hedge_cancels_and_discards_the_loser():
+    router = ModelRouter(fallback_models=["b"], hedge=True, hedge_delay=0.05)
+    cancelled = []
+
+    async def attempt(model):
+        if model == "a":
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(model)
+                raise
+            return "slow reply"
+        return "fast reply"
+
+    async def discard(result):
+        pytest.fail("a cancelled attempt has no result to discard")
+
+    assert asyncio.run(router.acall("a", "turn", attempt, hedge=True, discard=discard)) == "fast reply"
+    assert cancelled == ["a"]
+
+
+def test_structured_output_is_dropped_for_models_that_rejected_it():
+    router = ModelRouter()
+    payload = {"messages": [], "response_format": {"type": "json_schema"}}
+    assert router.payload_for(payload, "a") == dict(payload, model="a")
+    router.reject_structured_output("a")
+    assert router.payload_for(payload, "a") == {"messages": [], "model": "a"}
+    assert "response_format" in router.payload_for(payload, "b")
+    # The caller's payload is left as it was
+    assert "response_format" in payload
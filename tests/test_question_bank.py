@@ -0,0 +1,113 @@
+"""Question bank retrieval index"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+import question_bank
+from question_bank import BankItem, InvertedIndex, QuestionBank, hashed_features, index_path, load_items
+
+ITEMS = [
+    BankItem("Design a URL shortener that handles millions of reads per second.", "design", ("system design",)),
+    BankItem("How would you design a rate limiter for a public API?", "design", ("rate limiting",)),
+    BankItem("Tell me about a time you disagreed with your manager.", "behavioral", ("conflict",)),
+    BankItem("Estimate the market size for electric scooters in Paris.", "case", ("market sizing",)),
+    BankItem("Walk me through a discounted cash flow valuation.", "question", ("valuation", "finance")),
+]
+
+
+@pytest.fixture
+def bank():
+    return QuestionBank(ITEMS, question_bank._index_items(ITEMS))
+
+
+def write_bank(path, items):
+    with open(path, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps({"text": item.text, "kind": item.kind, "tags": list(item.tags)}) + "\n")
+
+
+def test_search_ranks_the_closest_item_first(bank):
+    hits = bank.search("we should limit the rate of API requests per client", k=3)
+    assert hits[0] == (1, ITEMS[1])
+
+
+def test_search_matches_inflections_and_tags(bank):
+    assert bank.search("disagreeing with managers", k=1)[0][0] == 2
+    assert bank.search("market sizing", k=1)[0][0] == 3
+
+
+def test_search_skips_excluded_items(bank):
+    hits = bank.search("design a URL shortener and a rate limiter", k=2, exclude=[1])
+    assert 1 not in [item_id for item_id, _ in hits]
+    assert hits and hits[0][0] == 0
+
+
+def test_search_returns_at_most_k(bank):
+    assert len(bank.search("design valuation market manager", k=2, min_score=0)) == 2
+
+
+def test_unrelated_or_empty_query_finds_nothing(bank):
+    assert bank.search("photosynthesis in tropical plants", k=3) == []
+    assert bank.search("", k=3) == []
+    assert bank.search("the and of", k=3) == []
+
+
+def test_min_score_filters_weak_matches(bank):
+    assert bank.search("design", k=5, min_score=0.99) == []
+    assert bank.search("design", k=5, min_score=0.0)
+
+
+def test_similarity_is_cosine():
+    index = InvertedIndex.build([hashed_features("alpha beta"), hashed_features("gamma delta")])
+    [(item_id, score)] = index.search(hashed_features("alpha beta"), k=1)
+    assert item_id == 0
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_posting_budget_keeps_the_best_match():
+    rng = np.random.default_rng(0)
+    vocabulary = [f"word{n}" for n in range(300)]
+    texts = [" ".join(rng.choice(vocabulary, 12)) for _ in range(2000)]
+    index = InvertedIndex.build([hashed_features(text) for text in texts])
+    index.max_postings = 200
+    query = hashed_features(texts[1234])
+    assert index.search(query, k=1)[0][0] == 1234
+    assert index.search(query, k=1, exhaustive=True)[0][0] == 1234
+
+
+def test_load_builds_saves_and_reuses_the_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(question_bank, "SAVE_MIN_ITEMS", 0)
+    path = str(tmp_path / "tech.questions.jsonl")
+    write_bank(path, ITEMS)
+
+    bank = QuestionBank.load(path)
+    assert os.path.exists(index_path(path))
+    assert bank.search("rate limiter", k=1)[0][0] == 1
+
+    # A saved index is used as is, and rebuilt once the bank changes
+    monkeypatch.setattr(question_bank, "_index_items", lambda items: pytest.fail("index rebuilt"))
+    QuestionBank.load(path)
+    monkeypatch.undo()
+    monkeypatch.setattr(question_bank, "SAVE_MIN_ITEMS", 0)
+    write_bank(path, ITEMS[2:])
+    assert QuestionBank.load(path).search("rate limiter", k=1) == []
+
+
+def test_load_items_needs_text(tmp_path):
+    path = tmp_path / "bad.questions.jsonl"
+    path.write_text('{"text": "ok"}\n\n{"kind": "case"}\n')
+    with pytest.raises(ValueError, match=":3:"):
+        load_items(str(path))
+
+
+def test_shipped_banks_find_their_own_items():
+    personas = os.path.join(os.path.dirname(os.path.dirname(__file__)), "personas")
+    for name in sorted(os.listdir(personas)):
+        if name.endswith(".questions.jsonl"):
+            # Small banks are indexed in memory, nothing is written next to them
+            bank = QuestionBank.load(os.path.join(personas, name))
+            for item_id, item in enumerate(bank.items):
+                assert bank.search(item.text, k=1)[0][0] == item_id, (name, item.text)
@@ -0,0 +1,196 @@
+"""Token-bucket rate limits and fair scheduling of upstream-bound requests"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import rate_limit
+from rate_limit import FairScheduler, RateLimited, RequestLimiter, TokenBuckets
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def make_limiter(key_rate=1.0, key_burst=3, session_rate=1.0, session_burst=2, **scheduler):
+    return RequestLimiter(TokenBuckets(key_rate, key_burst), TokenBuckets(session_rate, session_burst),
+                          FairScheduler(**scheduler))
+
+
+def test_key_bucket_exhaustion_raises_rate_limited(clock):
+    limiter = make_limiter(key_rate=0.5, key_burst=3)
+    for _ in range(3):
+        limiter.check("key")
+    with pytest.raises(RateLimited) as raised:
+        limiter.check("key")
+    assert raised.value.status == 429
+    assert raised.value.reason == "key"
+    assert raised.value.retry_after == pytest.approx(2.0)
+    assert raised.value.retry_after_header == "2"
+
+
+def test_session_bucket_exhaustion_raises_rate_limited(clock):
+    limiter = make_limiter(session_burst=2)
+    limiter.check("key", "s1")
+    limiter.check("key", "s1")
+    with pytest.raises(RateLimited) as raised:
+        limiter.check("key", "s1")
+    assert raised.value.reason == "session"
+    # Other sessions of the same key still have tokens
+    limiter.check("key", "s2")
+
+
+def test_rejected_request_spends_no_tokens(clock):
+    limiter = make_limiter(key_burst=5, session_burst=1)
+    limiter.check("key", "s1")
+    for _ in range(3):
+        with pytest.raises(RateLimited):
+            limiter.check("key", "s1")
+    for _ in range(4):
+        limiter.check("key")
+
+
+def test_buckets_refill_over_time(clock):
+    limiter = make_limiter(key_rate=1.0, key_burst=1)
+    limiter.check("key")
+    with pytest.raises(RateLimited):
+        limiter.check("key")
+    clock.now += 1.0
+    limiter.check("key")
+
+
+def test_keys_are_limited_independently(clock):
+    limiter = make_limiter(key_burst=1)
+    limiter.check("a")
+    limiter.check("b")
+    with pytest.raises(RateLimited):
+        limiter.check("a")
+
+
+def test_zero_rate_disables_a_bucket(clock):
+    limiter = make_limiter(key_rate=0, session_rate=0)
+    for _ in range(100):
+        limiter.check("key", "s1")
+
+
+def test_least_recently_used_buckets_are_dropped():
+    buckets = TokenBuckets(1.0, 1, max_keys=2)
+    for key in ("a", "b", "c"):
+        buckets.take(key, 0.0)
+    assert buckets.wait_time("a", 0.0) == 0.0
+    assert buckets.wait_time("c", 0.0) > 0.0
+
+
+def test_scheduler_rejects_past_the_per_key_queue():
+    scheduler = FairScheduler(max_in_flight=10, max_in_flight_per_key=1, max_queued_per_key=0)
+    ticket = scheduler.acquire("a")
+    with pytest.raises(RateLimited) as raised:
+        scheduler.acquire("a")
+    assert raised.value.reason == "queue_full"
+    assert raised.value.status == 429
+    # Another key is unaffected
+    scheduler.acquire("b").release()
+    ticket.release()
+    scheduler.acquire("a").release()
+
+
+def test_scheduler_times_out_with_503():
+    scheduler = FairScheduler(max_in_flight=1, max_in_flight_per_key=1, queue_timeout=0.05)
+    ticket = scheduler.acquire("a")
+    # Requests usually finish quickly, so this one queues instead of being shed at once
+    scheduler._hold_seconds = 0.01
+    with pytest.raises(RateLimited) as raised:
+        scheduler.acquire("a")
+    assert raised.value.reason == "queue_timeout"
+    assert raised.value.status == 503
+    assert scheduler.queued == 0
+    ticket.release()
+    assert scheduler.in_flight == 0
+
+
+def test_scheduler_sheds_a_wait_bound_to_time_out():
+    scheduler = FairScheduler(max_in_flight=1, max_in_flight_per_key=1, queue_timeout=0.5)
+    ticket = scheduler.acquire("a")
+    scheduler._hold_seconds = 2.0
+    with pytest.raises(RateLimited) as raised:
+        scheduler.acquire("b")
+    assert raised.value.reason == "overloaded"
+    assert raised.value.retry_after == pytest.approx(2.0)
+    ticket.release()
+
+
+def test_scheduler_sheds_when_all_queues_are_full():
+    scheduler = FairScheduler(max_in_flight=1, max_in_flight_per_key=1, max_queued=0)
+    ticket = scheduler.acquire("a")
+    with pytest.raises(RateLimited) as raised:
+        scheduler.acquire("b")
+    assert raised.value.reason == "overloaded"
+    assert raised.value.status == 503
+    ticket.release()
+
+
+def test_freed_slots_go_to_waiting_keys_round_robin():
+    scheduler = FairScheduler(max_in_flight=1, max_in_flight_per_key=1, max_queued_per_key=4, queue_timeout=5)
+    held = scheduler.acquire("busy")
+    order = []
+    order_lock = threading.Lock()
+
+    def request(key):
+        with scheduler.acquire(key):
+            with order_lock:
+                order.append(key)
+
+    threads = []
+    for key in ("a", "a", "a", "b"):
+        thread = threading.Thread(target=request, args=(key,))
+        thread.start()
+        threads.append(thread)
+        # Queue in a known order
+        while scheduler.queued < len(threads):
+            time.sleep(0.001)
+    held.release()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["a", "b", "a", "a"]
+
+
+def test_try_admit_spends_a_token_only_with_a_slot(clock):
+    limiter = make_limiter(key_burst=2, max_in_flight=1, max_in_flight_per_key=1)
+    ticket = limiter.try_admit("key")
+    assert ticket is not None
+    assert limiter.try_admit("key") is None
+    ticket.release()
+    # The failed attempt left the second token
+    assert limiter.try_admit("key") is not None
+
+
+def test_try_admit_respects_the_key_bucket(clock):
+    limiter = make_limiter(key_burst=1)
+    limiter.check("key")
+    assert limiter.try_admit("key") is None
+
+
+def test_aacquire_waits_for_a_slot_freed_by_another_thread():
+    scheduler = FairScheduler(max_in_flight=1, max_in_flight_per_key=1, queue_timeout=5)
+    held = scheduler.acquire("a")
+
+    async def main():
+        threading.Timer(0.05, held.release).start()
+        ticket = await scheduler.aacquire("b")
+        ticket.release()
+
+    asyncio.run(main())
+    assert scheduler.in_flight == 0 and scheduler.queued == 0
@@ -0,0 +1,240 @@
+"""Session store round trips, expiry and the Redis protocol client"""
+
+import socket
+import socketserver
+import threading
+
+import pytest
+
+import session_store
+from session_store import MemorySessionStore, RedisSessionStore, SQLiteSessionStore, create_session_store
+
+RECORD = {"persona_id": "tech", "engine": {"history": [{"role": "user", "content": "héllo\r\n$3\r\n"}]}}
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(session_store.time, "time", clock)
+    return clock
+
+
+class RespStub(socketserver.ThreadingTCPServer):
+    """Just enough of a Redis server for the session store: GET, SET [EX], DEL, AUTH, SELECT"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, clock, password=None):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.clock = clock
+        self.password = password
+        self.data = {}
+        self.commands = []
+        self.connections = []
+        self.accepted = 0
+
+    def drop_connections(self) -> None:
+        for connection in self.connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                # Already closed by the handler
+                pass
+        self.connections = []
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        self.server.connections.append(self.request)
+        self.server.accepted += 1
+        authenticated = self.server.password is None
+        while True:
+            try:
+                args = self.read_command()
+            except (OSError, ValueError):
+                return
+            if args is None:
+                return
+            self.server.commands.append(args)
+            name = args[0].upper()
+            if name == b"AUTH":
+                authenticated = args[1].decode() == self.server.password
+                self.wfile.write(b"+OK\r\n" if authenticated else b"-ERR invalid password\r\n")
+            elif not authenticated:
+                self.wfile.write(b"-NOAUTH Authentication required.\r\n")
+            elif name == b"SELECT":
+                self.wfile.write(b"+OK\r\n")
+            elif name == b"SET":
+                expires_at = self.server.clock() + int(args[4]) if len(args) > 3 and args[3].upper() == b"EX" else None
+                self.server.data[args[1]] = (args[2], expires_at)
+                self.wfile.write(b"+OK\r\n")
+            elif name == b"GET":
+                value, expires_at = self.server.data.get(args[1], (None, None))
+                if value is not None and expires_at is not None and expires_at <= self.server.clock():
+                    del self.server.data[args[1]]
+                    value = None
+                if value is None:
+                    self.wfile.write(b"$-1\r\n")
+                else:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            elif name == b"DEL":
+                self.wfile.write(b":%d\r\n" % int(self.server.data.pop(args[1], None) is not None))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        assert line.startswith(b"*")
+        args = []
+        for _ in range(int(line[1:-2])):
+            header = self.rfile.readline()
+            assert header.startswith(b"$")
+            args.append(self.rfile.read(int(header[1:-2]) + 2)[:-2])
+        return args
+
+
+@pytest.fixture
+def redis_stub(clock):
+    server = RespStub(clock)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.drop_connections()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, clock, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore(ttl_seconds=60)
+    if request.param == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=60)
+    server = request.getfixturevalue("redis_stub")
+    return RedisSessionStore(port=server.server_address[1], ttl_seconds=60)
+
+
+def test_round_trip(store):
+    store.set("s1", RECORD)
+    assert store.get("s1") == RECORD
+    assert "s1" in store
+
+
+def test_missing_key(store):
+    assert store.get("nope") is None
+    assert "nope" not in store
+
+
+def test_set_replaces_and_delete_removes(store):
+    store.set("s1", RECORD)
+    store.set("s1", {"persona_id": "case"})
+    assert store.get("s1") == {"persona_id": "case"}
+    store.delete("s1")
+    assert store.get("s1") is None
+    # Deleting again is a no-op
+    store.delete("s1")
+
+
+def test_expiry(store, clock):
+    store.set("s1", RECORD)
+    clock.now += 59
+    assert store.get("s1") == RECORD
+    clock.now += 2
+    assert store.get("s1") is None
+
+
+def test_set_refreshes_ttl(store, clock):
+    store.set("s1", RECORD)
+    clock.now += 50
+    store.set("s1", RECORD)
+    clock.now += 50
+    assert store.get("s1") == RECORD
+
+
+def test_stored_record_is_a_copy():
+    store = MemorySessionStore()
+    record = {"engine": {"history": []}}
+    store.set("s1", record)
+    record["engine"]["history"].append("changed")
+    assert store.get("s1") == {"engine": {"history": []}}
+
+
+def test_memory_store_evicts_least_recently_used(clock):
+    store = MemorySessionStore(ttl_seconds=60, max_sessions=2)
+    store.set("a", {"n": 1})
+    store.set("b", {"n": 2})
+    store.get("a")
+    store.set("c", {"n": 3})
+    assert store.get("b") is None
+    assert store.get("a") == {"n": 1}
+    assert store.get("c") == {"n": 3}
+
+
+def test_memory_store_compresses_large_records():
+    store = MemorySessionStore(compress_min_bytes=64)
+    record = {"text": "the candidate explained the design " * 20}
+    store.set("s1", record)
+    assert isinstance(store._records["s1"][1], bytes)
+    assert store.get("s1") == record
+
+
+def test_redis_sends_ttl_with_set(redis_stub):
+    store = RedisSessionStore(port=redis_stub.server_address[1], ttl_seconds=7200, key_prefix="p:")
+    store.set("s1", RECORD)
+    assert redis_stub.commands[-1][:2] == [b"SET", b"p:s1"]
+    assert redis_stub.commands[-1][3:] == [b"EX", b"7200"]
+
+
+def test_redis_reconnects_after_dropped_connection(redis_stub):
+    store = RedisSessionStore(port=redis_stub.server_address[1], ttl_seconds=60)
+    store.set("s1", RECORD)
+    redis_stub.drop_connections()
+    assert store.get("s1") == RECORD
+    assert redis_stub.accepted == 2
+    store.set("s2", {"n": 2})
+    assert store.get("s2") == {"n": 2}
+
+
+def test_redis_authenticates_and_selects_db(clock):
+    server = RespStub(clock, password="secret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        store = create_session_store(f"redis://:secret@127.0.0.1:{server.server_address[1]}/3")
+        store.set("s1", RECORD)
+        assert store.get("s1") == RECORD
+        assert server.commands[:2] == [[b"AUTH", b"secret"], [b"SELECT", b"3"]]
+    finally:
+        server.shutdown()
+        server.drop_connections()
+        server.server_close()
+
+
+def test_redis_error_reply_raises(clock):
+    server = RespStub(clock, password="secret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        store = RedisSessionStore(port=server.server_address[1])
+        with pytest.raises(ValueError, match="NOAUTH"):
+            store.get("s1")
+    finally:
+        server.shutdown()
+        server.drop_connections()
+        server.server_close()
+
+
+def test_create_session_store_from_url(tmp_path):
+    assert isinstance(create_session_store("memory://"), MemorySessionStore)
+    assert isinstance(create_session_store(f"sqlite:///{tmp_path}/s.db"), SQLiteSessionStore)
+    with pytest.raises(ValueError):
+        create_session_store("postgres://localhost/db")
@@ -0,0 +1,158 @@
+"""Speculative prefetch of interviewer replies from drafts"""
+
+import threading
+import time
+
+import pytest
+
+import speculation
+from rate_limit import FairScheduler, RequestLimiter, TokenBuckets
+from speculation import SpeculativePrefetcher, prefetched_reply, similarity
+
+DRAFT = "I would shard the table by customer id and add a read replica"
+ANSWER = "I would shard the table by customer id, and add a read replica."
+
+
+class Recorder:
+    """A compute callback that records drafts and can be held until released"""
+
+    def __init__(self, block: bool = False):
+        self.drafts = []
+        self.running = 0
+        self.peak = 0
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+        self._lock = threading.Lock()
+
+    def __call__(self, draft: str) -> str:
+        with self._lock:
+            self.drafts.append(draft)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        self.release.wait(5)
+        with self._lock:
+            self.running -= 1
+        return f"reply to: {draft}"
+
+
+@pytest.fixture
+def prefetcher():
+    return SpeculativePrefetcher(debounce=0.01, threshold=0.9, min_chars=20)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_similarity_ignores_case_and_whitespace():
+    assert similarity("Hello   World", "hello world") == 1.0
+    assert similarity(DRAFT, ANSWER) > 0.9
+    assert similarity(DRAFT, "Something else entirely") < 0.5
+
+
+def test_claim_hit_returns_the_prefetched_reply(prefetcher):
+    compute = Recorder()
+    assert prefetcher.draft("s1", DRAFT, 3, compute)
+    wait_for(lambda: compute.drafts)
+    future = prefetcher.claim("s1", ANSWER, 3)
+    assert prefetched_reply(future) == f"reply to: {DRAFT}"
+    # A speculation is claimed once
+    assert prefetcher.claim("s1", ANSWER, 3) is None
+
+
+def test_claim_miss_on_a_different_answer(prefetcher):
+    compute = Recorder()
+    prefetcher.draft("s1", DRAFT, 3, compute)
+    wait_for(lambda: compute.drafts)
+    assert prefetcher.claim("s1", "Actually I would rather use a message queue here", 3) is None
+
+
+def test_claim_miss_after_the_history_moved_on(prefetcher):
+    compute = Recorder()
+    prefetcher.draft("s1", DRAFT, 3, compute)
+    wait_for(lambda: compute.drafts)
+    assert prefetcher.claim("s1", ANSWER, 5) is None
+
+
+def test_claim_before_the_debounce_cancels_the_prefetch():
+    prefetcher = SpeculativePrefetcher(debounce=0.2, min_chars=20)
+    compute = Recorder()
+    prefetcher.draft("s1", DRAFT, 3, compute)
+    assert prefetcher.claim("s1", ANSWER, 3) is None
+    time.sleep(0.3)
+    assert compute.drafts == []
+
+
+def test_claim_without_a_draft(prefetcher):
+    assert prefetcher.claim("s1", ANSWER, 3) is None
+
+
+def test_short_drafts_and_disabled_prefetcher_do_nothing(prefetcher):
+    compute = Recorder()
+    assert not prefetcher.draft("s1", "too short", 3, compute)
+    disabled = SpeculativePrefetcher(enabled=False, debounce=0.01)
+    assert not disabled.draft("s1", DRAFT, 3, compute)
+    assert disabled.claim("s1", ANSWER, 3) is None
+    time.sleep(0.05)
+    assert compute.drafts == []
+
+
+def test_one_prefetch_per_session_and_only_the_latest_draft_follows(prefetcher):
+    compute = Recorder(block=True)
+    prefetcher.draft("s1", DRAFT, 3, compute)
+    wait_for(lambda: compute.drafts)
+    for n in range(5):
+        prefetcher.draft("s1", f"A completely different answer, version number {n}", 3, compute)
+    time.sleep(0.05)
+    assert len(compute.drafts) == 1
+    compute.release.set()
+    wait_for(lambda: len(compute.drafts) == 2)
+    assert compute.drafts[1].endswith("version number 4")
+    assert compute.peak == 1
+    future = prefetcher.claim("s1", "A completely different answer, version number 4", 3)
+    assert prefetched_reply(future) == f"reply to: {compute.drafts[1]}"
+
+
+def test_a_close_draft_keeps_the_running_prefetch(prefetcher):
+    compute = Recorder(block=True)
+    prefetcher.draft("s1", DRAFT, 3, compute)
+    wait_for(lambda: compute.drafts)
+    assert prefetcher.draft("s1", DRAFT + ".", 3, compute)
+    compute.release.set()
+    time.sleep(0.05)
+    assert compute.drafts == [DRAFT]
+
+
+def test_throttled_prefetch_is_skipped(prefetcher, monkeypatch):
+    limiter = RequestLimiter(TokenBuckets(0.01, 1), TokenBuckets(0, 1), FairScheduler())
+    limiter.check("key")
+    monkeypatch.setattr(speculation, "get_limiter", lambda: limiter)
+    compute = Recorder()
+    prefetcher.draft("s1", DRAFT, 3, compute, key="key")
+    wait_for(lambda: "s1" not in prefetcher._running and prefetcher._sessions["s1"].future.cancelled())
+    assert compute.drafts == []
+    assert prefetcher.claim("s1", ANSWER, 3) is None
+
+
+def test_admitted_prefetch_holds_an_upstream_slot(prefetcher, monkeypatch):
+    limiter = RequestLimiter(TokenBuckets(1, 5), TokenBuckets(0, 1), FairScheduler())
+    monkeypatch.setattr(speculation, "get_limiter", lambda: limiter)
+    compute = Recorder(block=True)
+    prefetcher.draft("s1", DRAFT, 3, compute, key="key")
+    wait_for(lambda: compute.drafts)
+    assert limiter.scheduler.in_flight == 1
+    compute.release.set()
+    wait_for(lambda: limiter.scheduler.in_flight == 0)
+
+
+def test_failed_prefetch_yields_no_reply(prefetcher):
+    def compute(draft):
+        raise ValueError("upstream failed")
+
+    prefetcher.draft("s1", DRAFT, 3, compute)
+    wait_for(lambda: prefetcher._sessions["s1"].future.done())
+    assert prefetched_reply(prefetcher.claim("s1", ANSWER, 3)) is None
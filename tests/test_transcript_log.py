@@ -0,0 +1,201 @@
+"""Transcript log group commit, replay and resume"""
+
+import copy
+import json
+import os
+
+import pytest
+
+import transcript_log
+from transcript_log import TranscriptLog, export_sessions
+
+
+def make_record(history=None, api_key_hash="key-a"):
+    return {
+        "persona_id": "tech",
+        "api_key_hash": api_key_hash,
+        "start_time": "2026-01-01T10:00:00",
+        "engine": {"history": list(history or [])}
+    }
+
+
+def turn(n):
+    return [{"role": "user", "content": f"answer {n}"}, {"role": "assistant", "content": f"question {n + 1}"}]
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "transcripts.log")
+
+
+@pytest.fixture
+def log(log_path):
+    return TranscriptLog(log_path, ttl_seconds=3600, fsync=False)
+
+
+def save(log, session_id, record):
+    future = log.log_session(session_id, record)
+    assert future is not None and future.result(timeout=5) is True
+
+
+def test_log_session_writes_start_then_only_new_turns(log, log_path):
+    record = make_record(turn(0))
+    save(log, "s1", record)
+    record["engine"]["history"] += turn(1)
+    save(log, "s1", record)
+    assert log.log_session("s1", record) is None
+
+    with open(log_path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["type"] for line in lines] == ["start", "turn", "turn"]
+    assert [line["offset"] for line in lines[1:]] == [0, 2]
+    assert record["logged"] == 4
+
+
+def test_replay_rebuilds_the_record(log):
+    record = make_record(turn(0) + turn(1))
+    save(log, "s1", record)
+    replayed = log.replay("s1")
+    assert replayed["engine"]["history"] == record["engine"]["history"]
+    assert replayed["api_key_hash"] == "key-a"
+    assert replayed["logged"] == 4
+    assert replayed["engine"]["interview_started"] is True
+
+
+def test_resume_after_restart_replays_from_the_log(log, log_path):
+    record = make_record(turn(0))
+    save(log, "s1", record)
+
+    # A fresh process has no stored record and an empty index
+    restarted = TranscriptLog(log_path, ttl_seconds=3600, fsync=False)
+    resumed = restarted.resume("s1", None)
+    assert resumed["engine"]["history"] == turn(0)
+
+
+def test_resume_keeps_a_current_record(log):
+    record = make_record(turn(0))
+    save(log, "s1", record)
+    assert log.resume("s1", record) is record
+
+
+def test_resume_catches_up_a_record_behind_the_log(log, log_path):
+    record = make_record(turn(0))
+    record["engine"]["summary"] = "rolling summary"
+    save(log, "s1", record)
+    stale = copy.deepcopy(record)
+
+    # Another worker sharing the file takes the next turn
+    other = TranscriptLog(log_path, ttl_seconds=3600, fsync=False)
+    record["engine"]["history"] += turn(1)
+    save(other, "s1", record)
+
+    resumed = log.resume("s1", stale)
+    assert resumed is stale
+    assert resumed["engine"]["history"] == turn(0) + turn(1)
+    assert resumed["engine"]["summary"] == "rolling summary"
+    assert resumed["logged"] == 4
+
+
+def test_resume_ignores_a_log_with_another_api_key(log, log_path):
+    record = make_record(turn(0))
+    save(log, "s1", record)
+    other = TranscriptLog(log_path, ttl_seconds=3600, fsync=False)
+    foreign = make_record(turn(0) + turn(1), api_key_hash="key-b")
+    save(other, "s1", foreign)
+
+    stale = make_record(turn(0))
+    stale["logged"] = 2
+    assert log.resume("s1", stale)["engine"]["history"] == turn(0)
+
+
+def test_resume_unknown_or_unlogged(log):
+    assert log.resume("missing", None) is None
+    record = make_record(turn(0))
+    assert log.resume("s1", record) is record
+
+
+def test_ended_session_is_not_resumed(log):
+    save(log, "s1", make_record(turn(0)))
+    assert log.end("s1").result(timeout=5) is True
+    assert log.resume("s1", None) is None
+
+
+def test_expired_session_is_not_replayed(log_path, monkeypatch):
+    log = TranscriptLog(log_path, ttl_seconds=60, fsync=False)
+    save(log, "s1", make_record(turn(0)))
+    now = transcript_log.time.time()
+    monkeypatch.setattr(transcript_log.time, "time", lambda: now + 61)
+    assert log.replay("s1") is None
+
+
+def test_torn_last_line_is_skipped(log, log_path):
+    save(log, "s1", make_record(turn(0)))
+    with open(log_path, "ab") as f:
+        f.write(b'{"session_id":"s1","type":"turn","off')
+
+    # The next writer starts on a fresh line, and the torn line is ignored
+    reopened = TranscriptLog(log_path, ttl_seconds=3600, fsync=False)
+    save(reopened, "s2", make_record(turn(5)))
+    assert reopened.replay("s1")["engine"]["history"] == turn(0)
+    assert reopened.replay("s2")["engine"]["history"] == turn(5)
+
+
+def test_concurrent_sessions_share_commits(log):
+    records = {f"s{n}": make_record(turn(n)) for n in range(50)}
+    futures = [log.log_session(session_id, record) for session_id, record in records.items()]
+    assert all(future.result(timeout=5) for future in futures)
+    for session_id, record in records.items():
+        assert log.replay(session_id)["engine"]["history"] == record["engine"]["history"]
+
+
+def test_export_sessions(log, log_path):
+    save(log, "s1", make_record(turn(0)))
+    save(log, "s2", make_record(turn(1)))
+    log.end("s1").result(timeout=5)
+
+    sessions = list(export_sessions(log_path))
+    assert [(s["id"], s["ended"]) for s in sessions] == [("s1", True), ("s2", False)]
+    assert sessions[0]["history"] == turn(0)
+
+
+def test_restart_resumes_indexing_from_the_checkpoint(log, log_path, monkeypatch):
+    monkeypatch.setattr(transcript_log, "CHECKPOINT_BYTES", 1)
+    save(log, "s1", make_record(turn(0)))
+    save(log, "s2", make_record(turn(1)))
+    log.end("s2").result(timeout=5)
+    assert log.replay("s1") is not None
+    with open(log.checkpoint_path) as f:
+        checkpoint = json.load(f)
+    assert checkpoint["scanned"] == log._scanned
+    assert list(checkpoint["sessions"]) == ["s1"]
+
+    # Lines before the checkpoint are not read again: s1's start line is
+    # unreadable while the restarted process indexes, yet s1 still replays
+    with open(log_path, "r+b") as f:
+        f.write(b"x")
+    restarted = TranscriptLog(log_path, ttl_seconds=3600, fsync=False)
+    assert restarted._scanned == checkpoint["scanned"]
+    save(restarted, "s3", make_record(turn(2)))
+    assert restarted.resume("s3", None)["engine"]["history"] == turn(2)
+    assert restarted.resume("s2", None) is None
+    with open(log_path, "r+b") as f:
+        f.write(b"{")
+    assert restarted.replay("s1")["engine"]["history"] == turn(0)
+
+
+def test_checkpoint_of_another_file_is_ignored(log, log_path, monkeypatch):
+    monkeypatch.setattr(transcript_log, "CHECKPOINT_BYTES", 1)
+    save(log, "s1", make_record(turn(0)))
+    assert log.replay("s1") is not None
+
+    # The log was rotated away; its checkpoint is stale
+    os.rename(log_path, log_path + ".1")
+    fresh = TranscriptLog(log_path, ttl_seconds=3600, fsync=False)
+    assert fresh._scanned == 0
+    assert fresh.resume("s1", None) is None
+
+
+def test_log_is_off_unless_configured(monkeypatch):
+    monkeypatch.delenv("TRANSCRIPT_LOG_PATH", raising=False)
+    monkeypatch.setattr(transcript_log, "_log", None)
+    assert transcript_log.get_transcript_log() is None
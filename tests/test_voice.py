@@ -0,0 +1,37 @@
+"""Voice backends: loading by name and the STT/TTS interfaces"""
+
+import pytest
+
+from voice import (
+    OfflineSpeechToText,
+    SilentTextToSpeech,
+    SpeechToText,
+    TextToSpeech,
+    create_speech_to_text,
+    create_text_to_speech
+)
+
+
+class IncompleteSpeechToText(SpeechToText):
+    """A custom backend that forgot to implement transcribe"""
+
+
+class IncompleteTextToSpeech(TextToSpeech):
+    """A custom backend that forgot to implement synthesize"""
+
+
+def test_builtin_backends_by_name():
+    assert isinstance(create_speech_to_text("offline"), OfflineSpeechToText)
+    assert isinstance(create_text_to_speech("silent"), SilentTextToSpeech)
+
+
+def test_incomplete_backend_fails_when_loaded():
+    with pytest.raises(TypeError):
+        create_speech_to_text(f"{__name__}:IncompleteSpeechToText")
+    with pytest.raises(TypeError):
+        create_text_to_speech(f"{__name__}:IncompleteTextToSpeech")
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_speech_to_text("whisper")
@@ -0,0 +1,99 @@
+"""Spoken turns: the reply is only reported done once the turn is saved"""
+
+import asyncio
+import uuid
+
+import numpy as np
+import pytest
+
+import voice_socket
+from async_engine import AsyncInterviewEngine
+from voice_socket import VoiceChannel, VoiceConnection
+
+
+class FakeSpeechToText:
+    def transcribe(self, audio, sample_rate, prompt="", final=True):
+        return "I would add a cache in front of the database."
+
+
+class FakeTextToSpeech:
+    mime_type = "audio/wav"
+
+    def synthesize(self, text):
+        return b"RIFF"
+
+
+class Session:
+    """Load and save callbacks recording the order of events"""
+
+    def __init__(self, api_key, events, save_error=None):
+        self.api_key = api_key
+        self.events = events
+        self.save_error = save_error
+        self.saved = None
+
+    async def load(self, session_id, api_key):
+        engine = AsyncInterviewEngine(api_key=api_key)
+        engine.start_interview("tech")
+        return {"api_key_hash": "hash", "engine": engine.export_state()}, engine
+
+    async def save(self, session_id, record, engine):
+        # Like the transcript log's group commit, the save completes later
+        await asyncio.sleep(0.05)
+        if self.save_error is not None:
+            raise self.save_error
+        self.saved = len(engine.conversation_history)
+        self.events.append(("saved", None))
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(AsyncInterviewEngine, "_after_turn", lambda self: None)
+    monkeypatch.setattr(voice_socket, "append_recording", lambda session_id, audio: (0.0, len(audio) / 16000))
+
+    async def stream_ai_response(self, user_input):
+        for token in ("What would ", "you cache? "):
+            yield token
+        self.commit_response(user_input, "What would you cache? ")
+
+    monkeypatch.setattr(AsyncInterviewEngine, "stream_ai_response", stream_ai_response)
+
+
+def run_turn(save_error=None):
+    api_key = f"sk-or-v1-{uuid.uuid4().hex}"
+    events = []
+    session = Session(api_key, events, save_error)
+
+    async def main():
+        channel = VoiceChannel(session.load, session.save)
+        channel.stt, channel.tts = FakeSpeechToText(), FakeTextToSpeech()
+
+        async def emit(event, data=None, to=None):
+            events.append((event, data))
+
+        channel.sio.emit = emit
+        connection = VoiceConnection("s1", api_key)
+        await channel._turn("sid", connection, np.zeros(16000, dtype=np.float32), 0.0)
+        return connection
+
+    connection = asyncio.run(main())
+    return events, session, connection
+
+
+def test_reply_done_follows_the_save():
+    events, session, connection = run_turn()
+    names = [name for name, _ in events]
+    assert names.index("saved") < names.index("reply_done")
+    assert names[-1] == "reply_done"
+    assert events[-1][1] == {"response": "What would you cache? "}
+    assert session.saved == 2
+    assert connection.last_question == "What would you cache? "
+    assert "reply_audio" in names
+
+
+def test_failed_save_reports_an_error_instead_of_done():
+    events, session, connection = run_turn(save_error=OSError("disk full"))
+    names = [name for name, _ in events]
+    assert "reply_done" not in names
+    assert events[-1] == ("voice_error", {"error": "disk full"})
+    assert connection.last_question == ""